@@ -0,0 +1,327 @@
+"""
+Read-through cache for expensive read endpoints, shared by API workers.
+
+CACHE_BACKEND=redis keeps entries in Redis (or any server speaking its
+protocol), so every worker reads the same entries; it is the default when
+CACHE_REDIS_URL or REDIS_URL is set, and caching is on by default only
+then. CACHE_BACKEND=memory keeps entries in the worker process. It has to
+be enabled explicitly (CACHE_ENABLED=1) and suits a single worker: other
+workers, and jobs run as separate processes (archival, bulk seeding),
+cannot invalidate its entries, so their writes show up only once entries
+expire after CACHE_TTL_SECONDS.
+
+Each entry is tagged with the tables it was computed from ("grievances",
+"departments", "regions"). Committing ORM changes to those tables bumps the
+tag's generation, in Redis for all workers at once, and entries stored
+under an older generation are never read again. A value computed while a
+write was committing is stored under the generation it started from, so it
+cannot overwrite a fresher one.
+
+Concurrent misses for the same entry are coalesced: threads in a worker
+wait for the one computing it, and with Redis a short lock lets a single
+worker recompute while the others poll for its result.
+"""
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+from itertools import chain
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import orjson
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from . import metrics, models
+
+_REDIS_URL = os.getenv("CACHE_REDIS_URL", os.getenv("REDIS_URL", ""))
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "redis" if _REDIS_URL else "memory")
+CACHE_REDIS_URL = _REDIS_URL or "redis://localhost:6379/0"
+# A per-process cache would serve stale entries from the workers a write
+# did not go through, so it is opt-in.
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "1" if CACHE_BACKEND == "redis" else "0") == "1"
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "30"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+# Longest a recomputation may hold other requests for the same entry waiting.
+CACHE_LOCK_SECONDS = float(os.getenv("CACHE_LOCK_SECONDS", "10"))
+
+# Writes to these models invalidate entries carrying the tag.
+TAGS = {
+    models.Grievance: "grievances",
+    models.Timeline: "grievances",
+    models.Media: "grievances",
+    models.Feedback: "grievances",
+    models.Department: "departments",
+    models.Region: "regions",
+}
+
+Lookup = Tuple[bool, Any, str]
+
+
+def _plain(value):
+    # Route results may hold pydantic models; Redis stores them as JSON.
+    return value.model_dump()
+
+
+class MemoryBackend:
+    """Entries local to one worker process, evicted least recently used first."""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, tags: Iterable[str]) -> Lookup:
+        with self._lock:
+            versioned = key + "@" + ".".join(str(self._generations.get(tag, 0)) for tag in tags)
+        return self.load(versioned) + (versioned,)
+
+    def load(self, versioned: str) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(versioned)
+            if entry is None or entry[0] < time.monotonic():
+                return False, None
+            self._entries.move_to_end(versioned)
+            return True, entry[1]
+
+    def set(self, versioned: str, value, ttl: float):
+        with self._lock:
+            self._entries[versioned] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(versioned)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def generation(self, tag: str) -> int:
+        with self._lock:
+            return self._generations.get(tag, 0)
+
+    def invalidate(self, tags: Iterable[str]):
+        # Entries under the old generation become unreachable and age out.
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+
+    def acquire(self, versioned: str, seconds: float) -> bool:
+        # Only this process computes entries, and Cache coalesces its threads.
+        return True
+
+    def release(self, versioned: str):
+        pass
+
+
+class RedisBackend:
+    """Entries and tag generations in Redis, shared by every worker."""
+
+    # Reads the tag generations and the entry stored under them in one round trip.
+    GET_SCRIPT = """
+local generations = {}
+for i = 2, #KEYS do
+  generations[#generations + 1] = redis.call('GET', KEYS[i]) or '0'
+end
+local versioned = KEYS[1] .. '@' .. table.concat(generations, '.')
+return {versioned, redis.call('GET', versioned)}
+"""
+
+    def __init__(self, url: str = CACHE_REDIS_URL, prefix: str = "civicpulse:cache:"):
+        self.url = url
+        self.prefix = prefix
+        self._client = None
+        self._get_script = None
+        self._lock = threading.Lock()
+
+    def _redis(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import redis
+
+                    client = redis.Redis.from_url(self.url)
+                    self._get_script = client.register_script(self.GET_SCRIPT)
+                    self._client = client
+        return self._client
+
+    def get(self, key: str, tags: Iterable[str]) -> Lookup:
+        self._redis()
+        keys = [self.prefix + key] + [self.prefix + "tag:" + tag for tag in tags]
+        versioned, raw = self._get_script(keys=keys)
+        versioned = versioned.decode()
+        if raw is None:
+            return False, None, versioned
+        return True, orjson.loads(raw), versioned
+
+    def load(self, versioned: str) -> Tuple[bool, Any]:
+        raw = self._redis().get(versioned)
+        return (False, None) if raw is None else (True, orjson.loads(raw))
+
+    def set(self, versioned: str, value, ttl: float):
+        self._redis().set(versioned, orjson.dumps(value, default=_plain), px=int(ttl * 1000))
+
+    def generation(self, tag: str) -> int:
+        return int(self._redis().get(self.prefix + "tag:" + tag) or 0)
+
+    def invalidate(self, tags: Iterable[str]):
+        pipeline = self._redis().pipeline(transaction=False)
+        for tag in tags:
+            pipeline.incr(self.prefix + "tag:" + tag)
+        pipeline.execute()
+
+    def acquire(self, versioned: str, seconds: float) -> bool:
+        return bool(self._redis().set(versioned + ":lock", b"1", nx=True, px=int(seconds * 1000)))
+
+    def release(self, versioned: str):
+        self._redis().delete(versioned + ":lock")
+
+
+def _create_backend():
+    if CACHE_BACKEND == "redis":
+        return RedisBackend()
+    return MemoryBackend()
+
+
+class _Flight:
+    """One in-progress computation that other threads can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+class Cache:
+    def __init__(self, backend=None, ttl: float = CACHE_TTL_SECONDS, lock_seconds: float = CACHE_LOCK_SECONDS):
+        self.backend = backend or _create_backend()
+        self.ttl = ttl
+        self.lock_seconds = lock_seconds
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        tags: Iterable[str] = (),
+        ttl: Optional[float] = None,
+        name: Optional[str] = None,
+    ):
+        """Return the cached value of `key`, computing and storing it on a
+        miss. Cache errors fall back to calling `compute` directly."""
+        name = name or key
+        tags = tuple(tags)
+        try:
+            found, value, versioned = self.backend.get(key, tags)
+        except Exception as e:
+            print(f"Cache error: {e}")
+            metrics.cache_requests_total.inc(name, "error")
+            return compute()
+        if found:
+            metrics.cache_requests_total.inc(name, "hit")
+            return value
+
+        with self._lock:
+            flight = self._flights.get(versioned)
+            leader = flight is None
+            if leader:
+                flight = self._flights[versioned] = _Flight()
+        if not leader:
+            metrics.cache_requests_total.inc(name, "coalesced")
+            if flight.done.wait(self.lock_seconds) and flight.error is None:
+                return flight.value
+            return compute()
+
+        metrics.cache_requests_total.inc(name, "miss")
+        try:
+            flight.value = self._compute_once(versioned, compute, self.ttl if ttl is None else ttl)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[versioned]
+            flight.done.set()
+
+    def _compute_once(self, versioned: str, compute: Callable[[], Any], ttl: float):
+        # Another worker holding the lock is computing the same entry; poll
+        # for its result rather than repeating the work, up to lock_seconds.
+        try:
+            locked = self.backend.acquire(versioned, self.lock_seconds)
+            deadline = time.monotonic() + self.lock_seconds
+            while not locked and time.monotonic() < deadline:
+                time.sleep(0.02)
+                found, value = self.backend.load(versioned)
+                if found:
+                    return value
+        except Exception as e:
+            print(f"Cache error: {e}")
+            return compute()
+
+        value = compute()
+        try:
+            self.backend.set(versioned, value, ttl)
+            if locked:
+                self.backend.release(versioned)
+        except Exception as e:
+            print(f"Cache error: {e}")
+        return value
+
+    def generation(self, tag: str) -> Optional[int]:
+        """Current generation of `tag`, bumped by every invalidation of it,
+        for in-process state derived from the tagged tables. None when the
+        backend cannot be reached."""
+        try:
+            return self.backend.generation(tag)
+        except Exception as e:
+            print(f"Cache error: {e}")
+            return None
+
+    def invalidate(self, *tags: str):
+        try:
+            self.backend.invalidate(tags)
+        except Exception as e:
+            print(f"Cache invalidation error: {e}")
+
+
+cache = Cache()
+
+
+def cached(name: str, tags: Iterable[str], ttl: Optional[float] = None, exclude: Iterable[str] = ("db",)):
+    """
+    Cache a route's result per combination of its keyword arguments (as
+    FastAPI passes them), leaving out `exclude`. The undecorated function is
+    available as `__wrapped__`.
+    """
+    tags = tuple(tags)
+    exclude = set(exclude)
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not CACHE_ENABLED:
+                return function(*args, **kwargs)
+            params = "&".join(f"{k}={v}" for k, v in sorted(kwargs.items()) if k not in exclude)
+            return cache.get_or_compute(f"{name}?{params}", lambda: function(*args, **kwargs), tags, ttl, name)
+
+        return wrapper
+
+    return decorator
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_tags(session, flush_context):
+    tags = {TAGS[type(obj)] for obj in chain(session.new, session.dirty, session.deleted) if type(obj) in TAGS}
+    if tags:
+        session.info.setdefault("cache_tags", set()).update(tags)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    tags = session.info.pop("cache_tags", None)
+    if tags:
+        cache.invalidate(*sorted(tags))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_tags(session):
+    session.info.pop("cache_tags", None)
@@ -0,0 +1,268 @@
+"""
+Idempotency-Key support for retried writes.
+
+A client that may retry a request (grievance submission, status changes,
+resolution, feedback) sends the same `Idempotency-Key` header with every
+attempt. The first attempt claims the key in `idempotency_keys` and runs;
+when it succeeds its response is stored for IDEMPOTENCY_TTL_SECONDS and
+replayed to retries, marked `Idempotent-Replayed: true`, without running
+the route again (no second grievance, upload or AI call). Retries that
+arrive while the first attempt is running wait up to
+IDEMPOTENCY_WAIT_SECONDS for its result. Reusing a key for a different
+request is a 422. Failed attempts release the key so the request can be
+retried.
+
+Keys are scoped to the caller (JWT subject, or anonymous). A claimed key
+that was never completed, e.g. because the worker died, expires after
+IDEMPOTENCY_LOCK_SECONDS.
+
+    python -m app.idempotency prune   # delete expired keys
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+
+from . import auth, database, metrics, models
+
+IDEMPOTENCY_ENABLED = os.getenv("IDEMPOTENCY_ENABLED", "1") == "1"
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600)))
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "15"))
+
+HEADER = "idempotency-key"
+MAX_KEY_LENGTH = 255
+ANONYMOUS = "anonymous"
+
+ROUTES = [
+    ("POST", re.compile(r"^/grievance/$")),
+    ("PATCH", re.compile(r"^/grievance/\d+/status$")),
+    ("PUT", re.compile(r"^/grievance/\d+/resolve$")),
+    ("POST", re.compile(r"^/grievance/\d+/feedback$")),
+]
+
+table = models.IdempotencyKey.__table__
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _as_utc(moment: datetime) -> datetime:
+    # SQLite hands back naive datetimes; they are stored in UTC.
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment
+
+
+def request_hash(method: str, path: str, content_type: str, body: bytes) -> str:
+    """Fingerprint of a request. Multipart boundaries are random per attempt
+    in most clients, so they are left out."""
+    match = re.search(r"boundary=\"?([^\";]+)", content_type)
+    if match:
+        body = body.replace(match.group(1).encode("latin-1"), b"")
+    digest = hashlib.sha256(f"{method} {path}\n".encode())
+    digest.update(body)
+    return digest.hexdigest()
+
+
+def _lookup(conn, owner: str, key: str):
+    return conn.execute(select(table).where(table.c.owner == owner, table.c.key == key)).first()
+
+
+def claim(owner: str, key: str, fingerprint: str) -> Tuple[Optional[int], Optional[object]]:
+    """
+    Claim `key` for a new request. Returns (id, None) when this request
+    should run, or (None, row) with the live row of an earlier request,
+    completed or still running.
+    """
+    now = _now()
+    with database.get_engine().begin() as conn:
+        row = _lookup(conn, owner, key)
+        if row is None:
+            values = {
+                "owner": owner,
+                "key": key,
+                "request_hash": fingerprint,
+                "expires_at": now + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS),
+            }
+            if conn.execute(database.insert_ignoring_conflicts(conn, table, ["owner", "key"]), values).rowcount:
+                return _lookup(conn, owner, key).id, None
+            # A concurrent request claimed it first.
+            row = _lookup(conn, owner, key)
+        if _as_utc(row.expires_at) > now:
+            return None, row
+
+        # Expired, or abandoned while running: take it over.
+        taken = conn.execute(
+            table.update()
+            .where(table.c.id == row.id, table.c.expires_at == row.expires_at)
+            .values(
+                request_hash=fingerprint, status_code=None, content_type=None, content_encoding=None, response=None,
+                created_at=now, expires_at=now + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS),
+            )
+        ).rowcount
+        return (row.id, None) if taken else (None, _lookup(conn, owner, key))
+
+
+def complete(key_id: int, status_code: int, content_type: Optional[str], content_encoding: Optional[str], body: bytes):
+    with database.get_engine().begin() as conn:
+        conn.execute(table.update().where(table.c.id == key_id).values(
+            status_code=status_code,
+            content_type=content_type,
+            content_encoding=content_encoding,
+            response=body,
+            expires_at=_now() + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS),
+        ))
+
+
+def release(key_id: int):
+    with database.get_engine().begin() as conn:
+        conn.execute(table.delete().where(table.c.id == key_id))
+
+
+def prune(engine=None) -> int:
+    engine = engine or database.get_engine()
+    with engine.begin() as conn:
+        return conn.execute(table.delete().where(table.c.expires_at < _now())).rowcount
+
+
+def _owner(authorization: Optional[str]) -> Optional[str]:
+    """JWT subject of the caller, ANONYMOUS without a bearer token, or None
+    for an invalid token (the route rejects it)."""
+    if not authorization:
+        return ANONYMOUS
+    if authorization[:7].lower() != "bearer ":
+        return None
+    from jose import JWTError, jwt
+
+    try:
+        payload = jwt.decode(authorization[7:], auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
+    except JWTError:
+        return None
+    subject = payload.get("sub")
+    return f"sub:{subject}" if subject else None
+
+
+async def _respond(send, status_code: int, body: bytes, content_type: str = "application/json", headers=()):
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", content_type.encode("latin-1")),
+            (b"content-length", str(len(body)).encode()),
+            *headers,
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    """
+    Pure ASGI middleware applying Idempotency-Key semantics to ROUTES.
+    Requests without the header, or to other routes, pass straight through.
+    """
+
+    def __init__(self, app, routes=None):
+        self.app = app
+        self.routes = routes if routes is not None else ROUTES
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not any(
+            scope["method"] == method and pattern.match(scope["path"]) for method, pattern in self.routes
+        ):
+            return await self.app(scope, receive, send)
+        headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]}
+        key = headers.get(HEADER)
+        if key is None:
+            return await self.app(scope, receive, send)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return await _respond(send, 400, b'{"detail":"Invalid Idempotency-Key"}')
+        owner = _owner(headers.get("authorization"))
+        if owner is None:
+            return await self.app(scope, receive, send)
+
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+        fingerprint = request_hash(scope["method"], scope["path"], headers.get("content-type", ""), body)
+
+        deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+        key_id, row = await run_in_threadpool(claim, owner, key, fingerprint)
+        while key_id is None:
+            if row.request_hash != fingerprint:
+                metrics.idempotency_requests_total.inc("mismatch")
+                return await _respond(send, 422, b'{"detail":"Idempotency-Key was already used for a different request"}')
+            if row.status_code is not None:
+                metrics.idempotency_requests_total.inc("replayed")
+                headers = [(b"idempotent-replayed", b"true")]
+                if row.content_encoding:
+                    headers.append((b"content-encoding", row.content_encoding.encode("latin-1")))
+                return await _respond(
+                    send, row.status_code, row.response, row.content_type or "application/json", headers,
+                )
+            if time.monotonic() >= deadline:
+                metrics.idempotency_requests_total.inc("in_progress")
+                return await _respond(
+                    send, 409, b'{"detail":"A request with this Idempotency-Key is still in progress"}',
+                    headers=[(b"retry-after", b"1")],
+                )
+            await asyncio.sleep(0.05)
+            key_id, row = await run_in_threadpool(claim, owner, key, fingerprint)
+        metrics.idempotency_requests_total.inc("new")
+
+        replayed_body = False
+
+        async def receive_body():
+            nonlocal replayed_body
+            if not replayed_body:
+                replayed_body = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        response = {"status": 500, "content_type": None, "content_encoding": None, "body": []}
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                for name, value in message.get("headers", []):
+                    if name == b"content-type":
+                        response["content_type"] = value.decode("latin-1")
+                    elif name == b"content-encoding":
+                        response["content_encoding"] = value.decode("latin-1")
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_body, capture)
+        except BaseException:
+            await run_in_threadpool(release, key_id)
+            raise
+        # Only successes are stored; a failed attempt may be retried.
+        if 200 <= response["status"] < 300:
+            try:
+                await run_in_threadpool(
+                    complete, key_id, response["status"], response["content_type"], response["content_encoding"],
+                    b"".join(response["body"]),
+                )
+                return
+            except Exception as e:
+                # The response has been sent; don't leave retries stuck on 409.
+                print(f"Idempotency error: could not store response for key {key_id}: {e}")
+        await run_in_threadpool(release, key_id)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain stored idempotency keys.")
+    parser.add_argument("command", choices=["prune"])
+    parser.parse_args()
+    print(f"✅ Pruned {prune()} expired idempotency keys")
@@ -0,0 +1,270 @@
+import bisect
+import contextvars
+import threading
+import time
+import weakref
+from typing import Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250)
+
+# Per-request accumulator. The contextvar is copied into threadpool workers,
+# so sync route handlers update the same dict as the middleware.
+request_context: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("request_context", default=None)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            for labels, value in self._values.items():
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self._values.items()]
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_labels = _format_labels(self.labelnames, labels, 'le="%s"' % le)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {series[-1]}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class CallbackGauge(_Metric):
+    """Gauge whose values are computed at scrape time."""
+
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str], callback):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def render(self):
+        lines = self.header()
+        for labels, value in self.callback().items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests_total = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route and status.", ("method", "route", "status")))
+http_request_duration_seconds = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency.", ("method", "route")))
+# Requests in flight, keyed by id(scope). The route is only known once the
+# router has matched, so the in-flight gauge is computed from these at scrape time.
+_active_requests: Dict[int, dict] = {}
+
+
+def route_of(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def _in_flight() -> Dict[Tuple[str, ...], int]:
+    counts: Dict[Tuple[str, ...], int] = {}
+    for scope in list(_active_requests.values()):
+        labels = (scope["method"], route_of(scope))
+        counts[labels] = counts.get(labels, 0) + 1
+    return counts
+
+
+http_requests_in_flight = registry.register(CallbackGauge(
+    "http_requests_in_flight", "HTTP requests currently being served.", ("method", "route"), _in_flight))
+http_response_size_bytes = registry.register(Histogram(
+    "http_response_size_bytes", "HTTP response body size.", ("method", "route"), SIZE_BUCKETS))
+http_request_db_queries = registry.register(Histogram(
+    "http_request_db_queries", "SQL statements executed per request.", ("method", "route"), QUERY_COUNT_BUCKETS))
+http_request_db_seconds = registry.register(Histogram(
+    "http_request_db_seconds", "Time spent in SQL statements per request.", ("method", "route")))
+db_queries_total = registry.register(Counter(
+    "db_queries_total", "SQL statements executed.", ("route",)))
+db_query_duration_seconds = registry.register(Histogram(
+    "db_query_duration_seconds", "SQL statement latency.", ("route",)))
+
+
+def _replica_lag() -> Dict[Tuple[str, ...], float]:
+    from . import database
+
+    lag = database.replica_monitor.lag
+    return {(): lag} if lag is not None else {}
+
+
+db_read_sessions_total = registry.register(Counter(
+    "db_read_sessions_total", "Read-only sessions by target database (primary or replica).", ("target",)))
+db_replica_lag_seconds = registry.register(CallbackGauge(
+    "db_replica_lag_seconds", "Last measured replication lag of the read replica.", (), _replica_lag))
+geocode_lookups_total = registry.register(Counter(
+    "geocode_lookups_total", "Location geocoding lookups by where they were answered (memory, database, gazetteer or miss).", ("source",)))
+cache_requests_total = registry.register(Counter(
+    "cache_requests_total", "Cached endpoint lookups by result (hit, miss, coalesced or error).", ("name", "result")))
+idempotency_requests_total = registry.register(Counter(
+    "idempotency_requests_total", "Requests with an Idempotency-Key by outcome (new, replayed, mismatch or in_progress).", ("result",)))
+notifications_total = registry.register(Counter(
+    "notifications_total", "Outbox notifications dispatched by channel and outcome (sent, retry or failed).", ("channel", "outcome")))
+ai_request_duration_seconds = registry.register(Histogram(
+    "ai_request_duration_seconds", "AI provider call latency.", ("provider", "operation", "outcome")))
+ai_classifications_total = registry.register(Counter(
+    "ai_classifications_total", "Grievance classifications by source (model or mock).", ("source",)))
+
+
+def current_route() -> str:
+    context = request_context.get()
+    return route_of(context["scope"]) if context else "none"
+
+
+_instrumented = weakref.WeakSet()
+
+
+def instrument_engine(engine):
+    """Count and time every SQL statement, attributed to the current route."""
+    # The engine outlives repeated app lifespans (e.g. one per TestClient),
+    # which must not stack up listeners.
+    if engine in _instrumented:
+        return
+    _instrumented.add(engine)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+        request = request_context.get()
+        route = route_of(request["scope"]) if request else "none"
+        if request is not None:
+            request["queries"] += 1
+            request["query_seconds"] += elapsed
+        db_queries_total.inc(route)
+        db_query_duration_seconds.observe(elapsed, route)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording per-route latency, in-flight requests,
+    response size and SQL statement counts. Routes are labelled by their path
+    template (e.g. /grievance/{grievance_id}) to keep cardinality bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        context = {"scope": scope, "queries": 0, "query_seconds": 0.0}
+        token = request_context.set(context)
+        status = [500]
+        size = [0]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            elif message["type"] == "http.response.body":
+                size[0] += len(message.get("body", b""))
+            await send(message)
+
+        _active_requests[id(scope)] = scope
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _active_requests.pop(id(scope), None)
+            route = route_of(scope)
+            http_requests_total.inc(method, route, str(status[0]))
+            http_request_duration_seconds.observe(elapsed, method, route)
+            http_response_size_bytes.observe(size[0], method, route)
+            http_request_db_queries.observe(context["queries"], method, route)
+            http_request_db_seconds.observe(context["query_seconds"], method, route)
+            request_context.reset(token)
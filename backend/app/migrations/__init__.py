@@ -0,0 +1,104 @@
+"""
+Versioned schema migrations.
+
+Each module in this package named vNNNN_<description>.py defines VERSION,
+DESCRIPTION and upgrade(conn). Migrations spell out their own DDL instead
+of reading app.models, so replaying them always produces the schema as it
+was at that version. Applied versions are recorded in schema_version.
+
+    python -m app.migrations            # apply pending migrations
+    python -m app.migrations status     # list applied and pending versions
+"""
+import importlib
+import pkgutil
+import time
+from typing import List, Sequence
+
+from sqlalchemy import inspect, text
+
+VERSION_TABLE = "schema_version"
+
+# Arbitrary key for pg_advisory_lock so that concurrently starting workers
+# apply migrations one at a time.
+_ADVISORY_LOCK_ID = 741_220_036
+
+
+def discover() -> List:
+    modules = []
+    for info in pkgutil.iter_modules(__path__):
+        if info.name.startswith("v") and info.name[1:5].isdigit():
+            modules.append(importlib.import_module(f"{__name__}.{info.name}"))
+    modules.sort(key=lambda module: module.VERSION)
+    versions = [module.VERSION for module in modules]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration versions: {versions}")
+    return modules
+
+
+def _ensure_version_table(conn):
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} ("
+        "version INTEGER PRIMARY KEY, description VARCHAR NOT NULL, applied_at VARCHAR NOT NULL)"
+    ))
+
+
+def applied_versions(conn) -> List[int]:
+    _ensure_version_table(conn)
+    return [row[0] for row in conn.execute(text(f"SELECT version FROM {VERSION_TABLE} ORDER BY version"))]
+
+
+def upgrade(engine, target: int = None) -> List[int]:
+    """Apply pending migrations up to `target` (default: latest), each in its
+    own transaction. Returns the versions applied. Everything runs on one
+    connection, so a pool of size 1 is enough."""
+    applied = []
+    postgres = engine.dialect.name == "postgresql"
+    with engine.connect() as conn:
+        if postgres:
+            # Session-level: held across the transactions below.
+            conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": _ADVISORY_LOCK_ID})
+            conn.commit()
+        try:
+            with conn.begin():
+                done = set(applied_versions(conn))
+            for module in discover():
+                if module.VERSION in done or (target is not None and module.VERSION > target):
+                    continue
+                started = time.perf_counter()
+                with conn.begin():
+                    module.upgrade(conn)
+                    conn.execute(
+                        text(f"INSERT INTO {VERSION_TABLE} (version, description, applied_at) VALUES (:v, :d, :t)"),
+                        {"v": module.VERSION, "d": module.DESCRIPTION, "t": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())},
+                    )
+                print(f"✅ Applied migration {module.VERSION:04d} {module.DESCRIPTION} ({time.perf_counter() - started:.2f}s)")
+                applied.append(module.VERSION)
+        finally:
+            if postgres:
+                if conn.in_transaction():
+                    conn.rollback()
+                conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": _ADVISORY_LOCK_ID})
+                conn.commit()
+    return applied
+
+
+# Helpers for migration modules. They are idempotent so that databases
+# created by the old create_all startup can be adopted without errors.
+
+def has_column(conn, table: str, column: str) -> bool:
+    return column in {c["name"] for c in inspect(conn).get_columns(table)}
+
+
+def add_column(conn, table: str, column: str, ddl_type: str):
+    if not has_column(conn, table, column):
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+
+
+def create_index(conn, name: str, table: str, columns: Sequence[str], unique: bool = False):
+    conn.execute(text(
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"
+    ))
+
+
+def drop_index(conn, name: str):
+    conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
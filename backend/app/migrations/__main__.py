@@ -0,0 +1,19 @@
+import argparse
+
+from . import applied_versions, discover, upgrade
+from ..database import engine
+
+parser = argparse.ArgumentParser(prog="python -m app.migrations", description="Apply or inspect schema migrations.")
+parser.add_argument("command", nargs="?", choices=["upgrade", "status"], default="upgrade")
+parser.add_argument("--target", type=int, help="Stop after this version")
+args = parser.parse_args()
+
+if args.command == "status":
+    with engine.begin() as conn:
+        done = set(applied_versions(conn))
+    for module in discover():
+        print(f"{'applied' if module.VERSION in done else 'pending'}  {module.VERSION:04d}  {module.DESCRIPTION}")
+else:
+    applied = upgrade(engine, args.target)
+    if not applied:
+        print("Database schema is up to date.")
@@ -0,0 +1,114 @@
+"""Tables as created by the original create_all startup."""
+from sqlalchemy import (
+    Boolean, Column, DateTime, Float, ForeignKey, Integer, MetaData, String, Table, Text, UniqueConstraint, func,
+)
+
+VERSION = 1
+DESCRIPTION = "initial schema"
+
+metadata = MetaData()
+
+Table(
+    "regions", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String, index=True),
+    Column("code", String, unique=True, index=True),
+    Column("type", String),
+    Column("parent_id", Integer, ForeignKey("regions.id"), nullable=True),
+    Column("lat", Float, nullable=True),
+    Column("lng", Float, nullable=True),
+)
+
+Table(
+    "departments", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String, unique=True, index=True),
+    Column("code", String, unique=True),
+)
+
+Table(
+    "users", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("email", String, unique=True, index=True),
+    Column("hashed_password", String),
+    Column("full_name", String),
+    Column("role", String),
+    Column("is_active", Boolean),
+    Column("phone_number", String, nullable=True),
+    Column("department_id", Integer, ForeignKey("departments.id"), nullable=True),
+    Column("region_id", Integer, ForeignKey("regions.id"), nullable=True),
+    Column("region_code", String, nullable=True),
+    Column("state", String, nullable=True),
+    Column("district", String, nullable=True),
+)
+
+Table(
+    "grievances", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("title", String, index=True),
+    Column("description", Text),
+    Column("citizen_id", Integer, ForeignKey("users.id")),
+    Column("department_id", Integer, ForeignKey("departments.id"), nullable=True),
+    Column("assignee_id", Integer, ForeignKey("users.id"), nullable=True),
+    Column("region_id", Integer, ForeignKey("regions.id"), nullable=True),
+    Column("status", String),
+    Column("priority", String),
+    Column("category", String, nullable=True),
+    Column("category_ai", String, nullable=True),
+    Column("severity_ai", Float, nullable=True),
+    Column("is_spam", Boolean),
+    Column("privacy_consent", Boolean),
+    Column("location", String, nullable=True),
+    Column("region_code", String, nullable=True),
+    Column("state", String, nullable=True),
+    Column("district", String, nullable=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True)),
+    Column("sentiment_score", Float, nullable=True),
+    Column("ai_summary", Text, nullable=True),
+    Column("embedding", Text, nullable=True),
+)
+
+Table(
+    "media", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("grievance_id", Integer, ForeignKey("grievances.id")),
+    Column("url", String),
+    Column("uploader_id", Integer, ForeignKey("users.id"), nullable=True),
+    Column("type", String),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+Table(
+    "timeline", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("grievance_id", Integer, ForeignKey("grievances.id")),
+    Column("status", String),
+    Column("remark", Text, nullable=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+Table(
+    "feedback", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("grievance_id", Integer, ForeignKey("grievances.id"), unique=True),
+    Column("rating", Integer),
+    Column("comment", Text, nullable=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+Table(
+    "chat_conversations", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), index=True),
+    Column("conversation_id", String),
+    Column("summary", Text, nullable=True),
+    Column("turns", Text, nullable=True),
+    Column("updated_at", DateTime(timezone=True), server_default=func.now(), index=True),
+    UniqueConstraint("user_id", "conversation_id"),
+)
+
+
+def upgrade(conn):
+    # checkfirst lets databases created by create_all adopt this version as-is.
+    metadata.create_all(conn, checkfirst=True)
@@ -0,0 +1,32 @@
+"""
+Composite indexes for the list, worklist, dashboard and count queries.
+Column order follows the query shapes: equality filters first, then the
+grouping or ordering column.
+"""
+from . import create_index
+
+VERSION = 2
+DESCRIPTION = "hot path indexes"
+
+INDEXES = [
+    # GET /grievance/assigned/me and officer status lookups in the chat router.
+    ("ix_grievances_assignee_status", "grievances", ["assignee_id", "status"]),
+    # GET /grievance/my and the citizen's latest grievances in the chat router.
+    ("ix_grievances_citizen_created", "grievances", ["citizen_id", "created_at"]),
+    # Dashboard totals by status and priority.
+    ("ix_grievances_status_priority", "grievances", ["status", "priority"]),
+    # State/district counts, hotspots and the list filters.
+    ("ix_grievances_state_district_status", "grievances", ["state", "district", "status"]),
+    ("ix_grievances_department_status", "grievances", ["department_id", "status"]),
+    ("ix_grievances_created_at", "grievances", ["created_at"]),
+    # Relationship loads of a grievance's timeline and media.
+    ("ix_timeline_grievance_id", "timeline", ["grievance_id", "id"]),
+    ("ix_media_grievance_id", "media", ["grievance_id"]),
+    # GET /admin/officers filters.
+    ("ix_users_role_department", "users", ["role", "department_id"]),
+]
+
+
+def upgrade(conn):
+    for name, table, columns in INDEXES:
+        create_index(conn, name, table, columns)
@@ -0,0 +1,76 @@
+"""Archive tables for resolved and closed grievances."""
+from sqlalchemy import (
+    Boolean, Column, DateTime, Float, ForeignKey, Index, Integer, MetaData, String, Table, Text, func,
+)
+
+VERSION = 3
+DESCRIPTION = "grievance archive tables"
+
+metadata = MetaData()
+
+# Referenced tables, declared only so the foreign keys resolve.
+for name in ("users", "departments", "regions"):
+    Table(name, metadata, Column("id", Integer, primary_key=True))
+
+Table(
+    "grievances_archive", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("title", String),
+    Column("description", Text),
+    Column("citizen_id", Integer, ForeignKey("users.id")),
+    Column("department_id", Integer, ForeignKey("departments.id"), nullable=True),
+    Column("assignee_id", Integer, ForeignKey("users.id"), nullable=True),
+    Column("region_id", Integer, ForeignKey("regions.id"), nullable=True),
+    Column("status", String),
+    Column("priority", String),
+    Column("category", String, nullable=True),
+    Column("category_ai", String, nullable=True),
+    Column("severity_ai", Float, nullable=True),
+    Column("is_spam", Boolean),
+    Column("privacy_consent", Boolean),
+    Column("location", String, nullable=True),
+    Column("region_code", String, nullable=True),
+    Column("state", String, nullable=True),
+    Column("district", String, nullable=True),
+    Column("created_at", DateTime(timezone=True)),
+    Column("updated_at", DateTime(timezone=True)),
+    Column("sentiment_score", Float, nullable=True),
+    Column("ai_summary", Text, nullable=True),
+    Column("embedding", Text, nullable=True),
+    Column("archived_at", DateTime(timezone=True), server_default=func.now()),
+    Index("ix_grievances_archive_citizen_created", "citizen_id", "created_at"),
+    Index("ix_grievances_archive_assignee", "assignee_id"),
+)
+
+Table(
+    "media_archive", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("grievance_id", Integer, ForeignKey("grievances_archive.id"), index=True),
+    Column("url", String),
+    Column("uploader_id", Integer, ForeignKey("users.id"), nullable=True),
+    Column("type", String),
+    Column("created_at", DateTime(timezone=True)),
+)
+
+Table(
+    "timeline_archive", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("grievance_id", Integer, ForeignKey("grievances_archive.id"), index=True),
+    Column("status", String),
+    Column("remark", Text, nullable=True),
+    Column("created_at", DateTime(timezone=True)),
+)
+
+Table(
+    "feedback_archive", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("grievance_id", Integer, ForeignKey("grievances_archive.id"), unique=True),
+    Column("rating", Integer),
+    Column("comment", Text, nullable=True),
+    Column("created_at", DateTime(timezone=True)),
+)
+
+
+def upgrade(conn):
+    tables = [t for t in metadata.sorted_tables if t.name.endswith("_archive")]
+    metadata.create_all(conn, tables=tables, checkfirst=True)
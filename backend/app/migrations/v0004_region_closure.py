@@ -0,0 +1,36 @@
+"""Closure table over regions.parent_id for hierarchical rollups."""
+from sqlalchemy import text
+
+from . import create_index
+
+VERSION = 4
+DESCRIPTION = "region closure table"
+
+# Every (ancestor, descendant) pair with its distance, including each region
+# paired with itself at depth 0. Depth is capped to stop on parent cycles.
+REBUILD_SQL = """
+WITH RECURSIVE tree(ancestor_id, descendant_id, depth) AS (
+    SELECT id, id, 0 FROM regions
+    UNION ALL
+    SELECT tree.ancestor_id, regions.id, tree.depth + 1
+    FROM tree JOIN regions ON regions.parent_id = tree.descendant_id
+    WHERE tree.depth < 32
+)
+INSERT INTO region_closure (ancestor_id, descendant_id, depth)
+SELECT ancestor_id, descendant_id, MIN(depth) FROM tree GROUP BY ancestor_id, descendant_id
+"""
+
+
+def upgrade(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS region_closure ("
+        "ancestor_id INTEGER NOT NULL REFERENCES regions(id), "
+        "descendant_id INTEGER NOT NULL REFERENCES regions(id), "
+        "depth INTEGER NOT NULL, "
+        "PRIMARY KEY (ancestor_id, descendant_id))"
+    ))
+    create_index(conn, "ix_region_closure_descendant", "region_closure", ["descendant_id", "depth"])
+    # Rollups join the closure on grievances.region_id.
+    create_index(conn, "ix_grievances_region_status", "grievances", ["region_id", "status"])
+    conn.execute(text("DELETE FROM region_closure"))
+    conn.execute(text(REBUILD_SQL))
@@ -0,0 +1,11 @@
+"""Submission coordinates on grievances, used to resolve region_id."""
+from . import add_column
+
+VERSION = 5
+DESCRIPTION = "grievance coordinates"
+
+
+def upgrade(conn):
+    for table in ("grievances", "grievances_archive"):
+        add_column(conn, table, "lat", "FLOAT")
+        add_column(conn, table, "lng", "FLOAT")
@@ -0,0 +1,19 @@
+"""Persistent cache of geocoded grievance locations."""
+from sqlalchemy import text
+
+VERSION = 6
+DESCRIPTION = "geocode cache"
+
+
+def upgrade(conn):
+    # lat/lng are NULL for locations the gazetteer could not place, so misses
+    # are not looked up again either.
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS geocode_cache ("
+        "normalized VARCHAR PRIMARY KEY, "
+        "lat FLOAT, "
+        "lng FLOAT, "
+        "region_id INTEGER REFERENCES regions(id), "
+        "matched VARCHAR, "
+        "created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP)"
+    ))
@@ -0,0 +1,27 @@
+"""Per-bucket quantile sketches of time to resolution."""
+from sqlalchemy import Column, Date, DateTime, Index, Integer, MetaData, String, Table, Text, func
+
+VERSION = 7
+DESCRIPTION = "resolution time sketches"
+
+metadata = MetaData()
+
+# Missing dimensions are stored as 0 / '' rather than NULL so that the
+# unique index identifies each bucket.
+resolution_sketches = Table(
+    "resolution_sketches", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("month", Date, nullable=False),
+    Column("department_id", Integer, nullable=False, server_default="0"),
+    Column("state", String, nullable=False, server_default=""),
+    Column("district", String, nullable=False, server_default=""),
+    Column("category", String, nullable=False, server_default=""),
+    Column("count", Integer, nullable=False, server_default="0"),
+    Column("sketch", Text, nullable=False),
+    Column("updated_at", DateTime(timezone=True), server_default=func.now()),
+    Index("ux_resolution_sketches_bucket", "month", "department_id", "state", "district", "category", unique=True),
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn, tables=[resolution_sketches], checkfirst=True)
@@ -0,0 +1,36 @@
+"""Hourly and daily grievance counts per status, category and state."""
+from sqlalchemy import Column, Date, DateTime, Index, Integer, MetaData, String, Table
+
+VERSION = 8
+DESCRIPTION = "grievance trend rollups"
+
+metadata = MetaData()
+
+# Missing categories and states are stored as '' so that the unique index
+# identifies each bucket. Its leading status/time columns also serve the
+# trend query's range scan.
+grievance_counts_hourly = Table(
+    "grievance_counts_hourly", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("status", String, nullable=False),
+    Column("hour", DateTime(timezone=True), nullable=False),
+    Column("category", String, nullable=False, server_default=""),
+    Column("state", String, nullable=False, server_default=""),
+    Column("count", Integer, nullable=False, server_default="0"),
+    Index("ux_grievance_counts_hourly_bucket", "status", "hour", "category", "state", unique=True),
+)
+
+grievance_counts_daily = Table(
+    "grievance_counts_daily", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("status", String, nullable=False),
+    Column("day", Date, nullable=False),
+    Column("category", String, nullable=False, server_default=""),
+    Column("state", String, nullable=False, server_default=""),
+    Column("count", Integer, nullable=False, server_default="0"),
+    Index("ux_grievance_counts_daily_bucket", "status", "day", "category", "state", unique=True),
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn, tables=[grievance_counts_hourly, grievance_counts_daily], checkfirst=True)
@@ -0,0 +1,68 @@
+"""Store grievance status, priority, category and user role as SMALLINT codes."""
+from sqlalchemy import String, inspect, text
+
+VERSION = 9
+DESCRIPTION = "enum columns as smallint codes"
+
+# Codes as of this version; app.models.EnumCode numbers enum members from 1
+# in declaration order, and new members are only ever appended.
+STATUS = ["New", "Assigned", "In Progress", "Pending Verification", "Resolved", "Closed", "Escalated", "Rejected", "Spam"]
+PRIORITY = ["Low", "Medium", "High", "Critical"]
+CATEGORY = ["Sanitation", "Roads", "Water Supply", "Electricity", "Law & Order", "Other"]
+ROLE = ["Citizen", "FieldOfficer", "Admin", "ZonalOfficer", "PolicyMaker", "Auditor"]
+
+GRIEVANCE_COLUMNS = {"status": STATUS, "priority": PRIORITY, "category": CATEGORY, "category_ai": CATEGORY}
+COLUMNS = {
+    "grievances": GRIEVANCE_COLUMNS,
+    "grievances_archive": GRIEVANCE_COLUMNS,
+    "users": {"role": ROLE},
+}
+
+
+def _quote(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _case(column: str, values) -> str:
+    whens = " ".join(f"WHEN {column} = {_quote(value)} THEN {code}" for code, value in enumerate(values, start=1))
+    # Categories outside the list were free text from the classifier; they
+    # become Other, as new ones do.
+    fallback = str(values.index("Other") + 1) if values is CATEGORY else "NULL"
+    return f"CASE WHEN {column} IS NULL THEN NULL {whens} ELSE {fallback} END"
+
+
+def _string_columns(conn, table: str, columns) -> list:
+    """Columns of `table` still stored as strings, so reruns skip the rest."""
+    types = {column["name"]: column["type"] for column in inspect(conn).get_columns(table)}
+    return [name for name in columns if isinstance(types.get(name), String)]
+
+
+def upgrade(conn):
+    postgres = conn.dialect.name == "postgresql"
+    for table, columns in COLUMNS.items():
+        pending = _string_columns(conn, table, columns)
+        if not pending:
+            continue
+        if postgres:
+            # One rewrite of the table; dependent indexes are rebuilt with it.
+            conn.execute(text(f"ALTER TABLE {table} " + ", ".join(
+                f"ALTER COLUMN {column} TYPE SMALLINT USING ({_case(column, columns[column])})" for column in pending
+            )))
+            continue
+
+        # SQLite cannot change a column's type: add a SMALLINT column, copy
+        # the codes across, drop the old column and take over its name.
+        # Indexes on the old column have to go first and come back after.
+        indexes = [index for index in inspect(conn).get_indexes(table) if set(index["column_names"]) & set(pending)]
+        for index in indexes:
+            conn.execute(text(f"DROP INDEX IF EXISTS {index['name']}"))
+        for column in pending:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column}__code SMALLINT"))
+            conn.execute(text(f"UPDATE {table} SET {column}__code = {_case(column, columns[column])}"))
+            conn.execute(text(f"ALTER TABLE {table} DROP COLUMN {column}"))
+            conn.execute(text(f"ALTER TABLE {table} RENAME COLUMN {column}__code TO {column}"))
+        for index in indexes:
+            unique = "UNIQUE " if index.get("unique") else ""
+            conn.execute(text(
+                f"CREATE {unique}INDEX IF NOT EXISTS {index['name']} ON {table} ({', '.join(index['column_names'])})"
+            ))
@@ -0,0 +1,27 @@
+"""Stored responses of requests sent with an Idempotency-Key header."""
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, Text, func
+
+VERSION = 10
+DESCRIPTION = "idempotency keys"
+
+metadata = MetaData()
+
+# status_code is NULL while the first request with a key is still running.
+idempotency_keys = Table(
+    "idempotency_keys", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("owner", String, nullable=False),
+    Column("key", String, nullable=False),
+    Column("request_hash", String, nullable=False),
+    Column("status_code", Integer, nullable=True),
+    Column("content_type", String, nullable=True),
+    Column("response", Text, nullable=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("expires_at", DateTime(timezone=True), nullable=False),
+    Index("ux_idempotency_keys_owner_key", "owner", "key", unique=True),
+    Index("ix_idempotency_keys_expires_at", "expires_at"),
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn, tables=[idempotency_keys], checkfirst=True)
@@ -0,0 +1,28 @@
+"""Transactional outbox of citizen notifications."""
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, Text, func
+
+VERSION = 11
+DESCRIPTION = "notification outbox"
+
+metadata = MetaData()
+
+notification_outbox = Table(
+    "notification_outbox", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("channel", String, nullable=False),
+    Column("recipient", String, nullable=False),
+    Column("dedupe_key", String, nullable=False),
+    Column("payload", Text, nullable=False),
+    Column("status", String, nullable=False, server_default="pending"),
+    Column("attempts", Integer, nullable=False, server_default="0"),
+    Column("next_attempt_at", DateTime(timezone=True), nullable=False),
+    Column("last_error", Text, nullable=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("sent_at", DateTime(timezone=True), nullable=True),
+    Index("ux_notification_outbox_dedupe_key", "dedupe_key", unique=True),
+    Index("ix_notification_outbox_due", "status", "channel", "next_attempt_at"),
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn, tables=[notification_outbox], checkfirst=True)
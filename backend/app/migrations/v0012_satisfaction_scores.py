@@ -0,0 +1,27 @@
+"""Running feedback rating aggregates per department, officer and district."""
+from sqlalchemy import Column, DateTime, Float, Index, Integer, MetaData, String, Table, func
+
+VERSION = 12
+DESCRIPTION = "satisfaction scores"
+
+metadata = MetaData()
+
+# key is the department or officer id, or "state|district".
+satisfaction_scores = Table(
+    "satisfaction_scores", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("scope", String, nullable=False),
+    Column("key", String, nullable=False),
+    Column("rating_count", Integer, nullable=False, server_default="0"),
+    Column("rating_sum", Integer, nullable=False, server_default="0"),
+    Column("rating_sum_squares", Integer, nullable=False, server_default="0"),
+    *[Column(f"rating_{star}", Integer, nullable=False, server_default="0") for star in range(1, 6)],
+    Column("mean", Float, nullable=True),
+    Column("updated_at", DateTime(timezone=True), server_default=func.now()),
+    Index("ux_satisfaction_scores_scope_key", "scope", "key", unique=True),
+    Index("ix_satisfaction_scores_scope_mean", "scope", "mean"),
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn, tables=[satisfaction_scores], checkfirst=True)
@@ -0,0 +1,22 @@
+"""Store idempotent responses as bytes, with their Content-Encoding."""
+from sqlalchemy import LargeBinary, inspect, text
+
+from . import add_column
+
+VERSION = 13
+DESCRIPTION = "idempotency binary responses"
+
+
+def upgrade(conn):
+    add_column(conn, "idempotency_keys", "content_encoding", "VARCHAR")
+    types = {column["name"]: column["type"] for column in inspect(conn).get_columns("idempotency_keys")}
+    if isinstance(types["response"], LargeBinary):
+        return
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(
+            "ALTER TABLE idempotency_keys ALTER COLUMN response TYPE BYTEA USING convert_to(response, 'UTF8')"
+        ))
+    else:
+        # SQLite keeps the declared TEXT type but stores blobs as they are;
+        # stored responses only need converting.
+        conn.execute(text("UPDATE idempotency_keys SET response = CAST(response AS BLOB) WHERE response IS NOT NULL"))
@@ -1,4 +1,5 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, Text, Float, Enum
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, SmallInteger, String, Date, DateTime, Text, Float, Enum, Index, LargeBinary, UniqueConstraint
+from sqlalchemy.types import TypeDecorator
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -29,6 +30,46 @@ class Priority(str, enum.Enum):
     HIGH = "High"
     CRITICAL = "Critical"
 
+class Category(str, enum.Enum):
+    SANITATION = "Sanitation"
+    ROADS = "Roads"
+    WATER_SUPPLY = "Water Supply"
+    ELECTRICITY = "Electricity"
+    LAW_AND_ORDER = "Law & Order"
+    OTHER = "Other"
+
+class EnumCode(TypeDecorator):
+    """
+    Stores a str enum as a SMALLINT while the ORM, filters and API keep
+    using its string values. Codes follow declaration order from 1 and are
+    mirrored in migration 0009, so new members must be appended. Values
+    outside the enum are stored as `fallback` when given, else rejected.
+    """
+
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, enum_class, fallback=None):
+        super().__init__()
+        self.enum_class = enum_class
+        self.fallback = fallback
+        self.codes = {member.value: code for code, member in enumerate(enum_class, start=1)}
+        self.values = {code: value for value, code in self.codes.items()}
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        value = getattr(value, "value", value)
+        code = self.codes.get(value)
+        if code is None:
+            if self.fallback is None:
+                raise ValueError(f"{value!r} is not a valid {self.enum_class.__name__}")
+            code = self.codes[self.fallback.value]
+        return code
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else self.values.get(value)
+
 class Region(Base):
     __tablename__ = "regions"
 
@@ -44,14 +85,158 @@ class Region(Base):
     grievances = relationship("Grievance", back_populates="region")
     parent = relationship("Region", remote_side=[id], backref="children")
 
+class RegionClosure(Base):
+    """One row per (ancestor, descendant) pair in the region tree, including
+    each region with itself at depth 0. Maintained by services/regions.py."""
+
+    __tablename__ = "region_closure"
+    __table_args__ = (Index("ix_region_closure_descendant", "descendant_id", "depth"),)
+
+    ancestor_id = Column(Integer, ForeignKey("regions.id"), primary_key=True)
+    descendant_id = Column(Integer, ForeignKey("regions.id"), primary_key=True)
+    depth = Column(Integer, nullable=False)
+
+class GeocodeCache(Base):
+    """Gazetteer result per normalized location string; lat/lng are NULL for
+    locations that could not be placed. Maintained by services/geocoding.py."""
+
+    __tablename__ = "geocode_cache"
+
+    normalized = Column(String, primary_key=True)
+    lat = Column(Float, nullable=True)
+    lng = Column(Float, nullable=True)
+    region_id = Column(Integer, ForeignKey("regions.id"), nullable=True)
+    matched = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class ResolutionSketch(Base):
+    """DDSketch of time to resolution for one (month, department, state,
+    district, category) bucket. Maintained by services/resolution_times.py."""
+
+    __tablename__ = "resolution_sketches"
+    __table_args__ = (
+        Index("ux_resolution_sketches_bucket", "month", "department_id", "state", "district", "category", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    month = Column(Date, nullable=False)
+    department_id = Column(Integer, nullable=False, server_default="0")
+    state = Column(String, nullable=False, server_default="")
+    district = Column(String, nullable=False, server_default="")
+    category = Column(String, nullable=False, server_default="")
+    count = Column(Integer, nullable=False, server_default="0")
+    sketch = Column(Text, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class IdempotencyKey(Base):
+    """Outcome of the first request sent with an Idempotency-Key, replayed
+    to its retries until `expires_at`. Maintained by app/idempotency.py."""
+
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        Index("ux_idempotency_keys_owner_key", "owner", "key", unique=True),
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    owner = Column(String, nullable=False)
+    key = Column(String, nullable=False)
+    request_hash = Column(String, nullable=False)
+    status_code = Column(Integer, nullable=True)
+    content_type = Column(String, nullable=True)
+    content_encoding = Column(String, nullable=True)
+    response = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+class NotificationOutbox(Base):
+    """A citizen notification written in the same transaction as the
+    Timeline row it announces, sent later by services/notifications.py."""
+
+    __tablename__ = "notification_outbox"
+    __table_args__ = (
+        Index("ux_notification_outbox_dedupe_key", "dedupe_key", unique=True),
+        Index("ix_notification_outbox_due", "status", "channel", "next_attempt_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    channel = Column(String, nullable=False)
+    recipient = Column(String, nullable=False)
+    dedupe_key = Column(String, nullable=False)
+    payload = Column(Text, nullable=False)
+    status = Column(String, nullable=False, server_default="pending")
+    attempts = Column(Integer, nullable=False, server_default="0")
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+class SatisfactionScore(Base):
+    """Feedback rating count, sum, sum of squares and 1-5 histogram for one
+    department, officer or district (`key` is the id, or "state|district").
+    Maintained by services/satisfaction.py."""
+
+    __tablename__ = "satisfaction_scores"
+    __table_args__ = (
+        Index("ux_satisfaction_scores_scope_key", "scope", "key", unique=True),
+        Index("ix_satisfaction_scores_scope_mean", "scope", "mean"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    scope = Column(String, nullable=False)
+    key = Column(String, nullable=False)
+    rating_count = Column(Integer, nullable=False, server_default="0")
+    rating_sum = Column(Integer, nullable=False, server_default="0")
+    rating_sum_squares = Column(Integer, nullable=False, server_default="0")
+    rating_1 = Column(Integer, nullable=False, server_default="0")
+    rating_2 = Column(Integer, nullable=False, server_default="0")
+    rating_3 = Column(Integer, nullable=False, server_default="0")
+    rating_4 = Column(Integer, nullable=False, server_default="0")
+    rating_5 = Column(Integer, nullable=False, server_default="0")
+    mean = Column(Float, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class GrievanceCountHourly(Base):
+    """Status changes per hour (UTC), category and state; "New" counts
+    submissions. Maintained by services/trends.py."""
+
+    __tablename__ = "grievance_counts_hourly"
+    __table_args__ = (
+        Index("ux_grievance_counts_hourly_bucket", "status", "hour", "category", "state", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    status = Column(String, nullable=False)
+    hour = Column(DateTime(timezone=True), nullable=False)
+    category = Column(String, nullable=False, server_default="")
+    state = Column(String, nullable=False, server_default="")
+    count = Column(Integer, nullable=False, server_default="0")
+
+class GrievanceCountDaily(Base):
+    """Status changes per day (UTC), category and state. Maintained by
+    services/trends.py."""
+
+    __tablename__ = "grievance_counts_daily"
+    __table_args__ = (
+        Index("ux_grievance_counts_daily_bucket", "status", "day", "category", "state", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    status = Column(String, nullable=False)
+    day = Column(Date, nullable=False)
+    category = Column(String, nullable=False, server_default="")
+    state = Column(String, nullable=False, server_default="")
+    count = Column(Integer, nullable=False, server_default="0")
+
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (Index("ix_users_role_department", "role", "department_id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True)
     hashed_password = Column(String)
     full_name = Column(String)
-    role = Column(String, default=UserRole.CITIZEN)
+    role = Column(EnumCode(UserRole), default=UserRole.CITIZEN)
     is_active = Column(Boolean, default=True)
     phone_number = Column(String, nullable=True)
     
@@ -78,6 +263,16 @@ class Department(Base):
 
 class Grievance(Base):
     __tablename__ = "grievances"
+    # Kept in step with the indexes created in app/migrations/
+    __table_args__ = (
+        Index("ix_grievances_assignee_status", "assignee_id", "status"),
+        Index("ix_grievances_citizen_created", "citizen_id", "created_at"),
+        Index("ix_grievances_status_priority", "status", "priority"),
+        Index("ix_grievances_state_district_status", "state", "district", "status"),
+        Index("ix_grievances_department_status", "department_id", "status"),
+        Index("ix_grievances_created_at", "created_at"),
+        Index("ix_grievances_region_status", "region_id", "status"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True)
@@ -87,11 +282,11 @@ class Grievance(Base):
     assignee_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     region_id = Column(Integer, ForeignKey("regions.id"), nullable=True)
     
-    status = Column(String, default=GrievanceStatus.NEW)
-    priority = Column(String, default=Priority.LOW)
-    category = Column(String, nullable=True)
+    status = Column(EnumCode(GrievanceStatus), default=GrievanceStatus.NEW)
+    priority = Column(EnumCode(Priority), default=Priority.LOW)
+    category = Column(EnumCode(Category, fallback=Category.OTHER), nullable=True)
     
-    category_ai = Column(String, nullable=True)
+    category_ai = Column(EnumCode(Category, fallback=Category.OTHER), nullable=True)
     severity_ai = Column(Float, nullable=True)
     is_spam = Column(Boolean, default=False)
     privacy_consent = Column(Boolean, default=False)
@@ -100,6 +295,8 @@ class Grievance(Base):
     region_code = Column(String, nullable=True) 
     state = Column(String, nullable=True)
     district = Column(String, nullable=True)
+    lat = Column(Float, nullable=True)
+    lng = Column(Float, nullable=True)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -118,6 +315,7 @@ class Grievance(Base):
 
 class Media(Base):
     __tablename__ = "media"
+    __table_args__ = (Index("ix_media_grievance_id", "grievance_id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     grievance_id = Column(Integer, ForeignKey("grievances.id"))
@@ -130,6 +328,7 @@ class Media(Base):
 
 class Timeline(Base):
     __tablename__ = "timeline"
+    __table_args__ = (Index("ix_timeline_grievance_id", "grievance_id", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     grievance_id = Column(Integer, ForeignKey("grievances.id"))
@@ -149,3 +348,90 @@ class Feedback(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     grievance = relationship("Grievance", back_populates="feedback")
+
+class ChatConversation(Base):
+    __tablename__ = "chat_conversations"
+    __table_args__ = (UniqueConstraint("user_id", "conversation_id"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    conversation_id = Column(String)
+    summary = Column(Text, nullable=True)
+    turns = Column(Text, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True)
+
+# Cold storage for grievances that have been resolved or closed for longer
+# than ARCHIVE_AFTER_DAYS (see app/services/archive.py). Columns mirror the
+# hot tables so rows can be moved with INSERT ... SELECT and serialized with
+# the same schemas.
+
+class ArchivedGrievance(Base):
+    __tablename__ = "grievances_archive"
+    __table_args__ = (
+        Index("ix_grievances_archive_citizen_created", "citizen_id", "created_at"),
+        Index("ix_grievances_archive_assignee", "assignee_id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    title = Column(String)
+    description = Column(Text)
+    citizen_id = Column(Integer, ForeignKey("users.id"))
+    department_id = Column(Integer, ForeignKey("departments.id"), nullable=True)
+    assignee_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    region_id = Column(Integer, ForeignKey("regions.id"), nullable=True)
+
+    status = Column(EnumCode(GrievanceStatus))
+    priority = Column(EnumCode(Priority))
+    category = Column(EnumCode(Category, fallback=Category.OTHER), nullable=True)
+
+    category_ai = Column(EnumCode(Category, fallback=Category.OTHER), nullable=True)
+    severity_ai = Column(Float, nullable=True)
+    is_spam = Column(Boolean, default=False)
+    privacy_consent = Column(Boolean, default=False)
+
+    location = Column(String, nullable=True)
+    region_code = Column(String, nullable=True)
+    state = Column(String, nullable=True)
+    district = Column(String, nullable=True)
+    lat = Column(Float, nullable=True)
+    lng = Column(Float, nullable=True)
+
+    created_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True))
+
+    sentiment_score = Column(Float, nullable=True)
+    ai_summary = Column(Text, nullable=True)
+    embedding = Column(Text, nullable=True)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    feedback = relationship("ArchivedFeedback", uselist=False)
+    media = relationship("ArchivedMedia")
+    timeline = relationship("ArchivedTimeline", order_by="ArchivedTimeline.id")
+
+class ArchivedMedia(Base):
+    __tablename__ = "media_archive"
+
+    id = Column(Integer, primary_key=True)
+    grievance_id = Column(Integer, ForeignKey("grievances_archive.id"), index=True)
+    url = Column(String)
+    uploader_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    type = Column(String)
+    created_at = Column(DateTime(timezone=True))
+
+class ArchivedTimeline(Base):
+    __tablename__ = "timeline_archive"
+
+    id = Column(Integer, primary_key=True)
+    grievance_id = Column(Integer, ForeignKey("grievances_archive.id"), index=True)
+    status = Column(String)
+    remark = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True))
+
+class ArchivedFeedback(Base):
+    __tablename__ = "feedback_archive"
+
+    id = Column(Integer, primary_key=True)
+    grievance_id = Column(Integer, ForeignKey("grievances_archive.id"), unique=True)
+    rating = Column(Integer)
+    comment = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True))
@@ -0,0 +1,112 @@
+import contextvars
+import os
+import re
+import time
+import weakref
+from collections import Counter
+from typing import Optional
+
+from sqlalchemy import event
+
+DB_PROFILE = os.getenv("DB_PROFILE", "0") == "1"
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+N_PLUS_ONE_RAISE = os.getenv("N_PLUS_ONE_RAISE", "0") == "1"
+DB_PROFILE_SUMMARY = os.getenv("DB_PROFILE_SUMMARY", "1") == "1"
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+_request_profile: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar("request_profile", default=None)
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+def _route(scope) -> str:
+    route = scope.get("route") if scope else None
+    return getattr(route, "path", None) or (scope or {}).get("path", "none")
+
+
+def _shorten(statement: str, limit: int = 300) -> str:
+    statement = _WHITESPACE_RE.sub(" ", statement).strip()
+    return statement if len(statement) <= limit else statement[:limit] + "..."
+
+
+class RequestProfile:
+    def __init__(self, scope):
+        self.scope = scope
+        self.queries = 0
+        self.seconds = 0.0
+        self.statements: Counter = Counter()
+        self.reported = set()
+
+    @property
+    def route(self) -> str:
+        return f"{self.scope['method']} {_route(self.scope)}"
+
+    def record(self, statement: str, elapsed: float):
+        self.queries += 1
+        self.seconds += elapsed
+        self.statements[statement] += 1
+        count = self.statements[statement]
+        # Bound parameters are not part of the statement text, so the same
+        # SELECT issued once per row shows up as one repeated statement.
+        if count >= N_PLUS_ONE_THRESHOLD and statement not in self.reported:
+            self.reported.add(statement)
+            message = f"Possible N+1 on {self.route}: statement ran {count}+ times: {_shorten(statement)}"
+            print(f"⚠️  {message}")
+            if N_PLUS_ONE_RAISE:
+                raise NPlusOneError(message)
+
+    def summary(self) -> str:
+        lines = [f"[db] {self.route}: {self.queries} queries in {self.seconds * 1000:.1f} ms"]
+        for statement, count in self.statements.most_common(3):
+            if count > 1:
+                lines.append(f"[db]   {count}x {_shorten(statement, 120)}")
+        return "\n".join(lines)
+
+
+_attached = weakref.WeakSet()
+
+
+def attach(engine):
+    """Log slow statements and track repeated statements per request."""
+    # Already attached by an earlier lifespan of the app.
+    if engine in _attached:
+        return
+    _attached.add(engine)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("profile_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["profile_start_time"].pop()
+        profile = _request_profile.get()
+        if elapsed * 1000 >= SLOW_QUERY_MS:
+            route = profile.route if profile else "no request"
+            print(f"🐢 Slow query ({elapsed * 1000:.1f} ms) on {route}: {_shorten(statement)}")
+        if profile is not None:
+            profile.record(statement, elapsed)
+
+
+class ProfilerMiddleware:
+    """Pure ASGI middleware that scopes query tracking to a single request and
+    prints a per-request query summary when DB_PROFILE_SUMMARY is on."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        profile = RequestProfile(scope)
+        token = _request_profile.set(profile)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_profile.reset(token)
+            if DB_PROFILE_SUMMARY and profile.queries:
+                print(profile.summary())
@@ -0,0 +1,207 @@
+import json
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from . import auth
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+RATE_LIMIT_TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "0") == "1"
+RATE_LIMIT_RULES = os.getenv("RATE_LIMIT_RULES", "")
+
+ANONYMOUS = "anonymous"
+
+# (method, path) -> {role: (tokens per second, burst)}. "*" is the fallback for
+# authenticated roles without their own entry; ANONYMOUS applies to callers
+# without a valid bearer token, who are keyed by IP address.
+DEFAULT_RULES: Dict[Tuple[str, str], Dict[str, Tuple[float, int]]] = {
+    ("POST", "/grievance/"): {"*": (0.2, 5), ANONYMOUS: (0.05, 2)},
+    ("POST", "/chat/"): {"*": (0.5, 10), ANONYMOUS: (0.1, 3)},
+    ("POST", "/chat/stream"): {"*": (0.5, 10), ANONYMOUS: (0.1, 3)},
+    ("GET", "/admin/heatmap"): {"*": (1.0, 5), "Admin": (2.0, 10), ANONYMOUS: (0.2, 3)},
+}
+
+
+def load_rules(raw: str = RATE_LIMIT_RULES) -> Dict[Tuple[str, str], Dict[str, Tuple[float, int]]]:
+    """
+    RATE_LIMIT_RULES overrides the defaults with JSON such as
+    {"POST /grievance/": {"*": [0.2, 5], "anonymous": [0.05, 2]}}.
+    """
+    if not raw:
+        return DEFAULT_RULES
+    rules = {}
+    for route, limits in json.loads(raw).items():
+        method, path = route.split(" ", 1)
+        rules[(method.upper(), path)] = {role: (float(rate), int(burst)) for role, (rate, burst) in limits.items()}
+    return rules
+
+
+class InMemoryBackend:
+    """Token buckets local to one worker process."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: Dict[str, list] = {}
+
+    async def acquire(self, key: str, rate: float, burst: int) -> Tuple[bool, float]:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._sweep(now)
+            bucket = self._buckets[key] = [float(burst), now]
+        else:
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return True, 0.0
+        return False, (1 - bucket[0]) / rate
+
+    def _sweep(self, now: float):
+        # Drop buckets idle long enough to have refilled; they carry no state.
+        idle = [key for key, (_, last) in self._buckets.items() if now - last > 3600]
+        for key in idle:
+            del self._buckets[key]
+        if len(self._buckets) >= self.max_keys:
+            self._buckets.clear()
+
+
+class RedisBackend:
+    """Token buckets shared by every worker through Redis."""
+
+    SCRIPT = """
+local tokens = tonumber(redis.call('HGET', KEYS[1], 't') or ARGV[2])
+local last = tonumber(redis.call('HGET', KEYS[1], 'l') or ARGV[3])
+local rate, burst, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+tokens = math.min(burst, tokens + math.max(0, now - last) * rate)
+local allowed = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 't', tokens, 'l', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+    def __init__(self, url: str = RATE_LIMIT_REDIS_URL, prefix: str = "civicpulse:ratelimit:"):
+        self.url = url
+        self.prefix = prefix
+        self._client = None
+        self._script = None
+
+    async def acquire(self, key: str, rate: float, burst: int) -> Tuple[bool, float]:
+        try:
+            if self._client is None:
+                import redis.asyncio as aioredis
+
+                self._client = aioredis.from_url(self.url)
+                self._script = self._client.register_script(self.SCRIPT)
+            allowed, tokens = await self._script(keys=[self.prefix + key], args=[rate, burst, time.time()])
+        except Exception as e:
+            # Fail open: an unavailable limiter must not take the API down with it.
+            print(f"Rate limit error: {e}")
+            return True, 0.0
+        if int(allowed):
+            return True, 0.0
+        return False, (1 - float(tokens)) / rate
+
+
+def _create_backend():
+    if RATE_LIMIT_BACKEND == "redis":
+        return RedisBackend()
+    return InMemoryBackend()
+
+
+class RateLimitMiddleware:
+    """
+    Pure ASGI token-bucket limiter. Requests to routes without a rule are
+    passed straight through; limited routes are keyed by JWT subject, or by
+    client IP for anonymous callers, and throttled requests get a 429 with a
+    Retry-After header.
+    """
+
+    def __init__(self, app, rules=None, backend=None, principal_cache_size: int = 10_000):
+        self.app = app
+        self.rules = rules if rules is not None else load_rules()
+        self.backend = backend or _create_backend()
+        self.principal_cache_size = principal_cache_size
+        self._principals: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        limits = self.rules.get((scope["method"], scope["path"]))
+        if limits is None:
+            return await self.app(scope, receive, send)
+
+        subject, role = self._principal(scope)
+        limit = limits.get(role) or limits.get("*")
+        if limit is None:
+            return await self.app(scope, receive, send)
+        rate, burst = limit
+        key = f"{scope['method']} {scope['path']}|{subject}"
+        allowed, retry_after = await self.backend.acquire(key, rate, burst)
+        if allowed:
+            return await self.app(scope, receive, send)
+
+        body = b'{"detail":"Too many requests"}'
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    def _principal(self, scope) -> Tuple[str, str]:
+        token = None
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                value = value.decode("latin-1")
+                if value[:7].lower() == "bearer ":
+                    token = value[7:]
+                break
+        if token:
+            principal = self._principals.get(token)
+            if principal is None:
+                principal = self._decode(token)
+                if principal is not None:
+                    self._principals[token] = principal
+                    if len(self._principals) > self.principal_cache_size:
+                        self._principals.popitem(last=False)
+            if principal is not None:
+                return principal
+        return f"ip:{self._client_ip(scope)}", ANONYMOUS
+
+    @staticmethod
+    def _decode(token: str) -> Optional[Tuple[str, str]]:
+        # Signature is verified once per token; the result is cached so the hot
+        # path is a dict lookup.
+        from jose import JWTError, jwt
+
+        try:
+            payload = jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
+        except JWTError:
+            return None
+        subject = payload.get("sub")
+        if not subject:
+            return None
+        return f"sub:{subject}", payload.get("role") or "*"
+
+    @staticmethod
+    def _client_ip(scope) -> str:
+        if RATE_LIMIT_TRUST_PROXY:
+            for name, value in scope["headers"]:
+                if name == b"x-forwarded-for":
+                    return value.decode("latin-1").split(",")[0].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date, datetime, timedelta, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from .. import models, schemas, database, auth
+from .. import models, schemas, database, auth, cache
+from ..services import events, regions, resolution_times, satisfaction, trends
 
 router = APIRouter(
     prefix="/admin",
@@ -61,12 +64,14 @@ def assign_grievance(
 
     db.commit()
     db.refresh(db_grievance)
+    events.publish_timeline(db_grievance, db_timeline)
     return db_grievance
 
-from sqlalchemy import func, desc
+from sqlalchemy import func, desc, case
 
 @router.get("/dashboard", response_model=schemas.DashboardStats)
-def get_dashboard_stats(db: Session = Depends(database.get_db)):
+@cache.cached("admin.dashboard", tags=["grievances"])
+def get_dashboard_stats(db: Session = Depends(database.get_read_db)):
     total = db.query(models.Grievance).count()
     open_count = db.query(models.Grievance).filter(models.Grievance.status != models.GrievanceStatus.RESOLVED).count()
     resolved_count = db.query(models.Grievance).filter(models.Grievance.status == models.GrievanceStatus.RESOLVED).count()
@@ -150,6 +155,8 @@ def verify_grievance(
         raise HTTPException(status_code=400, detail="Grievance is not pending verification")
         
     db_grievance.status = models.GrievanceStatus.RESOLVED
+    # Before the new timeline entry is flushed: only the first resolution counts.
+    resolution_times.record_resolution(db.connection(), db_grievance)
     
     db_timeline = models.Timeline(
         grievance_id=db_grievance.id,
@@ -160,6 +167,7 @@ def verify_grievance(
     
     db.commit()
     db.refresh(db_grievance)
+    events.publish_timeline(db_grievance, db_timeline)
     return db_grievance
 
 class HeatmapPoint(BaseModel):
@@ -169,23 +177,37 @@ class HeatmapPoint(BaseModel):
     count: int
 
 @router.get("/heatmap", response_model=List[HeatmapPoint])
-def get_heatmap_data(db: Session = Depends(database.get_db)):
-    grievances = db.query(models.Grievance).all()
-    
+@cache.cached("admin.heatmap", tags=["grievances", "regions"])
+def get_heatmap_data(db: Session = Depends(database.get_read_db)):
+    # Aggregate in SQL per region and take coordinates from the in-memory
+    # region tree instead of loading every grievance and its region.
+    rows = (
+        db.query(
+            models.Grievance.region_id,
+            func.count(models.Grievance.id),
+            func.sum(models.Grievance.severity_ai),
+        )
+        .filter(models.Grievance.region_id.isnot(None))
+        .group_by(models.Grievance.region_id)
+        .all()
+    )
+
     region_data = {}
-    for g in grievances:
-        if g.region and g.region.lat and g.region.lng:
-            region_key = f"{g.region.lat},{g.region.lng}"
+    conn = db.connection()
+    regions.hierarchy.sync(conn)
+    for region_id, count, total_severity in rows:
+        region = regions.hierarchy.get(region_id, conn)
+        if region and region.lat and region.lng:
+            region_key = f"{region.lat},{region.lng}"
             if region_key not in region_data:
                 region_data[region_key] = {
-                    "lat": g.region.lat,
-                    "lng": g.region.lng,
+                    "lat": region.lat,
+                    "lng": region.lng,
                     "count": 0,
                     "total_severity": 0.0
                 }
-            region_data[region_key]["count"] += 1
-            if g.severity_ai:
-                region_data[region_key]["total_severity"] += g.severity_ai
+            region_data[region_key]["count"] += count
+            region_data[region_key]["total_severity"] += total_severity or 0.0
     
     heatmap_points = []
     for key, data in region_data.items():
@@ -208,7 +230,8 @@ class DistrictCount(BaseModel):
     count: int
 
 @router.get("/grievance-counts/states", response_model=List[StateCount])
-def get_state_counts(db: Session = Depends(database.get_db)):
+@cache.cached("admin.state_counts", tags=["grievances"])
+def get_state_counts(db: Session = Depends(database.get_read_db)):
     """
     Get total grievance count for each state (aggregated across all districts).
     """
@@ -228,9 +251,10 @@ def get_state_counts(db: Session = Depends(database.get_db)):
     ]
 
 @router.get("/grievance-counts/districts", response_model=List[DistrictCount])
+@cache.cached("admin.district_counts", tags=["grievances"])
 def get_district_counts(
     state: str,
-    db: Session = Depends(database.get_db)
+    db: Session = Depends(database.get_read_db)
 ):
     """
     Get total grievance count for each district in a given state.
@@ -250,3 +274,207 @@ def get_district_counts(
         DistrictCount(district=district, count=count)
         for district, count in district_counts_query
     ]
+
+class RegionRollup(BaseModel):
+    region_id: int
+    code: Optional[str] = None
+    name: Optional[str] = None
+    type: Optional[str] = None
+    parent_id: Optional[int] = None
+    depth: int
+    total: int
+    open: int
+
+@router.get("/region-rollup", response_model=List[RegionRollup])
+def get_region_rollup(
+    region_id: Optional[int] = None,
+    region_code: Optional[str] = None,
+    depth: int = 1,
+    db: Session = Depends(database.get_read_db)
+):
+    """
+    Grievance counts for every region `depth` levels below the given region
+    (or at absolute depth `depth`, 0 being the zones, when none is given),
+    each including all grievances in its sub-regions.
+    """
+    conn = db.connection()
+    regions.hierarchy.sync(conn)
+    if region_code:
+        node = regions.hierarchy.by_code(region_code, conn)
+        if node is None:
+            raise HTTPException(status_code=404, detail="Region not found")
+        region_id = node.id
+    elif region_id is not None and regions.hierarchy.get(region_id, conn) is None:
+        raise HTTPException(status_code=404, detail="Region not found")
+    if depth < 0:
+        raise HTTPException(status_code=400, detail="depth must not be negative")
+
+    nodes = regions.hierarchy.at_depth(depth, under=region_id, conn=conn)
+    if not nodes:
+        return []
+
+    closure = models.RegionClosure
+    closed = [models.GrievanceStatus.RESOLVED, models.GrievanceStatus.CLOSED]
+    rows = (
+        db.query(
+            closure.ancestor_id,
+            func.count(models.Grievance.id),
+            func.sum(case((models.Grievance.status.notin_(closed), 1), else_=0)),
+        )
+        .join(models.Grievance, models.Grievance.region_id == closure.descendant_id)
+        .filter(closure.ancestor_id.in_([node.id for node in nodes]))
+        .group_by(closure.ancestor_id)
+        .all()
+    )
+    counts = {ancestor_id: (total, open_count or 0) for ancestor_id, total, open_count in rows}
+
+    return [
+        RegionRollup(
+            region_id=node.id,
+            code=node.code,
+            name=node.name,
+            type=node.type,
+            parent_id=node.parent_id,
+            depth=node.depth,
+            total=counts.get(node.id, (0, 0))[0],
+            open=counts.get(node.id, (0, 0))[1],
+        )
+        for node in nodes
+    ]
+
+
+class ResolutionTimeStats(BaseModel):
+    department_id: Optional[int] = None
+    state: Optional[str] = None
+    district: Optional[str] = None
+    category: Optional[str] = None
+    count: int
+    mean_hours: float
+    p50_hours: float
+    p90_hours: float
+    p99_hours: float
+
+@router.get("/resolution-times", response_model=List[ResolutionTimeStats])
+def get_resolution_times(
+    group_by: List[str] = Query([]),
+    department_id: Optional[int] = None,
+    state: Optional[str] = None,
+    district: Optional[str] = None,
+    category: Optional[str] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    db: Session = Depends(database.get_read_db)
+):
+    """
+    Time-to-resolution percentiles per combination of `group_by` dimensions
+    (department, state, district, category), or overall when none is given.
+    `since`/`until` select whole months of resolution dates.
+    """
+    unknown = set(group_by) - set(resolution_times.GROUP_BY_COLUMNS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Cannot group by {', '.join(sorted(unknown))}")
+
+    results = []
+    for key, sketch in resolution_times.rollup(
+        db, group_by, department_id, state, district, category, since, until
+    ):
+        if not sketch.count:
+            continue
+        # Buckets store missing dimensions as 0 / ''.
+        key = {column: value or None for column, value in key.items()}
+        results.append(ResolutionTimeStats(
+            **key,
+            count=sketch.count,
+            mean_hours=round(sketch.mean / 3600, 2),
+            p50_hours=round(sketch.quantile(0.5) / 3600, 2),
+            p90_hours=round(sketch.quantile(0.9) / 3600, 2),
+            p99_hours=round(sketch.quantile(0.99) / 3600, 2),
+        ))
+    results.sort(key=lambda stats: stats.count, reverse=True)
+    return results
+
+
+class SatisfactionEntry(BaseModel):
+    scope: str
+    id: Optional[int] = None
+    name: Optional[str] = None
+    state: Optional[str] = None
+    district: Optional[str] = None
+    count: int
+    mean: float
+    stddev: float
+    histogram: List[int]
+
+@router.get("/satisfaction", response_model=List[SatisfactionEntry])
+def get_satisfaction_leaderboard(
+    scope: str = "department",
+    limit: int = Query(10, ge=1, le=100),
+    min_feedback: int = Query(1, ge=1),
+    order: str = "best",
+    db: Session = Depends(database.get_read_db)
+):
+    """
+    Departments, officers or districts (`scope`) ranked by mean feedback
+    rating, `best` or `worst` first, with the count, standard deviation and
+    1-5 star histogram behind each mean.
+    """
+    if scope not in satisfaction.SCOPES:
+        raise HTTPException(status_code=400, detail=f"scope must be one of {', '.join(satisfaction.SCOPES)}")
+    if order not in ("best", "worst"):
+        raise HTTPException(status_code=400, detail="order must be best or worst")
+    return satisfaction.leaderboard(db, scope, limit, min_feedback, ascending=order == "worst")
+
+
+class TrendSeries(BaseModel):
+    key: Optional[str] = None
+    total: int
+    counts: List[int]
+
+class TrendResponse(BaseModel):
+    status: str
+    granularity: str
+    buckets: List[datetime]
+    series: List[TrendSeries]
+
+@router.get("/trends", response_model=TrendResponse)
+def get_trends(
+    status: str = models.GrievanceStatus.NEW.value,
+    granularity: str = "day",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    group_by: Optional[str] = None,
+    category: Optional[str] = None,
+    state: Optional[str] = None,
+    max_points: Optional[int] = Query(None, ge=1),
+    db: Session = Depends(database.get_read_db)
+):
+    """
+    Grievances reaching `status` (default New, i.e. submissions) per UTC
+    hour, day, week or month, optionally one series per category or state.
+    Defaults to the last 7 days hourly or the last 365 days otherwise.
+    """
+    if status not in {s.value for s in models.GrievanceStatus}:
+        raise HTTPException(status_code=400, detail=f"Unknown status {status}")
+    if granularity not in trends.GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of {', '.join(trends.GRANULARITIES)}")
+    if group_by is not None and group_by not in trends.GROUP_BY_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of {', '.join(trends.GROUP_BY_COLUMNS)}")
+
+    until = until or datetime.now(timezone.utc)
+    since = since or until - timedelta(days=7 if granularity == "hour" else 365)
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if until.tzinfo is None:
+        until = until.replace(tzinfo=timezone.utc)
+    if since >= until:
+        raise HTTPException(status_code=400, detail="since must be before until")
+    if granularity == "hour" and until - since > timedelta(days=trends.TREND_MAX_HOURLY_DAYS):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Hourly trends cover at most {trends.TREND_MAX_HOURLY_DAYS} days; use a coarser granularity",
+        )
+
+    buckets, counts = trends.series(db, status, granularity, since, until, group_by, category, state, max_points)
+    series = [TrendSeries(key=key, total=sum(values), counts=values) for key, values in counts.items()]
+    series.sort(key=lambda item: item.total, reverse=True)
+    return TrendResponse(status=status, granularity=granularity, buckets=buckets, series=series)
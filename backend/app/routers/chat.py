@@ -1,22 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Optional
 from sqlalchemy.orm import Session
-import google.generativeai as genai
-import os
-from dotenv import load_dotenv
-from .. import database, auth, models
-
-load_dotenv()
+import json
+import time
+from .. import auth, database, models
+from ..services.ai_provider import provider, ProviderError
+from ..services.conversation_store import Conversation, store
+from ..services.intent_router import router as intent_router
 
 router = APIRouter(
     prefix="/chat",
     tags=["chat"]
 )
 
-GOOGLE_AI_API_KEY = os.getenv("GOOGLE_AI_API_KEY", "")
-if GOOGLE_AI_API_KEY:
-    genai.configure(api_key=GOOGLE_AI_API_KEY)
+SYSTEM_PROMPT = """You are a helpful assistant for a civic grievance redressal system called CivicPulse.
+Your role is to help citizens:
+1. Understand how to submit grievances
+2. Check the status of their grievances
+3. Get information about the system
+4. Answer general questions about civic services
+
+Be friendly, concise, and helpful. If asked about specific grievances, guide them to check their dashboard.
+Keep responses under 200 words. If you don't know something, admit it and suggest contacting support."""
 
 class ChatMessage(BaseModel):
     message: str
@@ -26,45 +34,172 @@ class ChatResponse(BaseModel):
     response: str
     conversation_id: str
 
+def _build_prompt(user_message: str, conversation: Conversation) -> str:
+    parts = [SYSTEM_PROMPT]
+    if conversation.summary:
+        parts.append(f"Summary of the earlier conversation:\n{conversation.summary}")
+    history = "\n".join(f"{role}: {text}" for role, text in conversation.turns)
+    if history:
+        parts.append(history)
+    parts.append(f"User: {user_message}\nAssistant:")
+    return "\n\n".join(parts)
+
+FALLBACK_ANSWER = (
+    "I can't reach the assistant right now. I can still tell you the status of your "
+    "grievances or explain how to file one - just ask."
+)
+
+def _ensure_configured():
+    if not provider.is_configured:
+        raise HTTPException(
+            status_code=503,
+            detail="AI service is not configured. Please contact administrator."
+        )
+
+async def _answer_locally(chat_message: ChatMessage, conversation_id: str, user: models.User, db: Session) -> Optional[str]:
+    routed = await run_in_threadpool(intent_router.route, chat_message.message, user, db)
+    if routed is None:
+        return None
+    _, answer = routed
+    await run_in_threadpool(
+        store.append, user.id, conversation_id,
+        ("User", chat_message.message), ("Assistant", answer), db=db
+    )
+    return answer
+
 @router.post("/", response_model=ChatResponse)
 async def chat(
     chat_message: ChatMessage,
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    if not GOOGLE_AI_API_KEY:
-        raise HTTPException(
-            status_code=503,
-            detail="AI service is not configured. Please contact administrator."
-        )
-    
+    conversation_id = chat_message.conversation_id or "default"
+    local_answer = await _answer_locally(chat_message, conversation_id, current_user, db)
+    if local_answer is not None:
+        return ChatResponse(response=local_answer, conversation_id=conversation_id)
+
+    _ensure_configured()
+
+    user_id = current_user.id
     try:
-        model = genai.GenerativeModel('gemini-pro')
-        
-        system_prompt = """You are a helpful assistant for a civic grievance redressal system called CivicPulse. 
-Your role is to help citizens:
-1. Understand how to submit grievances
-2. Check the status of their grievances
-3. Get information about the system
-4. Answer general questions about civic services
+        started = time.perf_counter()
+        conversation = await run_in_threadpool(store.get, user_id, conversation_id, db=db)
+        # Don't hold a pooled connection while the model is generating.
+        await run_in_threadpool(db.close)
+        try:
+            text = (await provider.generate(_build_prompt(chat_message.message, conversation))).strip()
+        except ProviderError as e:
+            print(f"Chat provider error, answering locally: {e}")
+            return ChatResponse(response=FALLBACK_ANSWER, conversation_id=conversation_id)
+        intent_router.stats.record_model(time.perf_counter() - started)
+        await run_in_threadpool(
+            store.append, user_id, conversation_id,
+            ("User", chat_message.message), ("Assistant", text), db=db
+        )
 
-Be friendly, concise, and helpful. If asked about specific grievances, guide them to check their dashboard.
-Keep responses under 200 words. If you don't know something, admit it and suggest contacting support."""
-        
-        user_message = chat_message.message
-        
-        full_prompt = f"{system_prompt}\n\nUser: {user_message}\nAssistant:"
-        
-        response = model.generate_content(full_prompt)
-        
         return ChatResponse(
-            response=response.text.strip(),
-            conversation_id=chat_message.conversation_id or "default"
+            response=text,
+            conversation_id=conversation_id
         )
-        
+
     except Exception as e:
         print(f"Chat error: {e}")
         raise HTTPException(
             status_code=500,
             detail=f"Error generating response: {str(e)}"
         )
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/stream")
+async def chat_stream(
+    chat_message: ChatMessage,
+    request: Request,
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """
+    Stream the assistant reply as Server-Sent Events: one `token` event per
+    chunk from the model, then a `done` event carrying time-to-first-token.
+    Generation stops as soon as the client disconnects.
+    """
+    conversation_id = chat_message.conversation_id or "default"
+    started = time.perf_counter()
+    local_answer = await _answer_locally(chat_message, conversation_id, current_user, db)
+    if local_answer is not None:
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+
+        async def local_source():
+            yield _sse("token", {"text": local_answer})
+            yield _sse("done", {"conversation_id": conversation_id, "ttft_ms": elapsed_ms, "total_ms": elapsed_ms})
+
+        return StreamingResponse(local_source(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+    _ensure_configured()
+
+    user_id = current_user.id
+    conversation = await run_in_threadpool(store.get, user_id, conversation_id, db=db)
+    prompt = _build_prompt(chat_message.message, conversation)
+    # The session may stay open until the stream ends; give its connection
+    # back now and only check one out again to save the reply.
+    await run_in_threadpool(db.close)
+
+    async def event_source():
+        started = time.perf_counter()
+        ttft_ms = None
+        reply = []
+        stream = provider.stream(prompt)
+        try:
+            async for text in stream:
+                if await request.is_disconnected():
+                    # A partial reply is neither kept in history nor timed.
+                    return
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - started) * 1000
+                reply.append(text)
+                yield _sse("token", {"text": text})
+            await run_in_threadpool(
+                store.append, user_id, conversation_id,
+                ("User", chat_message.message), ("Assistant", "".join(reply).strip()), db=db
+            )
+            total_ms = (time.perf_counter() - started) * 1000
+            intent_router.stats.record_model(total_ms / 1000)
+            yield _sse("done", {
+                "conversation_id": conversation_id,
+                "ttft_ms": round(ttft_ms or total_ms, 1),
+                "total_ms": round(total_ms, 1),
+            })
+        except ProviderError as e:
+            print(f"Chat provider error, answering locally: {e}")
+            total_ms = (time.perf_counter() - started) * 1000
+            if not reply:
+                yield _sse("token", {"text": FALLBACK_ANSWER})
+            yield _sse("done", {
+                "conversation_id": conversation_id,
+                "ttft_ms": round(ttft_ms or total_ms, 1),
+                "total_ms": round(total_ms, 1),
+                "fallback": True,
+            })
+        except Exception as e:
+            print(f"Chat stream error: {e}")
+            yield _sse("error", {"detail": f"Error generating response: {str(e)}"})
+        finally:
+            # Closing the generator cancels the in-flight provider request.
+            await stream.aclose()
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/stats")
+def chat_stats(current_user: models.User = Depends(auth.get_current_user)):
+    """
+    Share of chat traffic answered locally by the intent router, and the
+    average latency of local answers versus model answers.
+    """
+    if current_user.role != models.UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return intent_router.stats.snapshot()
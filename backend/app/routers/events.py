@@ -0,0 +1,86 @@
+import json
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from .. import database, auth
+from ..services.events import bus, user_topic, role_topic
+
+router = APIRouter(
+    prefix="/events",
+    tags=["events"]
+)
+
+HEARTBEAT_SECONDS = 15
+
+def _resolve_topics(token: Optional[str]):
+    if not token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    # Use a short-lived session so a long-running stream does not hold a pooled connection.
+    db = database.SessionLocal()
+    try:
+        user = auth.get_user_from_token(token, db)
+        return [user_topic(user.id), role_topic(user.role)]
+    finally:
+        db.close()
+
+def _bearer_token(request: Request, token: Optional[str]) -> Optional[str]:
+    header = request.headers.get("Authorization", "")
+    if header.lower().startswith("bearer "):
+        return header[7:]
+    # EventSource cannot set headers, so the token may also come as a query parameter.
+    return token
+
+@router.get("/stream")
+async def stream_events(request: Request, token: Optional[str] = Query(None)):
+    # Token decoding and the user lookup block, so keep them off the event loop.
+    topics = await run_in_threadpool(_resolve_topics, _bearer_token(request, token))
+    subscription = bus.subscribe(topics)
+
+    async def event_source():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                event = await subscription.get(timeout=HEARTBEAT_SECONDS)
+                if await request.is_disconnected():
+                    break
+                dropped = subscription.take_dropped()
+                if dropped:
+                    yield f"event: resync\ndata: {json.dumps({'dropped': dropped})}\n\n"
+                if event is None:
+                    yield ": ping\n\n"
+                    continue
+                yield f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            bus.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.websocket("/ws")
+async def websocket_events(websocket: WebSocket, token: Optional[str] = Query(None)):
+    try:
+        topics = await run_in_threadpool(_resolve_topics, token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    subscription = bus.subscribe(topics)
+    try:
+        while True:
+            event = await subscription.get(timeout=HEARTBEAT_SECONDS)
+            dropped = subscription.take_dropped()
+            if dropped:
+                await websocket.send_json({"type": "resync", "dropped": dropped})
+            if event is None:
+                await websocket.send_json({"type": "ping"})
+                continue
+            await websocket.send_json(event)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        bus.unsubscribe(subscription)
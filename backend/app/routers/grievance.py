@@ -4,8 +4,9 @@ from typing import List, Optional
 import shutil
 import os
 import uuid
-from .. import models, schemas, database, auth
+from .. import models, schemas, database, auth, serialization
 from ..services.ai_service import AIService
+from ..services import events, geocoding, regions
 
 router = APIRouter(
     prefix="/grievance",
@@ -20,6 +21,8 @@ def create_grievance(
     region_code: Optional[str] = Form(None),
     state: Optional[str] = Form(None),
     district: Optional[str] = Form(None),
+    lat: Optional[float] = Form(None, ge=-90, le=90),
+    lng: Optional[float] = Form(None, ge=-180, le=180),
     department_id: Optional[int] = Form(None),
     privacy_consent: bool = Form(False),
     image: UploadFile = File(None),
@@ -57,6 +60,12 @@ def create_grievance(
         if general_dept:
             final_department_id = general_dept.id
 
+    region_id = None
+    if location and (lat is None or lng is None):
+        geocoded = geocoding.geocoder.geocode(db.connection(), location, state, district)
+        if geocoded:
+            lat, lng, region_id = geocoded.lat, geocoded.lng, geocoded.region_id
+
     db_grievance = models.Grievance(
         title=title,
         description=description,
@@ -71,9 +80,12 @@ def create_grievance(
         is_spam=ai_result["is_spam"],
         ai_summary=ai_result["summary"],
         location=location,
+        region_id=region_id or regions.hierarchy.resolve(state, district, region_code, lat, lng, db.connection()),
         region_code=region_code,
         state=state,
         district=district,
+        lat=lat,
+        lng=lng,
         privacy_consent=privacy_consent
     )
     
@@ -145,6 +157,8 @@ def update_grievance_status(
 
     db.commit()
     db.refresh(db_grievance)
+    if old_status != status_update.status:
+        events.publish_timeline(db_grievance, db_timeline)
     return db_grievance
 
 @router.post("/{grievance_id}/feedback", response_model=schemas.Feedback)
@@ -203,6 +217,7 @@ def resolve_grievance(
 
     db.commit()
     db.refresh(db_grievance)
+    events.publish_timeline(db_grievance, db_timeline)
     return db_grievance
 
 @router.get("/assigned/me", response_model=List[schemas.Grievance])
@@ -210,20 +225,28 @@ def read_assigned_grievances(
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    grievances = db.query(models.Grievance).filter(models.Grievance.assignee_id == current_user.id).all()
-    return grievances
+    query = db.query(models.Grievance).filter(models.Grievance.assignee_id == current_user.id)
+    return serialization.JSONResponse(serialization.grievance_list(db, query))
 
 @router.get("/my", response_model=List[schemas.Grievance])
 def read_my_grievances(
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    grievances = db.query(models.Grievance).filter(models.Grievance.citizen_id == current_user.id).all()
-    return grievances
+    grievances = serialization.grievance_list(
+        db, db.query(models.Grievance).filter(models.Grievance.citizen_id == current_user.id)
+    )
+    archived = serialization.grievance_list(
+        db, db.query(models.ArchivedGrievance).filter(models.ArchivedGrievance.citizen_id == current_user.id)
+    )
+    return serialization.JSONResponse(grievances + archived)
 
 @router.get("/{grievance_id}", response_model=schemas.Grievance)
 def read_grievance(grievance_id: int, db: Session = Depends(database.get_db)):
     db_grievance = db.query(models.Grievance).filter(models.Grievance.id == grievance_id).first()
+    if db_grievance is None:
+        # Long-closed grievances live in the archive (see services/archive.py).
+        db_grievance = db.query(models.ArchivedGrievance).filter(models.ArchivedGrievance.id == grievance_id).first()
     if db_grievance is None:
         raise HTTPException(status_code=404, detail="Grievance not found")
     return db_grievance
@@ -236,10 +259,15 @@ def read_grievances(
     region_code: Optional[str] = None,
     state: Optional[str] = None,
     district: Optional[str] = None,
-    db: Session = Depends(database.get_db)
+    db: Session = Depends(database.get_read_db)
 ):
     query = db.query(models.Grievance)
     if status:
+        try:
+            status = models.GrievanceStatus(status)
+        except ValueError:
+            # No grievance can have a status outside the enum.
+            return serialization.JSONResponse([])
         query = query.filter(models.Grievance.status == status)
     if region_code:
         query = query.filter(models.Grievance.region_code == region_code)
@@ -248,5 +276,4 @@ def read_grievances(
     if district:
         query = query.filter(models.Grievance.district == district)
     
-    grievances = query.offset(skip).limit(limit).all()
-    return grievances
+    return serialization.JSONResponse(serialization.grievance_list(db, query.offset(skip).limit(limit)))
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from typing import List
-from .. import database, models, schemas
+from .. import cache, database, models, schemas
 
 router = APIRouter(
     prefix="/metadata",
@@ -9,9 +9,11 @@ router = APIRouter(
 )
 
 @router.get("/departments", response_model=List[schemas.Department])
-def get_departments(db: Session = Depends(database.get_db)):
-    return db.query(models.Department).all()
+@cache.cached("metadata.departments", tags=["departments"])
+def get_departments(db: Session = Depends(database.get_read_db)):
+    return [schemas.Department.model_validate(d) for d in db.query(models.Department).all()]
 
 @router.get("/regions", response_model=List[schemas.Region])
-def get_regions(db: Session = Depends(database.get_db)):
-    return db.query(models.Region).all()
+@cache.cached("metadata.regions", tags=["regions"])
+def get_regions(db: Session = Depends(database.get_read_db)):
+    return [schemas.Region.model_validate(r) for r in db.query(models.Region).all()]
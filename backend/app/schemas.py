@@ -117,6 +117,8 @@ class GrievanceBase(BaseModel):
     region_code: Optional[str] = None
     state: Optional[str] = None
     district: Optional[str] = None
+    lat: Optional[float] = None
+    lng: Optional[float] = None
     image_url: Optional[str] = None
     privacy_consent: bool = False
 
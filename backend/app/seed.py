@@ -1,3 +1,10 @@
+import argparse
+import csv
+import io
+import random
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from . import models, schemas, auth
 from .database import engine
@@ -40,5 +47,359 @@ def seed_db():
     db.commit()
     print("Database seeded successfully.")
 
-if __name__ == "__main__":
+# States and districts for synthetic data, most populous first so that the
+# Zipf weights below give them the largest share of grievances.
+SYNTHETIC_REGIONS = {
+    "Uttar Pradesh": ["Lucknow", "Kanpur Nagar", "Ghaziabad", "Agra", "Varanasi", "Prayagraj", "Meerut", "Gorakhpur"],
+    "Maharashtra": ["Mumbai", "Pune", "Thane", "Nagpur", "Nashik", "Aurangabad", "Solapur"],
+    "Bihar": ["Patna", "Gaya", "Muzaffarpur", "Bhagalpur", "Darbhanga", "Purnia"],
+    "West Bengal": ["Kolkata", "North 24 Parganas", "Howrah", "Darjeeling", "Bardhaman", "Nadia"],
+    "Tamil Nadu": ["Chennai", "Coimbatore", "Madurai", "Tiruchirappalli", "Salem", "Tirunelveli"],
+    "Rajasthan": ["Jaipur", "Jodhpur", "Udaipur", "Kota", "Ajmer", "Bikaner"],
+    "Karnataka": ["Bengaluru Urban", "Mysuru", "Belagavi", "Dharwad", "Mangaluru", "Kalaburagi"],
+    "Gujarat": ["Ahmedabad", "Surat", "Vadodara", "Rajkot", "Bhavnagar"],
+    "Madhya Pradesh": ["Indore", "Bhopal", "Jabalpur", "Gwalior", "Ujjain"],
+    "Delhi": ["New Delhi", "North Delhi", "South Delhi", "East Delhi", "West Delhi"],
+    "Kerala": ["Thiruvananthapuram", "Ernakulam", "Kozhikode", "Thrissur"],
+    "Punjab": ["Ludhiana", "Amritsar", "Jalandhar", "Patiala"],
+}
+
+# Approximate district centroids (lat, lng) for the spatial index.
+SYNTHETIC_DISTRICT_COORDINATES = {
+    "Lucknow": (26.85, 80.95), "Kanpur Nagar": (26.45, 80.33), "Ghaziabad": (28.67, 77.45), "Agra": (27.18, 78.01),
+    "Varanasi": (25.32, 82.99), "Prayagraj": (25.44, 81.85), "Meerut": (28.98, 77.71), "Gorakhpur": (26.76, 83.37),
+    "Mumbai": (19.08, 72.88), "Pune": (18.52, 73.86), "Thane": (19.22, 72.98), "Nagpur": (21.15, 79.09),
+    "Nashik": (20.0, 73.79), "Aurangabad": (19.88, 75.34), "Solapur": (17.66, 75.91),
+    "Patna": (25.59, 85.14), "Gaya": (24.8, 85.0), "Muzaffarpur": (26.12, 85.39), "Bhagalpur": (25.24, 86.98),
+    "Darbhanga": (26.15, 85.9), "Purnia": (25.78, 87.47),
+    "Kolkata": (22.57, 88.36), "North 24 Parganas": (22.86, 88.54), "Howrah": (22.59, 88.31),
+    "Darjeeling": (27.04, 88.26), "Bardhaman": (23.23, 87.86), "Nadia": (23.47, 88.56),
+    "Chennai": (13.08, 80.27), "Coimbatore": (11.02, 76.96), "Madurai": (9.93, 78.12),
+    "Tiruchirappalli": (10.79, 78.7), "Salem": (11.66, 78.15), "Tirunelveli": (8.71, 77.76),
+    "Jaipur": (26.91, 75.79), "Jodhpur": (26.24, 73.02), "Udaipur": (24.59, 73.71), "Kota": (25.21, 75.86),
+    "Ajmer": (26.45, 74.64), "Bikaner": (28.02, 73.31),
+    "Bengaluru Urban": (12.97, 77.59), "Mysuru": (12.3, 76.64), "Belagavi": (15.85, 74.5), "Dharwad": (15.46, 75.01),
+    "Mangaluru": (12.91, 74.86), "Kalaburagi": (17.33, 76.83),
+    "Ahmedabad": (23.02, 72.57), "Surat": (21.17, 72.83), "Vadodara": (22.31, 73.18), "Rajkot": (22.3, 70.8),
+    "Bhavnagar": (21.76, 72.15),
+    "Indore": (22.72, 75.86), "Bhopal": (23.26, 77.41), "Jabalpur": (23.18, 79.99), "Gwalior": (26.22, 78.18),
+    "Ujjain": (23.18, 75.78),
+    "New Delhi": (28.61, 77.21), "North Delhi": (28.71, 77.2), "South Delhi": (28.52, 77.22),
+    "East Delhi": (28.63, 77.3), "West Delhi": (28.65, 77.06),
+    "Thiruvananthapuram": (8.52, 76.94), "Ernakulam": (9.98, 76.28), "Kozhikode": (11.26, 75.78), "Thrissur": (10.53, 76.21),
+    "Ludhiana": (30.9, 75.86), "Amritsar": (31.63, 74.87), "Jalandhar": (31.33, 75.58), "Patiala": (30.34, 76.39),
+}
+
+# Zone (seeded by seed_db) that each synthetic state belongs to.
+SYNTHETIC_ZONES = {
+    "Uttar Pradesh": "NZ", "Delhi": "NZ", "Punjab": "NZ", "Rajasthan": "NZ",
+    "Maharashtra": "WZ", "Gujarat": "WZ",
+    "Bihar": "EZ", "West Bengal": "EZ",
+    "Tamil Nadu": "SZ", "Karnataka": "SZ", "Kerala": "SZ",
+    "Madhya Pradesh": "CZ",
+}
+
+SYNTHETIC_CATEGORIES = [
+    ("Roads", "ROAD", 0.28),
+    ("Sanitation", "SANI", 0.24),
+    ("Water Supply", "WATER", 0.2),
+    ("Electricity", "ELEC", 0.16),
+    ("Law & Order", "GEN", 0.07),
+    ("Other", "GEN", 0.05),
+]
+
+# Final status share, and the path of statuses each grievance went through.
+SYNTHETIC_STATUSES = [
+    (models.GrievanceStatus.NEW, 0.12),
+    (models.GrievanceStatus.ASSIGNED, 0.1),
+    (models.GrievanceStatus.IN_PROGRESS, 0.14),
+    (models.GrievanceStatus.PENDING_VERIFICATION, 0.06),
+    (models.GrievanceStatus.RESOLVED, 0.38),
+    (models.GrievanceStatus.CLOSED, 0.12),
+    (models.GrievanceStatus.ESCALATED, 0.04),
+    (models.GrievanceStatus.REJECTED, 0.02),
+    (models.GrievanceStatus.SPAM, 0.02),
+]
+STATUS_PATH = [
+    models.GrievanceStatus.NEW,
+    models.GrievanceStatus.ASSIGNED,
+    models.GrievanceStatus.IN_PROGRESS,
+    models.GrievanceStatus.PENDING_VERIFICATION,
+    models.GrievanceStatus.RESOLVED,
+    models.GrievanceStatus.CLOSED,
+]
+
+SYNTHETIC_TITLES = {
+    "Roads": ["Pothole on main road", "Broken footpath", "Road caved in", "Damaged speed breaker"],
+    "Sanitation": ["Garbage not collected", "Overflowing drain", "Open dumping near market", "Blocked sewer"],
+    "Water Supply": ["No water supply", "Water leak on street", "Contaminated tap water", "Low water pressure"],
+    "Electricity": ["Streetlight not working", "Frequent power cuts", "Exposed live wire", "Transformer sparking"],
+    "Law & Order": ["Illegal parking", "Noise complaint", "Encroachment on footpath"],
+    "Other": ["Stray animals", "Tree fallen on road", "Park not maintained"],
+}
+
+
+def _zipf_weights(n: int, s: float = 1.1):
+    return [1 / (rank ** s) for rank in range(1, n + 1)]
+
+
+class SyntheticGenerator:
+    """
+    Deterministic bulk data generator. Every choice comes from a single
+    random.Random(seed), so the same arguments always produce the same
+    database and benchmark runs stay comparable.
+    """
+
+    def __init__(self, seed: int = 42, days: int = 730, now: datetime = datetime(2026, 1, 1)):
+        self.rng = random.Random(seed)
+        self.days = days
+        self.now = now
+        self.states = list(SYNTHETIC_REGIONS)
+        self.state_weights = _zipf_weights(len(self.states))
+        self.district_weights = {state: _zipf_weights(len(d)) for state, d in SYNTHETIC_REGIONS.items()}
+        self.status_values = [s for s, _ in SYNTHETIC_STATUSES]
+        self.status_weights = [w for _, w in SYNTHETIC_STATUSES]
+        self.category_weights = [w for _, _, w in SYNTHETIC_CATEGORIES]
+
+    def location(self):
+        state = self.rng.choices(self.states, self.state_weights)[0]
+        district = self.rng.choices(SYNTHETIC_REGIONS[state], self.district_weights[state])[0]
+        return state, district
+
+    def created_at(self) -> datetime:
+        # Volume grows over time: bias towards recent days.
+        age_days = self.days * (1 - self.rng.random() ** 0.7)
+        return self.now - timedelta(days=age_days, seconds=self.rng.randrange(86400))
+
+
+def _slug(name: str) -> str:
+    return "".join(ch if ch.isalnum() else "-" for ch in name.upper()).strip("-")
+
+
+def seed_regions(conn) -> dict:
+    """
+    Add State and District regions for SYNTHETIC_REGIONS under the seeded
+    zones and rebuild the region closure. Returns {(state, district): region id}.
+    """
+    from .services import regions
+
+    table = models.Region.__table__
+    existing = {code: id_ for id_, code in conn.execute(table.select().with_only_columns(table.c.id, table.c.code))}
+    next_id = _next_id(conn, table)
+    rows = []
+
+    def add(code, name, kind, parent_id, lat=None, lng=None):
+        nonlocal next_id
+        if code not in existing:
+            rows.append({"id": next_id, "code": code, "name": name, "type": kind, "parent_id": parent_id, "lat": lat, "lng": lng})
+            existing[code] = next_id
+            next_id += 1
+        return existing[code]
+
+    districts = {}
+    for state, names in SYNTHETIC_REGIONS.items():
+        state_id = add(f"ST-{_slug(state)}", state, regions.STATE, existing.get(SYNTHETIC_ZONES[state]))
+        for district in names:
+            districts[(state, district)] = add(
+                f"DT-{_slug(state)}-{_slug(district)}", district, regions.DISTRICT, state_id,
+                *SYNTHETIC_DISTRICT_COORDINATES[district],
+            )
+    if rows:
+        conn.execute(table.insert(), rows)
+    regions.rebuild_closure(conn)
+    return districts
+
+
+def _insert(conn, table, rows, use_copy: bool):
+    if not rows:
+        return
+    if not use_copy:
+        conn.execute(table.insert(), rows)
+        return
+    columns = list(rows[0])
+    # COPY bypasses SQLAlchemy's bind processing, so encode enum columns here.
+    encoders = {
+        c: table.c[c].type.process_bind_param for c in columns if isinstance(table.c[c].type, models.EnumCode)
+    }
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        values = [encoders[c](row[c], None) if c in encoders else row[c] for c in columns]
+        writer.writerow([
+            "" if value is None else (value.isoformat() if isinstance(value, datetime) else value)
+            for value in values
+        ])
+    buffer.seek(0)
+    cursor = conn.connection.driver_connection.cursor()
+    cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def _next_id(conn, table) -> int:
+    return (conn.execute(func.max(table.c.id).select()).scalar() or 0) + 1
+
+
+def seed_bulk(grievances: int = 1_000_000, officers: int = 5000, citizens: int = None, seed: int = 42, batch_size: int = 20_000):
+    """
+    Bulk-load synthetic users, grievances, timelines, media and feedback.
+    Rows are inserted with explicit ids in batches, using COPY on PostgreSQL
+    and executemany elsewhere, so a million grievances load in minutes.
+    Resolution-time sketches and trend rollups are rebuilt from the loaded
+    timelines.
+    """
     seed_db()
+    generator = SyntheticGenerator(seed)
+    rng = generator.rng
+    citizens = citizens or max(grievances // 20, 1)
+    use_copy = engine.dialect.name == "postgresql"
+    started = time.perf_counter()
+
+    users = models.User.__table__
+    grievance_table = models.Grievance.__table__
+    timeline_table = models.Timeline.__table__
+    media_table = models.Media.__table__
+    feedback_table = models.Feedback.__table__
+
+    with engine.begin() as conn:
+        departments = {code: id_ for id_, code in conn.execute(models.Department.__table__.select().with_only_columns(
+            models.Department.__table__.c.id, models.Department.__table__.c.code))}
+        password_hash = auth.get_password_hash("password123")
+        district_regions = seed_regions(conn)
+
+        user_id = _next_id(conn, users)
+        officer_pool = {}
+        rows = []
+        for i in range(officers):
+            state, district = generator.location()
+            department_code = rng.choice(SYNTHETIC_CATEGORIES)[1]
+            rows.append({
+                "id": user_id, "email": f"officer{seed}-{i}@synthetic.local", "hashed_password": password_hash,
+                "full_name": f"Officer {i}", "role": models.UserRole.FIELD_OFFICER.value, "is_active": True,
+                "department_id": departments.get(department_code), "state": state, "district": district,
+                "region_id": district_regions[(state, district)],
+            })
+            officer_pool.setdefault((department_code, state), []).append(user_id)
+            user_id += 1
+        first_citizen = user_id
+        for i in range(citizens):
+            state, district = generator.location()
+            rows.append({
+                "id": user_id, "email": f"citizen{seed}-{i}@synthetic.local", "hashed_password": password_hash,
+                "full_name": f"Citizen {i}", "role": models.UserRole.CITIZEN.value, "is_active": True,
+                "department_id": None, "state": state, "district": district,
+                "region_id": district_regions[(state, district)],
+            })
+            user_id += 1
+        for start in range(0, len(rows), batch_size):
+            _insert(conn, users, rows[start:start + batch_size], use_copy)
+        print(f"Inserted {officers} officers and {citizens} citizens")
+
+    grievance_id = timeline_id = media_id = feedback_id = None
+    with engine.connect() as conn:
+        grievance_id = _next_id(conn, grievance_table)
+        timeline_id = _next_id(conn, timeline_table)
+        media_id = _next_id(conn, media_table)
+        feedback_id = _next_id(conn, feedback_table)
+
+    remaining = grievances
+    while remaining > 0:
+        count = min(batch_size, remaining)
+        remaining -= count
+        g_rows, t_rows, m_rows, f_rows = [], [], [], []
+        for _ in range(count):
+            category, department_code, _ = rng.choices(SYNTHETIC_CATEGORIES, generator.category_weights)[0]
+            state, district = generator.location()
+            status = rng.choices(generator.status_values, generator.status_weights)[0]
+            severity = round(rng.betavariate(2, 3), 3)
+            priority = (
+                models.Priority.CRITICAL if severity >= 0.8 else
+                models.Priority.HIGH if severity >= 0.6 else
+                models.Priority.MEDIUM if severity >= 0.4 else
+                models.Priority.LOW
+            )
+            created_at = generator.created_at()
+            assignee_id = None
+            if status not in (models.GrievanceStatus.NEW, models.GrievanceStatus.SPAM, models.GrievanceStatus.REJECTED):
+                pool = officer_pool.get((department_code, state))
+                assignee_id = rng.choice(pool) if pool else None
+
+            lat = lng = None
+            if rng.random() < 0.7:
+                # Submitted with device coordinates, scattered around the district centre.
+                center_lat, center_lng = SYNTHETIC_DISTRICT_COORDINATES[district]
+                lat, lng = round(rng.gauss(center_lat, 0.05), 5), round(rng.gauss(center_lng, 0.05), 5)
+
+            g_rows.append({
+                "id": grievance_id, "title": rng.choice(SYNTHETIC_TITLES[category]),
+                "description": f"{category} issue reported in {district}, {state}.",
+                "citizen_id": first_citizen + rng.randrange(citizens),
+                "department_id": departments.get(department_code), "assignee_id": assignee_id,
+                "region_id": district_regions[(state, district)],
+                "status": status.value, "priority": priority.value,
+                "category": category, "category_ai": category, "severity_ai": severity,
+                "is_spam": status == models.GrievanceStatus.SPAM, "privacy_consent": rng.random() < 0.8,
+                "location": f"Ward {rng.randint(1, 60)}, {district}", "state": state, "district": district,
+                "lat": lat, "lng": lng, "created_at": created_at, "updated_at": created_at,
+            })
+
+            path = STATUS_PATH[:STATUS_PATH.index(status) + 1] if status in STATUS_PATH else [models.GrievanceStatus.NEW, status]
+            at = created_at
+            for step in path:
+                t_rows.append({
+                    "id": timeline_id, "grievance_id": grievance_id, "status": step.value,
+                    "remark": f"Status changed to {step.value}", "created_at": at,
+                })
+                timeline_id += 1
+                at += timedelta(hours=rng.expovariate(1 / 36))
+            g_rows[-1]["updated_at"] = at
+
+            if rng.random() < 0.3:
+                m_rows.append({
+                    "id": media_id, "grievance_id": grievance_id, "url": f"/uploads/synthetic-{grievance_id}.jpg",
+                    "uploader_id": g_rows[-1]["citizen_id"], "type": "image", "created_at": created_at,
+                })
+                media_id += 1
+            if status in (models.GrievanceStatus.RESOLVED, models.GrievanceStatus.CLOSED) and rng.random() < 0.6:
+                f_rows.append({
+                    "id": feedback_id, "grievance_id": grievance_id,
+                    "rating": rng.choices([1, 2, 3, 4, 5], [0.08, 0.1, 0.17, 0.3, 0.35])[0],
+                    "comment": None, "created_at": at,
+                })
+                feedback_id += 1
+            grievance_id += 1
+
+        with engine.begin() as conn:
+            _insert(conn, grievance_table, g_rows, use_copy)
+            _insert(conn, timeline_table, t_rows, use_copy)
+            _insert(conn, media_table, m_rows, use_copy)
+            _insert(conn, feedback_table, f_rows, use_copy)
+        loaded = grievances - remaining
+        print(f"Loaded {loaded}/{grievances} grievances ({loaded / (time.perf_counter() - started):.0f} rows/s)")
+
+    if use_copy:
+        with engine.begin() as conn:
+            for table in (models.Region.__table__, users, grievance_table, timeline_table, media_table, feedback_table):
+                conn.exec_driver_sql(
+                    f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), (SELECT MAX(id) FROM {table.name}))"
+                )
+    from . import cache
+    from .services import resolution_times, satisfaction, trends
+
+    resolution_times.rebuild(engine)
+    trends.rebuild(engine)
+    satisfaction.rebuild(engine)
+    cache.cache.invalidate("grievances", "regions")
+    print(f"Synthetic data loaded in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed reference data, optionally with bulk synthetic grievances.")
+    parser.add_argument("--grievances", type=int, default=0, help="Synthetic grievances to generate (0 = reference data only)")
+    parser.add_argument("--officers", type=int, default=5000)
+    parser.add_argument("--citizens", type=int, default=None, help="Defaults to one citizen per 20 grievances")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=20_000)
+    args = parser.parse_args()
+    if args.grievances:
+        seed_bulk(args.grievances, args.officers, args.citizens, args.seed, args.batch_size)
+    else:
+        seed_db()
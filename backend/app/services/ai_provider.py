@@ -0,0 +1,342 @@
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+from typing import AsyncIterator, Optional
+
+from dotenv import load_dotenv
+from .. import metrics
+
+load_dotenv()
+
+GOOGLE_AI_API_KEY = os.getenv("GOOGLE_AI_API_KEY", "")
+AI_PROVIDER = os.getenv("AI_PROVIDER", "gemini" if GOOGLE_AI_API_KEY else "none")
+AI_MODEL = os.getenv("AI_MODEL", "gemini-pro")
+
+AI_TIMEOUT_SECONDS = float(os.getenv("AI_TIMEOUT_SECONDS", "8"))
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "8"))
+AI_MAX_ATTEMPTS = int(os.getenv("AI_MAX_ATTEMPTS", "2"))
+AI_HEDGE_DELAY_SECONDS = float(os.getenv("AI_HEDGE_DELAY_SECONDS", "2"))
+AI_RETRY_BUDGET_RATIO = float(os.getenv("AI_RETRY_BUDGET_RATIO", "0.2"))
+AI_BREAKER_FAILURES = int(os.getenv("AI_BREAKER_FAILURES", "5"))
+AI_BREAKER_RESET_SECONDS = float(os.getenv("AI_BREAKER_RESET_SECONDS", "30"))
+
+AI_FAKE_LATENCY_MS = float(os.getenv("AI_FAKE_LATENCY_MS", "200"))
+AI_FAKE_JITTER_MS = float(os.getenv("AI_FAKE_JITTER_MS", "50"))
+AI_FAKE_TOKEN_DELAY_MS = float(os.getenv("AI_FAKE_TOKEN_DELAY_MS", "20"))
+AI_FAKE_ERROR_RATE = float(os.getenv("AI_FAKE_ERROR_RATE", "0"))
+AI_FAKE_SEED = os.getenv("AI_FAKE_SEED")
+
+
+class ProviderError(Exception):
+    pass
+
+
+class ProviderUnavailable(ProviderError):
+    """Raised without calling the provider: not configured or circuit open."""
+
+
+class GeminiProvider:
+    name = "gemini"
+
+    def __init__(self, api_key: str = GOOGLE_AI_API_KEY, model_name: str = AI_MODEL):
+        self.api_key = api_key
+        self.model_name = model_name
+        self._model = None
+
+    def _get_model(self):
+        if self._model is None:
+            import google.generativeai as genai
+
+            genai.configure(api_key=self.api_key)
+            self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    async def generate(self, prompt: str) -> str:
+        response = await self._get_model().generate_content_async(prompt)
+        return response.text
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        response = await self._get_model().generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+
+class FakeProvider:
+    """Offline stand-in that simulates latency, jitter and errors so that the
+    resilience settings can be load-tested without a real API key."""
+
+    name = "fake"
+
+    def __init__(
+        self,
+        latency_ms: float = AI_FAKE_LATENCY_MS,
+        jitter_ms: float = AI_FAKE_JITTER_MS,
+        token_delay_ms: float = AI_FAKE_TOKEN_DELAY_MS,
+        error_rate: float = AI_FAKE_ERROR_RATE,
+        seed: Optional[str] = AI_FAKE_SEED,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.token_delay_ms = token_delay_ms
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+
+    async def _simulate(self):
+        delay = self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)
+        await asyncio.sleep(max(delay, 0) / 1000)
+        if self._random.random() < self.error_rate:
+            raise ProviderError("Simulated provider error")
+
+    @staticmethod
+    def _respond(prompt: str) -> str:
+        if "valid JSON" in prompt:
+            return '{"category": "Other", "severity_score": 0.5, "is_spam": false, "summary": "Simulated classification"}'
+        return "This is a simulated assistant reply from the offline provider."
+
+    async def generate(self, prompt: str) -> str:
+        await self._simulate()
+        return self._respond(prompt)
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        await self._simulate()
+        for word in self._respond(prompt).split(" "):
+            yield word + " "
+            await asyncio.sleep(self.token_delay_ms / 1000)
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures, rejects calls for
+    `reset_seconds`, then lets a single trial call through (half-open)."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = AI_BREAKER_FAILURES, reset_seconds: float = AI_BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def record_cancelled(self):
+        """The caller gave up before the call had an outcome. Counts as
+        neither, but frees the half-open trial so another call can make it."""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+class RetryBudget:
+    """Each call deposits `ratio` tokens and each retry or hedge spends one, so
+    extra attempts stay at roughly `ratio` of the base traffic."""
+
+    def __init__(self, ratio: float = AI_RETRY_BUDGET_RATIO, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class ResilientProvider:
+    """
+    Wraps a provider with a per-call deadline, a concurrency limit, hedged
+    retries drawn from a retry budget, and a circuit breaker. Callers catch
+    ProviderError and fall back to the local classifier.
+    """
+
+    def __init__(
+        self,
+        provider,
+        timeout: float = AI_TIMEOUT_SECONDS,
+        max_concurrency: int = AI_MAX_CONCURRENCY,
+        max_attempts: int = AI_MAX_ATTEMPTS,
+        hedge_delay: float = AI_HEDGE_DELAY_SECONDS,
+        breaker: Optional[CircuitBreaker] = None,
+        retry_budget: Optional[RetryBudget] = None,
+    ):
+        self.provider = provider
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.max_attempts = max(1, max_attempts)
+        self.hedge_delay = hedge_delay
+        self.breaker = breaker or CircuitBreaker()
+        self.retry_budget = retry_budget or RetryBudget()
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    @property
+    def name(self) -> str:
+        return self.provider.name if self.provider is not None else "none"
+
+    @property
+    def is_configured(self) -> bool:
+        return self.provider is not None
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # One semaphore per event loop: sync callers outside the server loop
+        # run on their own short-lived loops.
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    async def _attempt(self, prompt: str) -> str:
+        async with self._semaphore():
+            return await self.provider.generate(prompt)
+
+    async def _hedged(self, prompt: str) -> str:
+        pending = {asyncio.ensure_future(self._attempt(prompt))}
+        attempts = 1
+        last_error: Optional[BaseException] = None
+        try:
+            while pending:
+                can_spawn = attempts < self.max_attempts
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=self.hedge_delay if can_spawn else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+                # Either the hedge delay passed or an attempt failed: start another if the budget allows.
+                if can_spawn and self.retry_budget.withdraw():
+                    pending.add(asyncio.ensure_future(self._attempt(prompt)))
+                    attempts += 1
+            raise ProviderError(str(last_error) if last_error else "Provider call failed") from last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        if self.provider is None:
+            raise ProviderUnavailable("AI provider is not configured")
+        if not self.breaker.allow():
+            raise ProviderUnavailable("AI provider circuit is open")
+        self.retry_budget.deposit()
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(self._hedged(prompt), timeout=timeout or self.timeout)
+        except asyncio.TimeoutError as e:
+            self.breaker.record_failure()
+            metrics.ai_request_duration_seconds.observe(time.perf_counter() - started, self.name, "generate", "timeout")
+            raise ProviderError("AI provider deadline exceeded") from e
+        except Exception:
+            self.breaker.record_failure()
+            metrics.ai_request_duration_seconds.observe(time.perf_counter() - started, self.name, "generate", "error")
+            raise
+        except BaseException:
+            # Cancelled, e.g. the client disconnected.
+            self.breaker.record_cancelled()
+            metrics.ai_request_duration_seconds.observe(time.perf_counter() - started, self.name, "generate", "cancelled")
+            raise
+        self.breaker.record_success()
+        metrics.ai_request_duration_seconds.observe(time.perf_counter() - started, self.name, "generate", "success")
+        return result
+
+    async def stream(self, prompt: str, timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """Stream tokens. The deadline applies to the first token and to each
+        gap between tokens; streams are not hedged."""
+        if self.provider is None:
+            raise ProviderUnavailable("AI provider is not configured")
+        if not self.breaker.allow():
+            raise ProviderUnavailable("AI provider circuit is open")
+        timeout = timeout or self.timeout
+        started = time.perf_counter()
+        outcome = "cancelled"
+        try:
+            async with self._semaphore():
+                iterator = self.provider.stream(prompt).__aiter__()
+                try:
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(iterator.__anext__(), timeout=timeout)
+                        except StopAsyncIteration:
+                            break
+                        except asyncio.TimeoutError as e:
+                            self.breaker.record_failure()
+                            outcome = "timeout"
+                            raise ProviderError("AI provider deadline exceeded") from e
+                        except Exception as e:
+                            self.breaker.record_failure()
+                            outcome = "error"
+                            raise ProviderError(str(e)) from e
+                        yield chunk
+                    self.breaker.record_success()
+                    outcome = "success"
+                finally:
+                    metrics.ai_request_duration_seconds.observe(time.perf_counter() - started, self.name, "stream", outcome)
+                    await iterator.aclose()
+        finally:
+            # The consumer stopped early (aclose() on client disconnect) or
+            # was cancelled, possibly while waiting for the semaphore.
+            if outcome == "cancelled":
+                self.breaker.record_cancelled()
+
+    def generate_blocking(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """Call from synchronous code. Inside a FastAPI threadpool worker the
+        call runs on the server's event loop; elsewhere on a private loop."""
+        import anyio.from_thread
+
+        try:
+            return anyio.from_thread.run(self.generate, prompt, timeout)
+        except RuntimeError:
+            # Not in an AnyIO worker thread (scripts, seeders). generate() only
+            # ever raises ProviderError, so this cannot mask a provider failure.
+            return asyncio.run(self.generate(prompt, timeout))
+
+
+def _create_provider():
+    if AI_PROVIDER == "gemini" and GOOGLE_AI_API_KEY:
+        return GeminiProvider()
+    if AI_PROVIDER == "fake":
+        return FakeProvider()
+    return None
+
+
+provider = ResilientProvider(_create_provider())
@@ -1,25 +1,16 @@
-import os
 import json
 import re
 from typing import Dict, Any, Tuple
-import google.generativeai as genai
-from dotenv import load_dotenv
-
-load_dotenv()
-
-GOOGLE_AI_API_KEY = os.getenv("GOOGLE_AI_API_KEY", "")
-if GOOGLE_AI_API_KEY:
-    genai.configure(api_key=GOOGLE_AI_API_KEY)
+from .ai_provider import provider, ProviderError
+from .. import metrics, models
 
 class AIService:
     @staticmethod
     def classify_grievance(title: str, description: str) -> Dict[str, Any]:
-        if not GOOGLE_AI_API_KEY:
+        if not provider.is_configured:
             return AIService._mock_classify(title, description)
         
         try:
-            model = genai.GenerativeModel('gemini-pro')
-            
             prompt = f"""Analyze the following grievance report and provide a JSON response with:
 1. category: One of ["Sanitation", "Roads", "Water Supply", "Electricity", "Law & Order", "Other"]
 2. severity_score: A float between 0.0 and 1.0 (0.9+ for critical/urgent, 0.6-0.8 for high priority, 0.3-0.5 for medium, below 0.3 for low)
@@ -32,28 +23,33 @@ Description: {description}
 Return only valid JSON in this format:
 {{"category": "...", "severity_score": 0.0-1.0, "is_spam": true/false, "summary": "..."}}"""
             
-            response = model.generate_content(prompt)
-            
-            text = response.text.strip()
+            text = provider.generate_blocking(prompt).strip()
             json_match = re.search(r'\{[^}]*\}', text, re.DOTALL)
             if json_match:
                 result = json.loads(json_match.group())
             else:
                 return AIService._mock_classify(title, description)
             
+            metrics.ai_classifications_total.inc("model")
+            category = result.get("category", "Other")
             return {
-                "category": result.get("category", "Other"),
+                # Categories are stored as enum codes; anything off-list is Other.
+                "category": category if category in {c.value for c in models.Category} else models.Category.OTHER.value,
                 "severity_score": float(result.get("severity_score", 0.3)),
                 "is_spam": bool(result.get("is_spam", False)),
                 "summary": result.get("summary", description[:100] + "..." if len(description) > 100 else description)
             }
             
+        except ProviderError as e:
+            print(f"AI provider error, using local classifier: {e}")
+            return AIService._mock_classify(title, description)
         except Exception as e:
-            print(f"Gemini API error: {e}")
+            print(f"AI classification error: {e}")
             return AIService._mock_classify(title, description)
     
     @staticmethod
     def _mock_classify(title: str, description: str) -> Dict[str, Any]:
+        metrics.ai_classifications_total.inc("mock")
         text = (title + " " + description).lower()
         
         categories = ["Sanitation", "Roads", "Water Supply", "Electricity", "Law & Order", "Other"]
@@ -0,0 +1,101 @@
+"""
+Moves grievances that have been resolved or closed for longer than
+ARCHIVE_AFTER_DAYS, with their timeline, media and feedback, from the hot
+tables into the *_archive tables. Each batch is one transaction, so the job
+can be stopped at any point and rerun.
+
+    python -m app.services.archive --days 180 --batch-size 500
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import func, select
+
+from .. import cache, database, models
+
+load_dotenv()
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "180"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+
+ARCHIVABLE_STATUSES = (models.GrievanceStatus.RESOLVED.value, models.GrievanceStatus.CLOSED.value)
+
+CHILD_TABLES = (
+    (models.Timeline.__table__, models.ArchivedTimeline.__table__),
+    (models.Media.__table__, models.ArchivedMedia.__table__),
+    (models.Feedback.__table__, models.ArchivedFeedback.__table__),
+)
+
+
+def _candidates(conn, cutoff: datetime, batch_size: int):
+    grievances = models.Grievance.__table__
+    last_change = func.coalesce(grievances.c.updated_at, grievances.c.created_at)
+    # The newest grievance always stays hot: SQLite hands out max(id) + 1, so
+    # archiving it would let a new grievance reuse an archived id.
+    newest = select(func.max(grievances.c.id)).scalar_subquery()
+    query = (
+        select(grievances.c.id)
+        .where(grievances.c.status.in_(ARCHIVABLE_STATUSES), last_change < cutoff, grievances.c.id != newest)
+        .order_by(grievances.c.id)
+        .limit(batch_size)
+    )
+    if conn.dialect.name == "postgresql":
+        # Skip rows another transaction is updating, e.g. a grievance being reopened.
+        query = query.with_for_update(skip_locked=True)
+    return list(conn.execute(query).scalars())
+
+
+def archive_batch(engine, cutoff: datetime, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    grievances = models.Grievance.__table__
+    with engine.begin() as conn:
+        ids = _candidates(conn, cutoff, batch_size)
+        if not ids:
+            return 0
+        columns = [c.name for c in grievances.columns]
+        conn.execute(models.ArchivedGrievance.__table__.insert().from_select(
+            columns, select(*[grievances.c[name] for name in columns]).where(grievances.c.id.in_(ids))))
+        for hot, archive in CHILD_TABLES:
+            # Child rows get fresh ids in the archive; nothing refers to them.
+            columns = [c.name for c in hot.columns if c.name != "id"]
+            condition = hot.c.grievance_id.in_(ids)
+            conn.execute(archive.insert().from_select(columns, select(*[hot.c[name] for name in columns]).where(condition)))
+            conn.execute(hot.delete().where(condition))
+        conn.execute(grievances.delete().where(grievances.c.id.in_(ids)))
+    # Core writes bypass the ORM commit hook that invalidates cached reads.
+    cache.cache.invalidate("grievances")
+    return len(ids)
+
+
+def archive_closed(
+    older_than_days: int = ARCHIVE_AFTER_DAYS,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    max_batches: Optional[int] = None,
+    engine=None,
+) -> int:
+    """Archive in batches until nothing is left (or max_batches). Returns the number of grievances moved."""
+    engine = engine or database.get_engine()
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    moved = batches = 0
+    started = time.perf_counter()
+    while max_batches is None or batches < max_batches:
+        count = archive_batch(engine, cutoff, batch_size)
+        if not count:
+            break
+        moved += count
+        batches += 1
+        print(f"Archived {moved} grievances ({moved / (time.perf_counter() - started):.0f}/s)")
+    return moved
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive grievances resolved or closed more than --days ago.")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--max-batches", type=int, default=None)
+    args = parser.parse_args()
+    total = archive_closed(args.days, args.batch_size, args.max_batches)
+    print(f"✅ Archived {total} grievances older than {args.days} days")
@@ -0,0 +1,223 @@
+import argparse
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import List, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CHAT_STORE = os.getenv("CHAT_STORE", "memory")
+CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "1200"))
+CHAT_MAX_CONVERSATIONS = int(os.getenv("CHAT_MAX_CONVERSATIONS", "10000"))
+CHAT_CONVERSATION_TTL_SECONDS = int(os.getenv("CHAT_CONVERSATION_TTL_SECONDS", "86400"))
+
+# Turns that are always kept verbatim, however small the budget.
+MIN_RECENT_TURNS = 2
+SUMMARY_LINE_CHARS = 160
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token for English text; good enough for budgeting.
+    return len(text) // 4 + 1
+
+
+@dataclass
+class Conversation:
+    summary: str = ""
+    turns: List[Tuple[str, str]] = field(default_factory=list)
+
+    def token_count(self) -> int:
+        return estimate_tokens(self.summary) + sum(estimate_tokens(text) for _, text in self.turns)
+
+
+def _summarize_turn(role: str, text: str) -> str:
+    sentence = text.strip().split("\n")[0]
+    for stop in (". ", "? ", "! "):
+        if stop in sentence:
+            sentence = sentence.split(stop)[0] + stop.strip()
+            break
+    if len(sentence) > SUMMARY_LINE_CHARS:
+        sentence = sentence[:SUMMARY_LINE_CHARS - 3] + "..."
+    return f"{role}: {sentence}"
+
+
+def compact(conversation: Conversation, budget: int = CHAT_HISTORY_TOKEN_BUDGET) -> Conversation:
+    """
+    Fold the oldest turns into an extractive summary until the conversation
+    fits the token budget. The summary itself is capped at a third of the
+    budget by dropping its oldest lines, so the prompt stays bounded no
+    matter how long the conversation runs.
+    """
+    if conversation.token_count() <= budget:
+        return conversation
+
+    summary_lines = [line for line in conversation.summary.split("\n") if line]
+    while conversation.turns and len(conversation.turns) > MIN_RECENT_TURNS:
+        role, text = conversation.turns.pop(0)
+        summary_lines.append(_summarize_turn(role, text))
+        conversation.summary = "\n".join(summary_lines)
+        if conversation.token_count() <= budget:
+            break
+
+    summary_budget = budget // 3
+    while summary_lines and estimate_tokens(conversation.summary) > summary_budget:
+        summary_lines.pop(0)
+        conversation.summary = "\n".join(summary_lines)
+
+    # A single oversized turn is truncated rather than allowed to blow the budget.
+    if conversation.token_count() > budget:
+        remaining = max(budget - estimate_tokens(conversation.summary), 0)
+        per_turn_chars = remaining * 4 // max(len(conversation.turns), 1)
+        conversation.turns = [
+            (role, text if len(text) <= per_turn_chars else text[len(text) - per_turn_chars:])
+            for role, text in conversation.turns
+        ]
+    return conversation
+
+
+class InMemoryConversationStore:
+    """Per-process store with LRU eviction and a TTL on idle conversations."""
+
+    def __init__(self, max_conversations: int = CHAT_MAX_CONVERSATIONS, ttl_seconds: int = CHAT_CONVERSATION_TTL_SECONDS):
+        self.max_conversations = max_conversations
+        self.ttl_seconds = ttl_seconds
+        self._items: "OrderedDict[Tuple[int, str], Tuple[float, Conversation]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, conversation_id: str, db=None) -> Conversation:
+        key = (user_id, conversation_id)
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return Conversation()
+            touched_at, conversation = item
+            if time.monotonic() - touched_at > self.ttl_seconds:
+                del self._items[key]
+                return Conversation()
+            self._items.move_to_end(key)
+            return Conversation(conversation.summary, list(conversation.turns))
+
+    def append(self, user_id: int, conversation_id: str, *turns: Tuple[str, str], db=None) -> Conversation:
+        key = (user_id, conversation_id)
+        conversation = self.get(user_id, conversation_id)
+        conversation.turns.extend(turns)
+        compact(conversation)
+        with self._lock:
+            self._items[key] = (time.monotonic(), conversation)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_conversations:
+                self._items.popitem(last=False)
+        return conversation
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            now = time.monotonic()
+            expired = [key for key, (touched_at, _) in self._items.items() if now - touched_at > self.ttl_seconds]
+            for key in expired:
+                del self._items[key]
+        return len(expired)
+
+
+def _as_utc(moment: datetime) -> datetime:
+    # SQLite hands back naive datetimes; they are stored in UTC.
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment.astimezone(timezone.utc)
+
+
+class SQLConversationStore:
+    """Store backed by the `chat_conversations` table so history survives
+    restarts and is shared between workers. Each conversation is a single row
+    holding the compacted summary and the recent turns as JSON.
+
+    Request handlers pass their own session as `db`, since the pool may not
+    have a second connection to spare; `append` commits it."""
+
+    def __init__(self, ttl_seconds: int = CHAT_CONVERSATION_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+
+    @contextmanager
+    def _session(self, db=None):
+        if db is not None:
+            yield db
+            return
+        from .. import database
+        own = database.SessionLocal()
+        try:
+            yield own
+        finally:
+            own.close()
+
+    def _load(self, db, user_id: int, conversation_id: str):
+        from .. import models
+        return (
+            db.query(models.ChatConversation)
+            .filter(models.ChatConversation.user_id == user_id)
+            .filter(models.ChatConversation.conversation_id == conversation_id)
+            .first()
+        )
+
+    def _expired(self, row) -> bool:
+        if row.updated_at is None:
+            return False
+        return datetime.now(timezone.utc) - _as_utc(row.updated_at) > timedelta(seconds=self.ttl_seconds)
+
+    def get(self, user_id: int, conversation_id: str, db=None) -> Conversation:
+        with self._session(db) as db:
+            row = self._load(db, user_id, conversation_id)
+            if row is None or self._expired(row):
+                return Conversation()
+            return Conversation(row.summary or "", [tuple(t) for t in json.loads(row.turns or "[]")])
+
+    def append(self, user_id: int, conversation_id: str, *turns: Tuple[str, str], db=None) -> Conversation:
+        from .. import models
+        with self._session(db) as db:
+            row = self._load(db, user_id, conversation_id)
+            if row is None:
+                row = models.ChatConversation(user_id=user_id, conversation_id=conversation_id)
+                db.add(row)
+                conversation = Conversation()
+            elif self._expired(row):
+                conversation = Conversation()
+            else:
+                conversation = Conversation(row.summary or "", [tuple(t) for t in json.loads(row.turns or "[]")])
+            conversation.turns.extend(turns)
+            compact(conversation)
+            row.summary = conversation.summary
+            row.turns = json.dumps(conversation.turns)
+            row.updated_at = datetime.now(timezone.utc)
+            db.commit()
+            return conversation
+
+    def purge_expired(self) -> int:
+        from .. import models
+        with self._session() as db:
+            cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.ttl_seconds)
+            deleted = (
+                db.query(models.ChatConversation)
+                .filter(models.ChatConversation.updated_at < cutoff)
+                .delete(synchronize_session=False)
+            )
+            db.commit()
+            return deleted
+
+
+def _create_store():
+    if CHAT_STORE == "db":
+        return SQLConversationStore()
+    return InMemoryConversationStore()
+
+
+store = _create_store()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain stored chat conversations.")
+    parser.add_argument("command", choices=["purge"])
+    parser.parse_args()
+    print(f"✅ Purged {store.purge_expired()} expired conversations")
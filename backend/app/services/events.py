@@ -0,0 +1,227 @@
+import asyncio
+import json
+import os
+import threading
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EVENT_BROKER = os.getenv("EVENT_BROKER", "local")
+EVENT_REDIS_URL = os.getenv("EVENT_REDIS_URL", os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+EVENT_CHANNEL = os.getenv("EVENT_CHANNEL", "civicpulse:events")
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "100"))
+# Backoff between attempts to resubscribe after the Redis connection drops.
+EVENT_RECONNECT_SECONDS = float(os.getenv("EVENT_RECONNECT_SECONDS", "1"))
+EVENT_RECONNECT_MAX_SECONDS = float(os.getenv("EVENT_RECONNECT_MAX_SECONDS", "30"))
+
+
+def user_topic(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def role_topic(role: str) -> str:
+    return f"role:{role}"
+
+
+class Subscription:
+    """A bounded per-client queue. When a slow client falls behind, the oldest
+    events are dropped and the client is told to resync instead of letting the
+    queue grow without limit."""
+
+    def __init__(self, topics: Iterable[str], maxsize: int = EVENT_QUEUE_SIZE):
+        self.topics: Set[str] = set(topics)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def put(self, event: Dict[str, Any]):
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def take_dropped(self) -> int:
+        dropped, self.dropped = self.dropped, 0
+        return dropped
+
+
+class LocalBroker:
+    """Fan-out within a single process."""
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._deliver: Optional[Callable[[Dict[str, Any]], None]] = None
+
+    async def start(self, deliver: Callable[[Dict[str, Any]], None]):
+        self._loop = asyncio.get_running_loop()
+        self._deliver = deliver
+
+    async def stop(self):
+        self._loop = None
+
+    def publish(self, message: Dict[str, Any]):
+        if self._loop is None or self._deliver is None:
+            return
+        # Route handlers run in the threadpool, so hand the message over to the
+        # event loop instead of touching the subscriber queues directly.
+        self._loop.call_soon_threadsafe(self._deliver, message)
+
+
+class RedisBroker:
+    """Fan-out across workers through Redis pub/sub. Every worker, including
+    the publisher, receives the message from Redis and delivers it locally.
+    If the subscription drops, it is re-established with exponential backoff;
+    messages published in the meantime are not delivered."""
+
+    def __init__(self, url: str = EVENT_REDIS_URL, channel: str = EVENT_CHANNEL):
+        self.url = url
+        self.channel = channel
+        self._publisher = None
+        self._pubsub = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+
+    async def start(self, deliver: Callable[[Dict[str, Any]], None]):
+        await self._subscribe()
+        self._task = asyncio.create_task(self._listen(deliver))
+
+    async def _subscribe(self):
+        import redis.asyncio as aioredis
+
+        client = aioredis.from_url(self.url)
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(self.channel)
+        self._pubsub = pubsub
+
+    async def _unsubscribe(self):
+        pubsub, self._pubsub = self._pubsub, None
+        if pubsub is not None:
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass
+
+    async def _listen(self, deliver: Callable[[Dict[str, Any]], None]):
+        delay = EVENT_RECONNECT_SECONDS
+        while True:
+            try:
+                if self._pubsub is None:
+                    await self._subscribe()
+                    print("Event broker resubscribed")
+                    delay = EVENT_RECONNECT_SECONDS
+                async for raw in self._pubsub.listen():
+                    try:
+                        deliver(json.loads(raw["data"]))
+                    except Exception as e:
+                        print(f"Event broker error: {e}")
+                error = "subscription ended"
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error = e
+            print(f"Event broker disconnected ({error}), retrying in {delay:g}s")
+            await self._unsubscribe()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, EVENT_RECONNECT_MAX_SECONDS)
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        await self._unsubscribe()
+
+    def publish(self, message: Dict[str, Any]):
+        if self._publisher is None:
+            with self._lock:
+                if self._publisher is None:
+                    import redis
+
+                    self._publisher = redis.Redis.from_url(self.url)
+        try:
+            self._publisher.publish(self.channel, json.dumps(message, default=str))
+        except Exception as e:
+            print(f"Event publish error: {e}")
+
+
+class EventBus:
+    def __init__(self, broker=None):
+        self.broker = broker or LocalBroker()
+        self._subscriptions: Dict[str, Set[Subscription]] = {}
+        self._started = False
+
+    async def start(self):
+        if not self._started:
+            await self.broker.start(self._deliver)
+            self._started = True
+
+    async def stop(self):
+        if self._started:
+            await self.broker.stop()
+            self._started = False
+
+    def subscribe(self, topics: Iterable[str]) -> Subscription:
+        subscription = Subscription(topics)
+        for topic in subscription.topics:
+            self._subscriptions.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        for topic in subscription.topics:
+            subscribers = self._subscriptions.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscriptions[topic]
+
+    def publish(self, topics: Iterable[str], event: Dict[str, Any]):
+        if not self._started:
+            return
+        event = dict(event, id=event.get("id") or uuid.uuid4().hex)
+        self.broker.publish({"topics": list(topics), "event": event})
+
+    def _deliver(self, message: Dict[str, Any]):
+        targets: Set[Subscription] = set()
+        for topic in message.get("topics", []):
+            targets.update(self._subscriptions.get(topic, ()))
+        for subscription in targets:
+            subscription.put(message["event"])
+
+
+def _create_broker():
+    if EVENT_BROKER == "redis":
+        return RedisBroker()
+    return LocalBroker()
+
+
+bus = EventBus(_create_broker())
+
+
+def publish_timeline(grievance, timeline):
+    """Publish a committed Timeline row to the grievance's citizen, its
+    assignee and the admin role."""
+    topics: List[str] = [user_topic(grievance.citizen_id), role_topic("Admin")]
+    if grievance.assignee_id:
+        topics.append(user_topic(grievance.assignee_id))
+
+    bus.publish(topics, {
+        "type": "grievance.timeline",
+        "grievance_id": grievance.id,
+        "timeline_id": timeline.id,
+        "status": str(getattr(timeline.status, "value", timeline.status)),
+        "remark": timeline.remark,
+        "created_at": timeline.created_at.isoformat() if timeline.created_at else None,
+        "citizen_id": grievance.citizen_id,
+        "assignee_id": grievance.assignee_id,
+        "department_id": grievance.department_id,
+    })
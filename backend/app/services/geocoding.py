@@ -0,0 +1,318 @@
+"""
+Offline geocoding of the free-text grievance `location` field.
+
+Locations are normalized ("Opp. M.G. Road Bus Stand, Pune" becomes
+"mg road bus stand pune") and matched against the bundled gazetteer in
+app/data/gazetteer.csv: the longest run of words that names a known place
+wins, with districts named elsewhere in the string (or the grievance's
+state/district) deciding between places that share a name. Results,
+including misses, are stored in geocode_cache keyed by the normalized
+string, behind an in-process LRU, so a repeated address is a dict lookup.
+
+    python -m app.services.geocoding backfill   # set lat/lng on grievances from their location
+"""
+import argparse
+import csv
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, func, select, update
+
+from .. import database, metrics, models
+from .regions import hierarchy
+
+GAZETTEER_PATH = os.getenv(
+    "GAZETTEER_PATH", os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "gazetteer.csv")
+)
+GEOCODE_CACHE_SIZE = int(os.getenv("GEOCODE_CACHE_SIZE", "10000"))
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+
+ABBREVIATIONS = {
+    "nr": "near",
+    "opp": "opposite",
+    "rd": "road",
+    "mkt": "market",
+    "stn": "station",
+    "ngr": "nagar",
+}
+# Words that position a place rather than name it. House and ward numbers
+# are dropped as well, so "Ward 12, Mumbai" and "Ward 40, Mumbai" share an entry.
+FILLER_WORDS = {
+    "a", "and", "area", "at", "behind", "beside", "in", "near", "next", "no", "of", "opposite", "the", "to", "ward",
+}
+
+# More specific places win over the district they sit in.
+KIND_RANK = {"locality": 2, "district": 1}
+
+
+def normalize(location: Optional[str]) -> str:
+    text = unicodedata.normalize("NFKC", location or "").lower()
+    text = _PUNCTUATION_RE.sub(" ", text)
+    tokens: List[str] = []
+    initials = ""
+    for token in text.split():
+        # Rejoin initials split by punctuation: "M.G. Road" -> "mg road".
+        if len(token) == 1 and token.isalpha() and token not in FILLER_WORDS:
+            initials += token
+            continue
+        if initials:
+            tokens.append(initials)
+            initials = ""
+        token = ABBREVIATIONS.get(token, token)
+        if token in FILLER_WORDS or token.isdigit():
+            continue
+        tokens.append(token)
+    if initials:
+        tokens.append(initials)
+    return " ".join(tokens)
+
+
+def cache_key(location: Optional[str], state: Optional[str] = None, district: Optional[str] = None) -> Optional[str]:
+    """Cache key for a location, or None if nothing is left after
+    normalizing. The state and district hints can change the match, so
+    they are part of the key."""
+    normalized = normalize(location)
+    if not normalized:
+        return None
+    return f"{normalized}|{normalize(state)}|{normalize(district)}"
+
+
+@dataclass(frozen=True)
+class Place:
+    name: str
+    kind: str
+    state: str
+    district: str
+    lat: float
+    lng: float
+
+
+@dataclass(frozen=True)
+class GeocodeResult:
+    lat: float
+    lng: float
+    region_id: Optional[int]
+    matched: str
+
+
+class Gazetteer:
+    """Places indexed by their normalized name as a tuple of words."""
+
+    def __init__(self, places: Iterable[Place]):
+        self._index: Dict[Tuple[str, ...], List[Place]] = {}
+        for place in places:
+            words = tuple(normalize(place.name).split())
+            if words:
+                self._index.setdefault(words, []).append(place)
+        self.max_words = max((len(words) for words in self._index), default=0)
+        self.size = sum(len(places) for places in self._index.values())
+
+    @classmethod
+    def load(cls, path: str = GAZETTEER_PATH) -> "Gazetteer":
+        with open(path, newline="", encoding="utf-8") as f:
+            return cls(
+                Place(row["name"], row["kind"], row["state"], row["district"], float(row["lat"]), float(row["lng"]))
+                for row in csv.DictReader(f)
+            )
+
+    def lookup(self, normalized: str, state: Optional[str] = None, district: Optional[str] = None) -> Optional[Place]:
+        words = normalized.split()
+        matches: List[Tuple[int, Place]] = []
+        start = 0
+        while start < len(words):
+            for length in range(min(self.max_words, len(words) - start), 0, -1):
+                places = self._index.get(tuple(words[start:start + length]))
+                if places:
+                    matches.extend((length, place) for place in places)
+                    break
+            else:
+                length = 1
+            start += length
+        if not matches:
+            return None
+
+        # Districts named in the string or passed as hints narrow down
+        # places that share a name ("MG Road" in Pune, Bengaluru and Kochi).
+        districts = {normalize(place.district) for _, place in matches if place.kind == "district"}
+        states = {normalize(place.state) for _, place in matches if place.kind == "district"}
+        if district:
+            districts.add(normalize(district))
+        if state:
+            states.add(normalize(state))
+        if districts or states:
+            matches = [
+                (length, place) for length, place in matches
+                if normalize(place.district) in districts or normalize(place.state) in states
+            ]
+            if not matches:
+                return None
+
+        def rank(match):
+            length, place = match
+            return (normalize(place.district) in districts, KIND_RANK.get(place.kind, 0), length)
+
+        best = max(rank(match) for match in matches)
+        candidates = {place for length, place in matches if rank((length, place)) == best}
+        if len({(place.lat, place.lng) for place in candidates}) > 1:
+            return None
+        return candidates.pop()
+
+
+class Geocoder:
+    """
+    Gazetteer lookups with two cache layers: an in-process LRU of
+    GEOCODE_CACHE_SIZE keys and the geocode_cache table shared by all
+    workers. The gazetteer file is read on first use.
+    """
+
+    def __init__(self, path: str = GAZETTEER_PATH, cache_size: int = GEOCODE_CACHE_SIZE):
+        self.path = path
+        self._gazetteer: Optional[Gazetteer] = None
+        self._memory: "OrderedDict[str, Optional[GeocodeResult]]" = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+    @property
+    def gazetteer(self) -> Gazetteer:
+        if self._gazetteer is None:
+            with self._lock:
+                if self._gazetteer is None:
+                    self._gazetteer = Gazetteer.load(self.path)
+        return self._gazetteer
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+
+    def _remember(self, key: str, result: Optional[GeocodeResult]):
+        with self._lock:
+            self._memory[key] = result
+            self._memory.move_to_end(key)
+            while len(self._memory) > self._cache_size:
+                self._memory.popitem(last=False)
+
+    def _resolve(self, conn, key: str) -> Optional[GeocodeResult]:
+        normalized, state, district = key.split("|")
+        place = self.gazetteer.lookup(normalized, state or None, district or None)
+        if place is None:
+            return None
+        # The gazetteer's district is authoritative; the nearest centroid
+        # covers places in districts the region table does not list.
+        region_id = (
+            hierarchy.resolve(place.state, place.district, conn=conn)
+            or hierarchy.nearest(place.lat, place.lng, conn=conn)
+        )
+        return GeocodeResult(place.lat, place.lng, region_id, place.name)
+
+    def geocode(
+        self, conn, location: Optional[str], state: Optional[str] = None, district: Optional[str] = None
+    ) -> Optional[GeocodeResult]:
+        return self.geocode_many(conn, [(location, state, district)])[0]
+
+    def geocode_many(
+        self, conn, items: Sequence[Tuple[Optional[str], Optional[str], Optional[str]]]
+    ) -> List[Optional[GeocodeResult]]:
+        """Geocode (location, state, district) tuples, reading and filling
+        the geocode_cache table through `conn` for keys not held in memory."""
+        keys = [cache_key(*item) for item in items]
+        results: Dict[str, Optional[GeocodeResult]] = {}
+        missing = []
+        with self._lock:
+            for key in set(keys) - {None}:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    results[key] = self._memory[key]
+                    metrics.geocode_lookups_total.inc("memory")
+                else:
+                    missing.append(key)
+
+        if missing:
+            cache = models.GeocodeCache.__table__
+            rows = conn.execute(select(cache).where(cache.c.normalized.in_(missing))).all()
+            for row in rows:
+                result = GeocodeResult(row.lat, row.lng, row.region_id, row.matched) if row.lat is not None else None
+                results[row.normalized] = result
+                self._remember(row.normalized, result)
+                metrics.geocode_lookups_total.inc("database")
+
+            new_rows = []
+            for key in set(missing) - set(results):
+                result = self._resolve(conn, key)
+                results[key] = result
+                self._remember(key, result)
+                metrics.geocode_lookups_total.inc("gazetteer" if result else "miss")
+                new_rows.append({
+                    "normalized": key,
+                    "lat": result.lat if result else None,
+                    "lng": result.lng if result else None,
+                    "region_id": result.region_id if result else None,
+                    "matched": result.matched if result else None,
+                })
+            if new_rows:
+                # Another worker may have cached the same key since it was read.
+                conn.execute(database.insert_ignoring_conflicts(conn, cache, ["normalized"]), new_rows)
+
+        return [results.get(key) if key else None for key in keys]
+
+
+geocoder = Geocoder()
+
+
+def backfill_coordinates(engine=None, batch_size: int = 1000) -> int:
+    """
+    Set lat/lng, and region_id where missing, on grievances that have a
+    location but no coordinates. Streams through the table in id-ordered
+    batches, one transaction each, so it can be stopped and rerun.
+    """
+    engine = engine or database.get_engine()
+    grievances = models.Grievance.__table__
+    updated = 0
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                select(grievances.c.id, grievances.c.location, grievances.c.state, grievances.c.district)
+                .where(
+                    grievances.c.id > last_id,
+                    grievances.c.location.isnot(None),
+                    grievances.c.lat.is_(None),
+                )
+                .order_by(grievances.c.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            results = geocoder.geocode_many(conn, [(row.location, row.state, row.district) for row in rows])
+            changes = [
+                {"grievance_id": row.id, "geo_lat": result.lat, "geo_lng": result.lng, "geo_region_id": result.region_id}
+                for row, result in zip(rows, results) if result is not None
+            ]
+            if changes:
+                conn.execute(
+                    update(grievances)
+                    .where(grievances.c.id == bindparam("grievance_id"))
+                    .values(
+                        lat=bindparam("geo_lat"),
+                        lng=bindparam("geo_lng"),
+                        region_id=func.coalesce(grievances.c.region_id, bindparam("geo_region_id")),
+                    ),
+                    changes,
+                )
+                updated += len(changes)
+        print(f"Geocoded {updated} grievances (up to id {last_id})")
+    return updated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Geocode grievance locations from the bundled gazetteer.")
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    print(f"✅ Set coordinates on {backfill_coordinates(batch_size=args.batch_size)} grievances")
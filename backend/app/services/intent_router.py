@@ -0,0 +1,222 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from .. import models
+
+STATUS_INTENT = "status"
+FAQ_INTENT = "faq"
+
+_WORD_RE = re.compile(r"[a-z0-9#]+")
+_ID_RE = re.compile(r"(?:#|\b(?:grievance|complaint|id|no|number|ticket)\s*#?\s*)(\d+)")
+
+_STATUS_VERBS = {"status", "update", "updates", "progress", "track", "tracking", "happened", "happening", "resolved", "pending"}
+_STATUS_NOUNS = {"complaint", "complaints", "grievance", "grievances", "issue", "issues", "report", "reports", "ticket", "request"}
+_STATUS_PHRASES = (
+    "where is my", "any update", "what is happening with", "is my complaint", "is my grievance",
+    "what is new with", "what s new with", "whats new with", "anything new on", "anything new with",
+)
+
+# Each FAQ entry is (required words, any-of words, answer). A message matches
+# when it contains all required words and at least one of the any-of words.
+FAQ_ENTRIES: List[Tuple[frozenset, frozenset, str]] = [
+    (
+        frozenset(),
+        frozenset({"file", "submit", "register", "raise", "lodge", "report", "create", "make"}),
+        "To file a grievance, sign in and open the home page. Fill in the title and description, "
+        "choose your state and district, optionally attach a photo, and press Submit. "
+        "The system classifies and routes it to the right department automatically.",
+    ),
+    (
+        frozenset({"how", "long"}),
+        frozenset({"take", "resolve", "resolution", "time", "days"}),
+        "Resolution time depends on the department and priority. Critical issues are handled first; "
+        "you can follow every step on the My Grievances page.",
+    ),
+    (
+        frozenset(),
+        frozenset({"feedback", "rate", "rating"}),
+        "Once your grievance is marked Resolved you can rate the resolution and leave a comment from "
+        "the grievance details page.",
+    ),
+    (
+        frozenset(),
+        frozenset({"after", "next", "process", "workflow"}),
+        "After submission your grievance is classified, assigned to a field officer of the responsible "
+        "department, worked on, and verified by an admin before it is marked Resolved.",
+    ),
+    (
+        frozenset(),
+        frozenset({"contact", "support", "helpline", "phone", "email"}),
+        "For help beyond this assistant please contact your local municipal office or the CivicPulse support desk.",
+    ),
+]
+
+_FAQ_TRIGGERS = {"how", "what", "when", "can", "where", "do", "does", "help"}
+_FAQ_SUBJECTS = {"grievance", "complaint", "issue", "feedback", "support", "contact", "helpline", "process", "report"}
+
+# Messages made up only of these words (and fillers) get the canned replies;
+# anything more goes through the intents or to the model.
+_GREETINGS = {"hi", "hello", "hey", "namaste", "good", "morning", "afternoon", "evening"}
+_ACKNOWLEDGEMENTS = {"thanks", "thank", "ok", "okay", "great", "cool"}
+_FILLERS = {"there", "you", "much", "so", "very"}
+GREETING_ANSWER = "Hello! I can help you file a grievance, check the status of your complaints, or explain how the process works."
+ACKNOWLEDGEMENT_ANSWER = "Glad to help. Let me know if there is anything else you need."
+
+FAQ_CACHE_SIZE = 1024
+
+
+class IntentRouterStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.total = 0
+        self.deflected: Dict[str, int] = {}
+        self.local_seconds = 0.0
+        self.model_calls = 0
+        self.model_seconds = 0.0
+
+    def record_local(self, intent: str, seconds: float):
+        with self._lock:
+            self.total += 1
+            self.deflected[intent] = self.deflected.get(intent, 0) + 1
+            self.local_seconds += seconds
+
+    def record_model(self, seconds: float):
+        with self._lock:
+            self.total += 1
+            self.model_calls += 1
+            self.model_seconds += seconds
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            deflected = sum(self.deflected.values())
+            local_avg_ms = self.local_seconds / deflected * 1000 if deflected else 0.0
+            model_avg_ms = self.model_seconds / self.model_calls * 1000 if self.model_calls else 0.0
+            return {
+                "total_messages": self.total,
+                "deflected_messages": deflected,
+                "deflection_rate": deflected / self.total if self.total else 0.0,
+                "deflected_by_intent": dict(self.deflected),
+                "model_messages": self.model_calls,
+                "avg_local_latency_ms": round(local_avg_ms, 3),
+                "avg_model_latency_ms": round(model_avg_ms, 3),
+                "latency_saved_ms": round((model_avg_ms - local_avg_ms) * deflected, 1) if self.model_calls else None,
+            }
+
+
+class IntentRouter:
+    """
+    Answers common chat messages locally so they never reach the LLM:
+    status questions are answered from the user's own grievances and
+    timeline, procedural questions from the FAQ table. Anything else returns
+    None and should go to the model.
+    """
+
+    def __init__(self, faq_cache_size: int = FAQ_CACHE_SIZE):
+        self.stats = IntentRouterStats()
+        self._faq_cache: "OrderedDict[str, Optional[str]]" = OrderedDict()
+        self._faq_cache_size = faq_cache_size
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(message: str) -> str:
+        return " ".join(_WORD_RE.findall(message.lower()))
+
+    def classify(self, normalized: str) -> Optional[str]:
+        words = set(normalized.split())
+        if _ID_RE.search(normalized) and (words & _STATUS_VERBS or words & _STATUS_NOUNS):
+            return STATUS_INTENT
+        if (words & _STATUS_VERBS and words & _STATUS_NOUNS) or any(p in normalized for p in _STATUS_PHRASES):
+            return STATUS_INTENT
+        if self._faq_answer(normalized) is not None:
+            return FAQ_INTENT
+        return None
+
+    def route(self, message: str, user: models.User, db: Session) -> Optional[Tuple[str, str]]:
+        started = time.perf_counter()
+        normalized = self.normalize(message)
+        intent = self.classify(normalized)
+        if intent is None:
+            return None
+
+        if intent == STATUS_INTENT:
+            answer = self._status_answer(normalized, user, db)
+        else:
+            answer = self._faq_answer(normalized)
+
+        self.stats.record_local(intent, time.perf_counter() - started)
+        return intent, answer
+
+    def _faq_answer(self, normalized: str) -> Optional[str]:
+        with self._lock:
+            if normalized in self._faq_cache:
+                self._faq_cache.move_to_end(normalized)
+                return self._faq_cache[normalized]
+
+        answer = self._match_faq(normalized)
+        with self._lock:
+            self._faq_cache[normalized] = answer
+            if len(self._faq_cache) > self._faq_cache_size:
+                self._faq_cache.popitem(last=False)
+        return answer
+
+    @staticmethod
+    def _match_faq(normalized: str) -> Optional[str]:
+        words = set(normalized.split())
+        if words & _GREETINGS and words <= _GREETINGS | _FILLERS:
+            return GREETING_ANSWER
+        if words & _ACKNOWLEDGEMENTS and words <= _ACKNOWLEDGEMENTS | _FILLERS:
+            return ACKNOWLEDGEMENT_ANSWER
+        if not (words & _FAQ_TRIGGERS and words & _FAQ_SUBJECTS):
+            return None
+        for required, any_of, answer in FAQ_ENTRIES:
+            if required <= words and words & any_of:
+                return answer
+        return None
+
+    @staticmethod
+    def _describe(grievance: models.Grievance, latest: Optional[models.Timeline]) -> str:
+        status = getattr(grievance.status, "value", grievance.status)
+        text = f"Grievance #{grievance.id} \"{grievance.title}\" is currently {status}."
+        if latest is not None:
+            when = latest.created_at.strftime("%d %b %Y") if latest.created_at else "recently"
+            text += f" Last update ({when}): {latest.remark or latest.status}."
+        return text
+
+    def _status_answer(self, normalized: str, user: models.User, db: Session) -> str:
+        query = db.query(models.Grievance)
+        if user.role == models.UserRole.FIELD_OFFICER:
+            query = query.filter(models.Grievance.assignee_id == user.id)
+        elif user.role != models.UserRole.ADMIN:
+            query = query.filter(models.Grievance.citizen_id == user.id)
+
+        match = _ID_RE.search(normalized)
+        if match:
+            grievances = query.filter(models.Grievance.id == int(match.group(1))).all()
+            if not grievances:
+                return f"I couldn't find grievance #{match.group(1)} among your grievances. Please check the number on your dashboard."
+        else:
+            grievances = query.order_by(models.Grievance.id.desc()).limit(3).all()
+            if not grievances:
+                return "You have not submitted any grievances yet. You can file one from the home page."
+
+        latest_by_grievance = {}
+        for timeline in (
+            db.query(models.Timeline)
+            .filter(models.Timeline.grievance_id.in_([g.id for g in grievances]))
+            .order_by(models.Timeline.id)
+            .all()
+        ):
+            latest_by_grievance[timeline.grievance_id] = timeline
+
+        lines = [self._describe(g, latest_by_grievance.get(g.id)) for g in grievances]
+        if not match:
+            lines.insert(0, "Here are your most recent grievances:")
+        return "\n".join(lines)
+
+
+router = IntentRouter()
@@ -0,0 +1,407 @@
+"""
+Citizen notifications through a transactional outbox.
+
+Every Timeline row inserted through the ORM adds a notification_outbox row
+per channel the citizen can be reached on (email, and SMS when they have a
+phone number) on the same connection, so it commits or rolls back with the
+status change and the request never waits on a provider. A background
+Dispatcher claims due rows in batches of NOTIFY_BATCH_SIZE, sends them
+through the channel adapters with at most NOTIFY_CONCURRENCY sends in
+flight per channel, and marks them sent, or retries them with exponential
+backoff up to NOTIFY_MAX_ATTEMPTS. Each row has a unique dedupe key
+(timeline row and channel), which adapters pass to the provider so that a
+send repeated after a crash is not delivered twice where supported.
+
+Adapters are picked by NOTIFY_EMAIL_CHANNEL (smtp or fake) and
+NOTIFY_SMS_CHANNEL (webhook or fake). A channel left unset is off: nothing
+is queued for it and no dispatcher sends on it. The fake channel only
+records messages, so it has to be asked for explicitly, for tests and
+local development. Run one dispatcher process next to the API, or set
+NOTIFY_DISPATCHER_ENABLED=1 to run one in each API worker (claims are
+leased, so several dispatchers never send the same row).
+
+    python -m app.services.notifications dispatch          # run a dispatcher worker
+    python -m app.services.notifications dispatch --once   # drain due rows and exit
+    python -m app.services.notifications prune             # delete settled rows older than NOTIFY_RETENTION_DAYS
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import bindparam, event, select
+from sqlalchemy.orm import object_session
+from sqlalchemy.orm.util import identity_key
+
+from .. import database, metrics, models
+
+load_dotenv()
+
+NOTIFY_DISPATCHER_ENABLED = os.getenv("NOTIFY_DISPATCHER_ENABLED", "0") == "1"
+NOTIFY_EMAIL_CHANNEL = os.getenv("NOTIFY_EMAIL_CHANNEL", "")
+NOTIFY_SMS_CHANNEL = os.getenv("NOTIFY_SMS_CHANNEL", "")
+NOTIFY_BATCH_SIZE = int(os.getenv("NOTIFY_BATCH_SIZE", "100"))
+NOTIFY_POLL_SECONDS = float(os.getenv("NOTIFY_POLL_SECONDS", "2"))
+NOTIFY_MAX_ATTEMPTS = int(os.getenv("NOTIFY_MAX_ATTEMPTS", "5"))
+NOTIFY_RETRY_SECONDS = float(os.getenv("NOTIFY_RETRY_SECONDS", "30"))
+# A claimed row is retried if its dispatcher has not settled it within this long.
+NOTIFY_LEASE_SECONDS = float(os.getenv("NOTIFY_LEASE_SECONDS", "120"))
+# Sends in flight per channel, e.g. "email=8,sms=4"; channels not listed get 4.
+NOTIFY_CONCURRENCY = os.getenv("NOTIFY_CONCURRENCY", "email=8,sms=4")
+# Sent and failed rows are kept this long for auditing, then pruned.
+NOTIFY_RETENTION_DAYS = int(os.getenv("NOTIFY_RETENTION_DAYS", "30"))
+
+NOTIFY_SMTP_HOST = os.getenv("NOTIFY_SMTP_HOST", "localhost")
+NOTIFY_SMTP_PORT = int(os.getenv("NOTIFY_SMTP_PORT", "587"))
+NOTIFY_SMTP_USER = os.getenv("NOTIFY_SMTP_USER", "")
+NOTIFY_SMTP_PASSWORD = os.getenv("NOTIFY_SMTP_PASSWORD", "")
+NOTIFY_EMAIL_FROM = os.getenv("NOTIFY_EMAIL_FROM", "noreply@civicpulse.local")
+NOTIFY_SMS_WEBHOOK_URL = os.getenv("NOTIFY_SMS_WEBHOOK_URL", "")
+
+# Adapter names accepted per channel.
+ADAPTERS = {"email": ("smtp", "fake"), "sms": ("webhook", "fake")}
+
+PENDING = "pending"
+SENT = "sent"
+FAILED = "failed"
+
+table = models.NotificationOutbox.__table__
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _status_value(status) -> str:
+    return getattr(status, "value", status)
+
+
+def configured_channels() -> Dict[str, str]:
+    """Channel -> adapter name, for the channels that are turned on."""
+    channels = {}
+    for channel, adapter in (("email", NOTIFY_EMAIL_CHANNEL), ("sms", NOTIFY_SMS_CHANNEL)):
+        if not adapter:
+            continue
+        if adapter not in ADAPTERS[channel]:
+            print(f"⚠️  Unknown {channel} notification channel {adapter!r}; {channel} notifications are off")
+            continue
+        channels[channel] = adapter
+    return channels
+
+
+CHANNELS = configured_channels()
+
+
+def parse_concurrency(raw: str = NOTIFY_CONCURRENCY) -> Dict[str, int]:
+    limits = {}
+    for part in filter(None, (p.strip() for p in raw.split(","))):
+        channel, _, limit = part.partition("=")
+        limits[channel.strip()] = max(1, int(limit))
+    return limits
+
+
+def enqueue(conn, grievance, timeline_id: int, status, remark: Optional[str] = None):
+    """Add the notifications for one timeline entry, in the caller's transaction."""
+    users = models.User.__table__
+    citizen = conn.execute(
+        select(users.c.email, users.c.phone_number).where(users.c.id == grievance.citizen_id)
+    ).first()
+    if citizen is None:
+        return
+    status = _status_value(status)
+    # Remarks are written for staff, so they are passed along but not sent.
+    payload = {
+        "grievance_id": grievance.id,
+        "timeline_id": timeline_id,
+        "status": status,
+        "remark": remark,
+        "subject": f"Grievance #{grievance.id}: {status}",
+        "body": f"Your grievance #{grievance.id} \"{grievance.title}\" is now {status}.",
+    }
+    rows = [
+        {
+            "channel": channel,
+            "recipient": recipient,
+            "dedupe_key": f"timeline:{timeline_id}:{channel}",
+            "payload": json.dumps(payload),
+            "next_attempt_at": _now(),
+        }
+        for channel, recipient in (("email", citizen.email), ("sms", citizen.phone_number))
+        if recipient and channel in CHANNELS
+    ]
+    if rows:
+        conn.execute(database.insert_ignoring_conflicts(conn, table, ["dedupe_key"]), rows)
+
+
+@event.listens_for(models.Timeline, "after_insert")
+def _timeline_inserted(mapper, connection, target):
+    if target.grievance_id is None or not CHANNELS:
+        return
+    session = object_session(target)
+    grievance = session.identity_map.get(identity_key(models.Grievance, target.grievance_id)) if session else None
+    if grievance is None:
+        grievances = models.Grievance.__table__
+        grievance = connection.execute(
+            select(grievances.c.id, grievances.c.citizen_id, grievances.c.title).where(grievances.c.id == target.grievance_id)
+        ).first()
+        if grievance is None:
+            return
+    enqueue(connection, grievance, target.id, target.status, target.remark)
+
+
+class ChannelError(Exception):
+    """A send that failed and should be retried."""
+
+
+class FakeChannel:
+    """
+    Records messages instead of sending them. `latency` simulates a
+    provider round trip and `failure_rate` transient failures.
+    """
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.sent: List[dict] = []
+        self._rng = random.Random(seed)
+
+    async def send(self, recipient: str, message: dict, dedupe_key: str):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self._rng.random() < self.failure_rate:
+            raise ChannelError("simulated failure")
+        self.sent.append({"recipient": recipient, "message": message, "dedupe_key": dedupe_key})
+
+
+class SmtpChannel:
+    """Email over SMTP with STARTTLS, one connection per message."""
+
+    async def send(self, recipient: str, message: dict, dedupe_key: str):
+        await asyncio.to_thread(self._send, recipient, message, dedupe_key)
+
+    @staticmethod
+    def _send(recipient: str, message: dict, dedupe_key: str):
+        import smtplib
+        from email.message import EmailMessage
+
+        email = EmailMessage()
+        email["From"] = NOTIFY_EMAIL_FROM
+        email["To"] = recipient
+        email["Subject"] = message["subject"]
+        email["Message-ID"] = f"<{dedupe_key.replace(':', '.')}@civicpulse>"
+        email.set_content(message["body"])
+        try:
+            with smtplib.SMTP(NOTIFY_SMTP_HOST, NOTIFY_SMTP_PORT, timeout=30) as smtp:
+                smtp.starttls()
+                if NOTIFY_SMTP_USER:
+                    smtp.login(NOTIFY_SMTP_USER, NOTIFY_SMTP_PASSWORD)
+                smtp.send_message(email)
+        except (smtplib.SMTPException, OSError) as e:
+            raise ChannelError(str(e)) from e
+
+
+class WebhookSmsChannel:
+    """SMS through an HTTP gateway: POSTs {"to", "body"} as JSON to
+    NOTIFY_SMS_WEBHOOK_URL with the dedupe key as Idempotency-Key."""
+
+    def __init__(self, url: str = NOTIFY_SMS_WEBHOOK_URL):
+        self.url = url
+        self._client = None
+
+    async def send(self, recipient: str, message: dict, dedupe_key: str):
+        import httpx
+
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=15)
+        try:
+            response = await self._client.post(
+                self.url, json={"to": recipient, "body": message["body"]}, headers={"Idempotency-Key": dedupe_key}
+            )
+        except httpx.HTTPError as e:
+            raise ChannelError(str(e)) from e
+        if response.status_code >= 400:
+            raise ChannelError(f"SMS gateway returned {response.status_code}")
+
+
+def create_channels() -> Dict[str, object]:
+    adapters = {"smtp": SmtpChannel, "webhook": WebhookSmsChannel, "fake": FakeChannel}
+    return {channel: adapters[adapter]() for channel, adapter in CHANNELS.items()}
+
+
+def claim_batch(engine, channel: str, batch_size: int = NOTIFY_BATCH_SIZE, lease_seconds: float = NOTIFY_LEASE_SECONDS) -> list:
+    """Due rows of `channel`, leased to this dispatcher by pushing their next_attempt_at
+    past the lease so other dispatchers skip them meanwhile."""
+    now = _now()
+    with engine.begin() as conn:
+        query = (
+            select(table.c.id)
+            .where(table.c.status == PENDING, table.c.channel == channel, table.c.next_attempt_at <= now)
+            .order_by(table.c.next_attempt_at)
+            .limit(batch_size)
+        )
+        if conn.dialect.name == "postgresql":
+            query = query.with_for_update(skip_locked=True)
+        ids = conn.execute(query).scalars().all()
+        if not ids:
+            return []
+        # The repeated due check keeps two SQLite dispatchers from both claiming a row.
+        return conn.execute(
+            table.update()
+            .where(table.c.id.in_(ids), table.c.next_attempt_at <= now)
+            .values(next_attempt_at=now + timedelta(seconds=lease_seconds))
+            .returning(table.c.id, table.c.channel, table.c.recipient, table.c.dedupe_key, table.c.payload, table.c.attempts)
+        ).all()
+
+
+def settle(engine, sent: List[int], failures: List[dict]):
+    """Mark sent rows and reschedule (or give up on) failed ones in one transaction."""
+    now = _now()
+    with engine.begin() as conn:
+        if sent:
+            conn.execute(table.update().where(table.c.id.in_(sent)).values(
+                status=SENT, sent_at=now, attempts=table.c.attempts + 1, last_error=None,
+            ))
+        if failures:
+            conn.execute(
+                table.update().where(table.c.id == bindparam("row_id")).values(
+                    status=bindparam("new_status"),
+                    attempts=bindparam("new_attempts"),
+                    next_attempt_at=bindparam("retry_at"),
+                    last_error=bindparam("error"),
+                ),
+                failures,
+            )
+
+
+def prune(engine=None, days: int = NOTIFY_RETENTION_DAYS) -> int:
+    """Delete sent and failed rows created more than `days` ago. Pending rows
+    are kept however old they are."""
+    engine = engine or database.get_engine()
+    cutoff = _now() - timedelta(days=days)
+    with engine.begin() as conn:
+        return conn.execute(
+            table.delete().where(table.c.status.in_([SENT, FAILED])).where(table.c.created_at < cutoff)
+        ).rowcount
+
+
+class Dispatcher:
+    def __init__(
+        self,
+        engine=None,
+        channels: Optional[Dict[str, object]] = None,
+        batch_size: int = NOTIFY_BATCH_SIZE,
+        concurrency: Optional[Dict[str, int]] = None,
+        poll_seconds: float = NOTIFY_POLL_SECONDS,
+    ):
+        self.engine = engine
+        self.channels = channels if channels is not None else create_channels()
+        self.batch_size = batch_size
+        self.concurrency = concurrency if concurrency is not None else parse_concurrency()
+        self.poll_seconds = poll_seconds
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _semaphore(self, channel: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(channel)
+        if semaphore is None:
+            semaphore = self._semaphores[channel] = asyncio.Semaphore(self.concurrency.get(channel, 4))
+        return semaphore
+
+    async def _send(self, row):
+        adapter = self.channels[row.channel]
+        async with self._semaphore(row.channel):
+            await adapter.send(row.recipient, json.loads(row.payload), row.dedupe_key)
+
+    async def dispatch_batch(self, channel: str) -> int:
+        """Claim, send and settle one batch of `channel`. Returns the number of rows claimed."""
+        engine = self.engine or database.get_engine()
+        rows = await asyncio.to_thread(claim_batch, engine, channel, self.batch_size)
+        if not rows:
+            return 0
+        outcomes = await asyncio.gather(*(self._send(row) for row in rows), return_exceptions=True)
+
+        sent, failures = [], []
+        retry_base = _now()
+        for row, outcome in zip(rows, outcomes):
+            if not isinstance(outcome, BaseException):
+                sent.append(row.id)
+                metrics.notifications_total.inc(row.channel, SENT)
+                continue
+            attempts = row.attempts + 1
+            gave_up = attempts >= NOTIFY_MAX_ATTEMPTS
+            failures.append({
+                "row_id": row.id,
+                "new_status": FAILED if gave_up else PENDING,
+                "new_attempts": attempts,
+                "retry_at": retry_base + timedelta(seconds=NOTIFY_RETRY_SECONDS * 2 ** (attempts - 1)),
+                "error": str(outcome)[:1000],
+            })
+            metrics.notifications_total.inc(row.channel, FAILED if gave_up else "retry")
+        await asyncio.to_thread(settle, engine, sent, failures)
+        return len(rows)
+
+    async def _drain_channel(self, channel: str) -> int:
+        total = 0
+        while True:
+            claimed = await self.dispatch_batch(channel)
+            total += claimed
+            if claimed < self.batch_size:
+                return total
+
+    async def drain(self) -> int:
+        """Dispatch batches until no row is due. Channels drain side by side,
+        so a slow one does not hold up the others. Returns the number claimed."""
+        return sum(await asyncio.gather(*(self._drain_channel(channel) for channel in self.channels)))
+
+    async def run(self):
+        while True:
+            try:
+                await self.drain()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Notification dispatcher error: {e}")
+            await asyncio.sleep(self.poll_seconds)
+
+    async def start(self):
+        if not self.channels:
+            print("⚠️  No notification channels configured; the dispatcher is not started")
+            return
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+dispatcher = Dispatcher()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Send queued citizen notifications.")
+    parser.add_argument("command", choices=["dispatch", "prune"])
+    parser.add_argument("--once", action="store_true", help="Drain the rows that are due and exit")
+    parser.add_argument("--days", type=int, default=NOTIFY_RETENTION_DAYS, help="Retention for prune")
+    args = parser.parse_args()
+    if args.command == "prune":
+        print(f"✅ Pruned {prune(days=args.days)} settled notifications")
+        parser.exit()
+    if not dispatcher.channels:
+        parser.exit(1, "No notification channels configured; set NOTIFY_EMAIL_CHANNEL and/or NOTIFY_SMS_CHANNEL\n")
+    if args.once:
+        started = time.perf_counter()
+        count = asyncio.run(dispatcher.drain())
+        print(f"✅ Dispatched {count} notifications in {time.perf_counter() - started:.1f}s")
+    else:
+        asyncio.run(dispatcher.run())
@@ -0,0 +1,414 @@
+"""
+Region hierarchy: the region_closure table and an in-memory copy of the tree.
+
+The closure table holds every (ancestor, descendant, depth) triple, so "all
+grievances anywhere under region X" is a single indexed join instead of a
+recursive query. ORM inserts, re-parenting and deletes of Region keep it up
+to date; bulk loads that bypass the ORM call rebuild_closure() afterwards.
+
+The in-memory tree is reloaded once a region change commits: at once in the
+process that made it, and in other workers through the shared "regions"
+cache generation (see app.cache).
+
+    python -m app.services.regions rebuild    # recompute the closure table
+    python -m app.services.regions backfill   # set grievances.region_id from coordinates or state/district
+"""
+import argparse
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, event, inspect, literal, select, text, true, update
+from sqlalchemy.orm import Session
+
+from .. import cache, database, models
+
+REGION_CACHE_TTL_SECONDS = float(os.getenv("REGION_CACHE_TTL_SECONDS", "300"))
+# Coordinates further than this from every region centroid stay unresolved.
+REGION_MAX_DISTANCE_KM = float(os.getenv("REGION_MAX_DISTANCE_KM", "75"))
+# How often the tree checks the shared "regions" generation for changes
+# committed by other workers.
+REGION_GENERATION_CHECK_SECONDS = float(os.getenv("REGION_GENERATION_CHECK_SECONDS", "1"))
+
+EARTH_RADIUS_KM = 6371.0
+
+STATE = "State"
+DISTRICT = "District"
+
+
+def _closure():
+    return models.RegionClosure.__table__
+
+
+def rebuild_closure(conn):
+    from ..migrations.v0004_region_closure import REBUILD_SQL
+
+    conn.execute(text("DELETE FROM region_closure"))
+    conn.execute(text(REBUILD_SQL))
+
+
+@event.listens_for(models.Region, "after_insert")
+def _region_inserted(mapper, connection, target):
+    closure = _closure()
+    connection.execute(closure.insert().values(ancestor_id=target.id, descendant_id=target.id, depth=0))
+    if target.parent_id is not None:
+        connection.execute(closure.insert().from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            select(closure.c.ancestor_id, literal(target.id), closure.c.depth + 1)
+            .where(closure.c.descendant_id == target.parent_id),
+        ))
+
+
+@event.listens_for(models.Region, "after_update")
+def _region_updated(mapper, connection, target):
+    if not inspect(target).attrs.parent_id.history.has_changes():
+        return
+    closure = _closure()
+    subtree = select(closure.c.descendant_id).where(closure.c.ancestor_id == target.id)
+    if target.parent_id is not None and connection.execute(
+        select(closure.c.depth).where(closure.c.ancestor_id == target.id, closure.c.descendant_id == target.parent_id)
+    ).first():
+        raise ValueError("A region cannot be moved under one of its own descendants")
+    # Detach the subtree from its old ancestors...
+    connection.execute(closure.delete().where(
+        closure.c.descendant_id.in_(subtree),
+        closure.c.ancestor_id.notin_(subtree),
+    ))
+    # ...and attach it under every ancestor of the new parent.
+    if target.parent_id is not None:
+        above = closure.alias("above")
+        below = closure.alias("below")
+        connection.execute(closure.insert().from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            select(above.c.ancestor_id, below.c.descendant_id, above.c.depth + below.c.depth + 1)
+            .select_from(above.join(below, true()))
+            .where(above.c.descendant_id == target.parent_id, below.c.ancestor_id == target.id),
+        ))
+
+
+@event.listens_for(models.Region, "after_delete")
+def _region_deleted(mapper, connection, target):
+    closure = _closure()
+    connection.execute(closure.delete().where(
+        (closure.c.ancestor_id == target.id) | (closure.c.descendant_id == target.id)
+    ))
+
+
+# The tree is only dropped once region changes are committed; dropping it at
+# flush would let another request reload uncommitted (or rolled back) rows.
+# Names, codes and coordinates feed the lookups too, so any change counts.
+@event.listens_for(Session, "after_flush")
+def _note_region_changes(session, flush_context):
+    if any(isinstance(obj, models.Region) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info["regions_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _reload_after_commit(session):
+    if session.info.pop("regions_changed", False):
+        hierarchy.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_region_changes(session):
+    session.info.pop("regions_changed", None)
+
+
+def _to_xyz(lat: float, lng: float) -> Tuple[float, float, float]:
+    lat, lng = math.radians(lat), math.radians(lng)
+    return (math.cos(lat) * math.cos(lng), math.cos(lat) * math.sin(lng), math.sin(lat))
+
+
+class SpatialIndex:
+    """
+    KD-tree over region centroids. Points are stored as unit vectors, where
+    straight-line distance orders points exactly as great-circle distance
+    does, so there is no distortion near the poles or the antimeridian.
+    """
+
+    def __init__(self, points: List[Tuple[float, float, int]]):
+        self._root = self._build([(_to_xyz(lat, lng), region_id) for lat, lng, region_id in points], 0)
+        self.size = len(points)
+
+    def _build(self, items, depth):
+        if not items:
+            return None
+        axis = depth % 3
+        items.sort(key=lambda item: item[0][axis])
+        middle = len(items) // 2
+        point, region_id = items[middle]
+        return (point, region_id, axis, self._build(items[:middle], depth + 1), self._build(items[middle + 1:], depth + 1))
+
+    def nearest(self, lat: float, lng: float) -> Optional[Tuple[int, float]]:
+        """(region id, distance in km) of the closest centroid, or None if empty."""
+        if self._root is None:
+            return None
+        target = _to_xyz(lat, lng)
+        best_id, best = None, float("inf")
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            point, region_id, axis, left, right = node
+            distance = (point[0] - target[0]) ** 2 + (point[1] - target[1]) ** 2 + (point[2] - target[2]) ** 2
+            if distance < best:
+                best_id, best = region_id, distance
+            delta = target[axis] - point[axis]
+            near, far = (left, right) if delta < 0 else (right, left)
+            # Visit the near side last so it is popped first.
+            if delta * delta < best:
+                stack.append(far)
+            stack.append(near)
+        chord = math.sqrt(best)
+        return best_id, 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+@dataclass
+class RegionNode:
+    id: int
+    name: str
+    code: str
+    type: Optional[str]
+    parent_id: Optional[int]
+    lat: Optional[float] = None
+    lng: Optional[float] = None
+    depth: int = 0
+    children: List[int] = field(default_factory=list)
+
+
+class RegionHierarchy:
+    """
+    The whole region tree held in memory for id/code/name lookups. Reloaded
+    after REGION_CACHE_TTL_SECONDS, when this process commits a region
+    change, or when the shared "regions" generation moves on because another
+    worker (or a job such as the bulk seeder) did.
+
+    Lookups take an optional `conn` to load the tree through when it is due;
+    request handlers pass their session's connection, since the pool may not
+    have a second one to spare.
+    """
+
+    def __init__(self, ttl: float = REGION_CACHE_TTL_SECONDS, generation_check: float = REGION_GENERATION_CHECK_SECONDS):
+        self.ttl = ttl
+        self.generation_check = generation_check
+        self._loaded_at = None
+        self._generation = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.nodes: Dict[int, RegionNode] = {}
+        self.roots: List[int] = []
+        self._by_code: Dict[str, int] = {}
+        self._states: Dict[str, int] = {}
+        self._districts: Dict[tuple, int] = {}
+        self.spatial = SpatialIndex([])
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    @staticmethod
+    def _load_rows(conn) -> list:
+        region = models.Region.__table__
+        return conn.execute(select(
+            region.c.id, region.c.name, region.c.code, region.c.type, region.c.parent_id, region.c.lat, region.c.lng
+        )).all()
+
+    def _fresh(self, check: bool = False) -> bool:
+        now = time.monotonic()
+        if self._loaded_at is None or now - self._loaded_at >= self.ttl:
+            return False
+        if check or now - self._checked_at >= self.generation_check:
+            generation = cache.cache.generation("regions")
+            # Unknown while the cache backend is down: rely on the TTL.
+            if generation is not None and generation != self._generation:
+                return False
+            self._checked_at = now
+        return True
+
+    def _ensure_loaded(self, conn=None, check: bool = False):
+        if self._fresh(check):
+            return
+        with self._lock:
+            if self._fresh(check):
+                return
+            # Read before loading, so a change committed meanwhile triggers
+            # another reload.
+            generation = cache.cache.generation("regions")
+            if conn is None:
+                with database.get_engine().connect() as own:
+                    rows = self._load_rows(own)
+            else:
+                rows = self._load_rows(conn)
+            nodes = {row.id: RegionNode(*row) for row in rows}
+            roots = []
+            for node in nodes.values():
+                parent = nodes.get(node.parent_id)
+                if parent is None:
+                    roots.append(node.id)
+                else:
+                    parent.children.append(node.id)
+            stack = [(root, 0) for root in roots]
+            while stack:
+                node_id, depth = stack.pop()
+                nodes[node_id].depth = depth
+                stack.extend((child, depth + 1) for child in nodes[node_id].children)
+            states, districts = {}, {}
+            for node in nodes.values():
+                if node.type == STATE and node.name:
+                    states[node.name.lower()] = node.id
+                elif node.type == DISTRICT and node.name and node.parent_id in nodes:
+                    districts[(nodes[node.parent_id].name.lower(), node.name.lower())] = node.id
+            # Only the most specific regions with coordinates are indexed, so a
+            # point resolves to a district rather than its state's centroid.
+            located = [
+                (node.lat, node.lng, node.id) for node in nodes.values()
+                if node.lat is not None and node.lng is not None
+                and not any(nodes[child].lat is not None for child in node.children)
+            ]
+            self.nodes, self.roots = nodes, roots
+            self._by_code = {node.code: node.id for node in nodes.values() if node.code}
+            self._states, self._districts = states, districts
+            self.spatial = SpatialIndex(located)
+            self._generation = generation
+            self._loaded_at = self._checked_at = time.monotonic()
+
+    def sync(self, conn=None):
+        """Reload now if the shared "regions" generation has moved on, without
+        waiting for the next periodic check. Call this before computing a
+        result cached under the "regions" tag, so it is not stored against
+        the new generation while built from the old tree."""
+        self._ensure_loaded(conn, check=True)
+
+    def get(self, region_id: int, conn=None) -> Optional[RegionNode]:
+        self._ensure_loaded(conn)
+        return self.nodes.get(region_id)
+
+    def by_code(self, code: str, conn=None) -> Optional[RegionNode]:
+        self._ensure_loaded(conn)
+        return self.nodes.get(self._by_code.get(code))
+
+    def children(self, region_id: Optional[int], conn=None) -> List[RegionNode]:
+        self._ensure_loaded(conn)
+        ids = self.roots if region_id is None else self.nodes[region_id].children
+        return [self.nodes[i] for i in ids]
+
+    def at_depth(self, depth: int, under: Optional[int] = None, conn=None) -> List[RegionNode]:
+        """Regions `depth` levels below `under`, or at absolute depth `depth`
+        (0 being the roots) when `under` is None."""
+        self._ensure_loaded(conn)
+        level = self.roots if under is None else [under]
+        for _ in range(depth):
+            level = [child for node_id in level for child in self.nodes[node_id].children]
+        return [self.nodes[i] for i in level]
+
+    def nearest(self, lat: float, lng: float, max_distance_km: float = REGION_MAX_DISTANCE_KM, conn=None) -> Optional[int]:
+        self._ensure_loaded(conn)
+        found = self.spatial.nearest(lat, lng)
+        if found is None or found[1] > max_distance_km:
+            return None
+        return found[0]
+
+    def resolve(
+        self,
+        state: Optional[str] = None,
+        district: Optional[str] = None,
+        region_code: Optional[str] = None,
+        lat: Optional[float] = None,
+        lng: Optional[float] = None,
+        conn=None,
+    ) -> Optional[int]:
+        """Most specific region for a grievance: its coordinates when given,
+        otherwise the free-text location fields."""
+        self._ensure_loaded(conn)
+        if lat is not None and lng is not None:
+            region_id = self.nearest(lat, lng, conn=conn)
+            if region_id is not None:
+                return region_id
+        if region_code and region_code in self._by_code:
+            return self._by_code[region_code]
+        if not state:
+            return None
+        state_key = state.strip().lower()
+        if district:
+            region_id = self._districts.get((state_key, district.strip().lower()))
+            if region_id:
+                return region_id
+        return self._states.get(state_key)
+
+
+hierarchy = RegionHierarchy()
+
+
+def backfill_region_ids(engine=None, batch_size: int = 5000) -> int:
+    """
+    Set region_id on grievances that lack one: from their coordinates, in
+    id-ordered batches, then from their state/district strings.
+    """
+    engine = engine or database.get_engine()
+    grievances = models.Grievance.__table__
+    hierarchy.invalidate()
+    updated = 0
+
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                select(grievances.c.id, grievances.c.lat, grievances.c.lng)
+                .where(
+                    grievances.c.id > last_id,
+                    grievances.c.region_id.is_(None),
+                    grievances.c.lat.isnot(None),
+                    grievances.c.lng.isnot(None),
+                )
+                .order_by(grievances.c.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            changes = []
+            for row in rows:
+                region_id = hierarchy.nearest(row.lat, row.lng, conn=conn)
+                if region_id is not None:
+                    changes.append({"grievance_id": row.id, "resolved_region_id": region_id})
+            if changes:
+                conn.execute(
+                    update(grievances)
+                    .where(grievances.c.id == bindparam("grievance_id"))
+                    .values(region_id=bindparam("resolved_region_id")),
+                    changes,
+                )
+                updated += len(changes)
+        print(f"Resolved {updated} grievances from coordinates (up to id {last_id})")
+
+    with engine.begin() as conn:
+        pairs = conn.execute(
+            select(grievances.c.state, grievances.c.district)
+            .where(grievances.c.region_id.is_(None), grievances.c.state.isnot(None))
+            .distinct()
+        ).all()
+        for state, district in pairs:
+            region_id = hierarchy.resolve(state, district, conn=conn)
+            if region_id is None:
+                continue
+            condition = [grievances.c.region_id.is_(None), grievances.c.state == state]
+            condition.append(grievances.c.district == district if district is not None else grievances.c.district.is_(None))
+            updated += conn.execute(update(grievances).where(*condition).values(region_id=region_id)).rowcount
+    return updated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the region hierarchy.")
+    parser.add_argument("command", choices=["rebuild", "backfill"])
+    args = parser.parse_args()
+    if args.command == "rebuild":
+        with database.get_engine().begin() as conn:
+            rebuild_closure(conn)
+        # Let the API workers reload the tree.
+        cache.cache.invalidate("regions")
+        print("✅ Region closure rebuilt")
+    else:
+        print(f"✅ Set region_id on {backfill_region_ids()} grievances")
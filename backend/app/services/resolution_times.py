@@ -0,0 +1,282 @@
+"""
+Time-to-resolution percentiles from mergeable quantile sketches.
+
+Each row of resolution_sketches holds a DDSketch of the seconds from
+submission to resolution for one (month, department, state, district,
+category) bucket. verify_grievance adds to its bucket as it resolves a
+grievance, so p50/p90/p99 for any combination of filters is a merge of the
+matching rows rather than a scan of the timeline.
+
+    python -m app.services.resolution_times rebuild   # recompute every bucket from the timeline
+"""
+import argparse
+import json
+import math
+import os
+from datetime import date, datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select, union_all, update
+
+from .. import database, models
+
+# Every quantile is within this fraction of the true value.
+SKETCH_RELATIVE_ACCURACY = float(os.getenv("SKETCH_RELATIVE_ACCURACY", "0.01"))
+# Bounds sketch size; the lowest buckets are folded together beyond this.
+SKETCH_MAX_BINS = 2048
+
+GROUP_BY_COLUMNS = {
+    "department": ("department_id",),
+    "state": ("state",),
+    # District names repeat across states.
+    "district": ("state", "district"),
+    "category": ("category",),
+}
+BUCKET_COLUMNS = ["month", "department_id", "state", "district", "category"]
+
+
+class DDSketch:
+    """
+    Quantile sketch with relative error guarantees (Masson et al., DDSketch).
+    Values fall into logarithmic bins of ratio gamma; merging two sketches
+    with the same accuracy adds their bin counts and loses nothing.
+    """
+
+    def __init__(self, relative_accuracy: float = SKETCH_RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, count: int = 1):
+        value = max(value, 0.0)
+        if value < 1e-9:
+            self.zero_count += count
+        else:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[index] = self.bins.get(index, 0) + count
+            self._collapse()
+        self.count += count
+        self.sum += value * count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: "DDSketch"):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self._collapse()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def _collapse(self):
+        if len(self.bins) <= SKETCH_MAX_BINS:
+            return
+        indexes = sorted(self.bins)
+        excess = indexes[:len(indexes) - SKETCH_MAX_BINS + 1]
+        self.bins[excess[-1]] = sum(self.bins.pop(index) for index in excess[:-1]) + self.bins[excess[-1]]
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if seen > rank:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                value = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "a": self.relative_accuracy, "n": self.count, "s": self.sum, "z": self.zero_count,
+            "min": self.min if self.count else None, "max": self.max if self.count else None,
+            "b": {str(index): count for index, count in self.bins.items()},
+        }, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, data: Optional[str]) -> "DDSketch":
+        if not data:
+            return cls()
+        state = json.loads(data)
+        sketch = cls(state["a"])
+        sketch.count, sketch.sum, sketch.zero_count = state["n"], state["s"], state["z"]
+        if sketch.count:
+            sketch.min, sketch.max = state["min"], state["max"]
+        sketch.bins = {int(index): count for index, count in state["b"].items()}
+        return sketch
+
+
+def _as_utc(moment: datetime) -> datetime:
+    # SQLite hands back naive datetimes; they are stored in UTC.
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment.astimezone(timezone.utc)
+
+
+def bucket_of(department_id, state, district, category, resolved_at: datetime) -> dict:
+    resolved_at = _as_utc(resolved_at)
+    return {
+        "month": date(resolved_at.year, resolved_at.month, 1),
+        "department_id": department_id or 0,
+        "state": state or "",
+        "district": district or "",
+        "category": category or "",
+    }
+
+
+def _merge_into_bucket(conn, bucket: dict, sketch: DDSketch):
+    table = models.ResolutionSketch.__table__
+    conn.execute(
+        database.insert_ignoring_conflicts(conn, table, BUCKET_COLUMNS),
+        {**bucket, "count": 0, "sketch": DDSketch().to_json()},
+    )
+    # Row lock on PostgreSQL so concurrent verifications of the same bucket
+    # do not overwrite each other; SQLite already serializes writers.
+    row = conn.execute(
+        select(table.c.id, table.c.sketch)
+        .where(*[table.c[column] == value for column, value in bucket.items()])
+        .with_for_update()
+    ).one()
+    merged = DDSketch.from_json(row.sketch)
+    merged.merge(sketch)
+    conn.execute(
+        update(table).where(table.c.id == row.id)
+        .values(count=merged.count, sketch=merged.to_json(), updated_at=func.now())
+    )
+
+
+def record_resolution(conn, grievance: models.Grievance, resolved_at: Optional[datetime] = None):
+    """Add a grievance's time to resolution to its bucket, in the caller's
+    transaction. Call it before adding the Resolved timeline entry: like
+    rebuild(), only a grievance's first resolution counts, so a grievance
+    reopened and verified again is not recorded twice."""
+    if grievance.created_at is None:
+        return
+    timeline = models.Timeline.__table__
+    resolved_before = conn.execute(
+        select(timeline.c.id)
+        .where(timeline.c.grievance_id == grievance.id, timeline.c.status == models.GrievanceStatus.RESOLVED.value)
+        .limit(1)
+    ).first()
+    if resolved_before is not None:
+        return
+    resolved_at = resolved_at or datetime.now(timezone.utc)
+    sketch = DDSketch()
+    sketch.add((_as_utc(resolved_at) - _as_utc(grievance.created_at)).total_seconds())
+    bucket = bucket_of(grievance.department_id, grievance.state, grievance.district, grievance.category, resolved_at)
+    _merge_into_bucket(conn, bucket, sketch)
+
+
+def _resolution_rows(grievances, timeline, resolved_status: str):
+    first_resolved = (
+        select(timeline.c.grievance_id, func.min(timeline.c.created_at).label("resolved_at"))
+        .where(timeline.c.status == resolved_status)
+        .group_by(timeline.c.grievance_id)
+        .subquery()
+    )
+    return (
+        select(
+            grievances.c.department_id, grievances.c.state, grievances.c.district, grievances.c.category,
+            grievances.c.created_at, first_resolved.c.resolved_at,
+        )
+        .join(first_resolved, first_resolved.c.grievance_id == grievances.c.id)
+    )
+
+
+def rebuild(engine=None) -> int:
+    """Recompute every bucket from the first Resolved timeline entry of each
+    grievance, archived ones included. Returns the number of grievances."""
+    engine = engine or database.get_engine()
+    resolved = models.GrievanceStatus.RESOLVED.value
+    query = union_all(
+        _resolution_rows(models.Grievance.__table__, models.Timeline.__table__, resolved),
+        _resolution_rows(models.ArchivedGrievance.__table__, models.ArchivedTimeline.__table__, resolved),
+    )
+    sketches: Dict[Tuple, DDSketch] = {}
+    total = 0
+    with engine.begin() as conn:
+        for row in conn.execution_options(stream_results=True, yield_per=5000).execute(query):
+            if row.created_at is None or row.resolved_at is None:
+                continue
+            bucket = bucket_of(row.department_id, row.state, row.district, row.category, row.resolved_at)
+            key = tuple(bucket[column] for column in BUCKET_COLUMNS)
+            sketch = sketches.get(key)
+            if sketch is None:
+                sketch = sketches[key] = DDSketch()
+            sketch.add((_as_utc(row.resolved_at) - _as_utc(row.created_at)).total_seconds())
+            total += 1
+
+        table = models.ResolutionSketch.__table__
+        conn.execute(table.delete())
+        if sketches:
+            conn.execute(table.insert(), [
+                {**dict(zip(BUCKET_COLUMNS, key)), "count": sketch.count, "sketch": sketch.to_json()}
+                for key, sketch in sketches.items()
+            ])
+    return total
+
+
+def rollup(
+    db,
+    group_by: Sequence[str] = (),
+    department_id: Optional[int] = None,
+    state: Optional[str] = None,
+    district: Optional[str] = None,
+    category: Optional[str] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+) -> List[Tuple[dict, DDSketch]]:
+    """Merged sketches for each combination of the `group_by` dimensions
+    (keys of GROUP_BY_COLUMNS) among buckets matching the filters. `since`
+    and `until` select whole months."""
+    sketch_model = models.ResolutionSketch
+    columns: List[str] = []
+    for dimension in group_by:
+        for column in GROUP_BY_COLUMNS[dimension]:
+            if column not in columns:
+                columns.append(column)
+
+    query = db.query(*[getattr(sketch_model, column) for column in columns], sketch_model.sketch)
+    if department_id is not None:
+        query = query.filter(sketch_model.department_id == department_id)
+    if state is not None:
+        query = query.filter(sketch_model.state == state)
+    if district is not None:
+        query = query.filter(sketch_model.district == district)
+    if category is not None:
+        query = query.filter(sketch_model.category == category)
+    if since is not None:
+        query = query.filter(sketch_model.month >= date(since.year, since.month, 1))
+    if until is not None:
+        query = query.filter(sketch_model.month <= date(until.year, until.month, 1))
+
+    merged: Dict[Tuple, DDSketch] = {}
+    for row in query:
+        key = tuple(row[:-1])
+        sketch = merged.get(key)
+        if sketch is None:
+            sketch = merged[key] = DDSketch()
+        sketch.merge(DDSketch.from_json(row.sketch))
+    return [(dict(zip(columns, key)), sketch) for key, sketch in merged.items()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain resolution-time sketches.")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+    print(f"✅ Rebuilt resolution sketches from {rebuild()} resolved grievances")
@@ -0,0 +1,170 @@
+"""
+Citizen satisfaction per department, officer and district.
+
+satisfaction_scores keeps a running count, sum, sum of squares and 1-5
+histogram of feedback ratings for each department, assigned officer and
+district. A Feedback insert through the ORM adds its rating to the three
+rows of its grievance in the same transaction, so the leaderboard reads a
+handful of pre-aggregated rows (ordered by the stored mean through an
+index) instead of joining feedback, grievances and users per request.
+Ratings stay with the department and officer the grievance had when it
+was rated; rebuild() credits its current ones.
+
+    python -m app.services.satisfaction rebuild   # recompute every row from feedback
+"""
+import argparse
+import math
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, event, or_, select, union_all
+from sqlalchemy.orm import object_session
+from sqlalchemy.orm.util import identity_key
+
+from .. import database, models
+
+SCOPES = ("department", "officer", "district")
+STARS = range(1, 6)
+COUNTER_COLUMNS = ["rating_count", "rating_sum", "rating_sum_squares"] + [f"rating_{star}" for star in STARS]
+
+table = models.SatisfactionScore.__table__
+
+
+def keys_of(grievance) -> Dict[str, str]:
+    """The scope keys a grievance's feedback counts towards."""
+    keys = {}
+    if grievance.department_id:
+        keys["department"] = str(grievance.department_id)
+    if grievance.assignee_id:
+        keys["officer"] = str(grievance.assignee_id)
+    if grievance.district:
+        keys["district"] = f"{grievance.state or ''}|{grievance.district}"
+    return keys
+
+
+def _counters(rating: int) -> Dict[str, int]:
+    # Ratings are meant to be 1-5; others still count towards the mean but
+    # fall into the nearest histogram bucket.
+    bucket = min(5, max(1, rating))
+    counters = {"rating_count": 1, "rating_sum": rating, "rating_sum_squares": rating * rating}
+    counters.update({f"rating_{star}": int(star == bucket) for star in STARS})
+    return counters
+
+
+def record(conn, grievance, rating: int):
+    """Add one rating of `grievance`'s feedback, in the caller's transaction."""
+    keys = keys_of(grievance)
+    if not keys or rating is None:
+        return
+    rows = [{"scope": scope, "key": key, **_counters(rating)} for scope, key in keys.items()]
+    conn.execute(database.insert_adding_on_conflict(conn, table, ["scope", "key"], COUNTER_COLUMNS), rows)
+    conn.execute(
+        table.update()
+        .where(or_(*[and_(table.c.scope == scope, table.c.key == key) for scope, key in keys.items()]))
+        .values(mean=table.c.rating_sum * 1.0 / table.c.rating_count, updated_at=datetime.now(timezone.utc))
+    )
+
+
+@event.listens_for(models.Feedback, "after_insert")
+def _feedback_inserted(mapper, connection, target):
+    if target.grievance_id is None:
+        return
+    # create_feedback has just loaded the grievance.
+    session = object_session(target)
+    grievance = session.identity_map.get(identity_key(models.Grievance, target.grievance_id)) if session else None
+    if grievance is None:
+        grievances = models.Grievance.__table__
+        grievance = connection.execute(
+            select(grievances.c.department_id, grievances.c.assignee_id, grievances.c.state, grievances.c.district)
+            .where(grievances.c.id == target.grievance_id)
+        ).first()
+        if grievance is None:
+            return
+    record(connection, grievance, target.rating)
+
+
+def _feedback_rows(grievances, feedback):
+    return (
+        select(feedback.c.rating, grievances.c.department_id, grievances.c.assignee_id, grievances.c.state, grievances.c.district)
+        .join(grievances, grievances.c.id == feedback.c.grievance_id)
+        .where(feedback.c.rating.isnot(None))
+    )
+
+
+def rebuild(engine=None, batch_size: int = 10_000) -> int:
+    """Recompute every row from the feedback of hot and archived grievances.
+    Returns the number of ratings counted."""
+    engine = engine or database.get_engine()
+    query = union_all(
+        _feedback_rows(models.Grievance.__table__, models.Feedback.__table__),
+        _feedback_rows(models.ArchivedGrievance.__table__, models.ArchivedFeedback.__table__),
+    )
+    totals: Dict[Tuple[str, str], Dict[str, int]] = {}
+    ratings = 0
+    with engine.begin() as conn:
+        for row in conn.execution_options(stream_results=True, yield_per=batch_size).execute(query):
+            rating = _counters(row.rating)
+            for scope, key in keys_of(row).items():
+                counters = totals.get((scope, key))
+                if counters is None:
+                    counters = totals[(scope, key)] = dict.fromkeys(COUNTER_COLUMNS, 0)
+                for column, value in rating.items():
+                    counters[column] += value
+            ratings += 1
+
+        conn.execute(table.delete())
+        rows = [
+            {"scope": scope, "key": key, **counters, "mean": counters["rating_sum"] / counters["rating_count"]}
+            for (scope, key), counters in totals.items()
+        ]
+        for start in range(0, len(rows), batch_size):
+            conn.execute(table.insert(), rows[start:start + batch_size])
+    return ratings
+
+
+def _names(db, scope: str, keys: List[str]) -> Dict[str, Optional[str]]:
+    if scope == "department":
+        query = db.query(models.Department.id, models.Department.name).filter(models.Department.id.in_([int(k) for k in keys]))
+    elif scope == "officer":
+        query = db.query(models.User.id, models.User.full_name).filter(models.User.id.in_([int(k) for k in keys]))
+    else:
+        return {key: key.split("|", 1)[1] for key in keys}
+    return {str(id_): name for id_, name in query}
+
+
+def leaderboard(db, scope: str, limit: int = 10, min_feedback: int = 1, ascending: bool = False) -> List[dict]:
+    """Best (or worst) rated entries of `scope` by mean rating, among those
+    with at least `min_feedback` ratings."""
+    model = models.SatisfactionScore
+    order = model.mean.asc() if ascending else model.mean.desc()
+    rows = (
+        db.query(model)
+        .filter(model.scope == scope, model.rating_count >= min_feedback)
+        .order_by(order, model.rating_count.desc())
+        .limit(limit)
+        .all()
+    )
+    names = _names(db, scope, [row.key for row in rows]) if rows else {}
+    entries = []
+    for row in rows:
+        mean = row.rating_sum / row.rating_count
+        state, district = row.key.split("|", 1) if scope == "district" else (None, None)
+        entries.append({
+            "scope": scope,
+            "id": int(row.key) if scope != "district" else None,
+            "name": names.get(row.key),
+            "state": state or None,
+            "district": district,
+            "count": row.rating_count,
+            "mean": round(mean, 3),
+            "stddev": round(math.sqrt(max(0.0, row.rating_sum_squares / row.rating_count - mean * mean)), 3),
+            "histogram": [getattr(row, f"rating_{star}") for star in STARS],
+        })
+    return entries
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the satisfaction score aggregates.")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+    print(f"✅ Rebuilt satisfaction scores from {rebuild()} ratings")
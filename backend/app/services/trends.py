@@ -0,0 +1,227 @@
+"""
+Pre-bucketed grievance trends.
+
+grievance_counts_hourly and grievance_counts_daily count status changes
+(every Timeline row, "New" being a submission) per UTC hour or day,
+category and state. A Timeline insert through the ORM adds one to its hour
+and day, so a trend chart reads a few thousand rollup rows in one indexed
+range query instead of grouping the grievances table by created_at. Counts
+stay with the category and state a grievance had when its status changed.
+
+    python -m app.services.trends rebuild          # recompute both tables from the timeline
+    python -m app.services.trends prune --days 90  # drop hourly rows older than --days
+"""
+import argparse
+import math
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event, func, select, union_all
+from sqlalchemy.orm import object_session
+from sqlalchemy.orm.util import identity_key
+
+from .. import database, models
+
+# Hourly rows are only kept this long; older trends come from the daily table.
+TREND_HOURLY_RETENTION_DAYS = int(os.getenv("TREND_HOURLY_RETENTION_DAYS", "90"))
+TREND_MAX_HOURLY_DAYS = int(os.getenv("TREND_MAX_HOURLY_DAYS", "31"))
+
+GRANULARITIES = ("hour", "day", "week", "month")
+GROUP_BY_COLUMNS = ("category", "state")
+
+
+def _status_value(status) -> str:
+    return getattr(status, "value", status)
+
+
+def _as_utc(moment: datetime) -> datetime:
+    # SQLite hands back naive datetimes; they are stored in UTC.
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment.astimezone(timezone.utc)
+
+
+def _hour_of(moment: datetime) -> datetime:
+    return _as_utc(moment).replace(minute=0, second=0, microsecond=0)
+
+
+def _counts(status, moment: datetime, category: Optional[str], state: Optional[str], count: int = 1):
+    common = {"status": _status_value(status), "category": category or "", "state": state or "", "count": count}
+    return {**common, "hour": _hour_of(moment)}, {**common, "day": _as_utc(moment).date()}
+
+
+def record(conn, grievance_id: int, status, moment: Optional[datetime] = None, grievance=None):
+    """Count one status change of a grievance, in the caller's transaction.
+    Pass the grievance if it is loaded to save looking up its category and
+    state."""
+    if grievance is None:
+        grievances = models.Grievance.__table__
+        grievance = conn.execute(
+            select(grievances.c.category, grievances.c.state).where(grievances.c.id == grievance_id)
+        ).first()
+        if grievance is None:
+            return
+    hourly, daily = _counts(status, moment or datetime.now(timezone.utc), grievance.category, grievance.state)
+    for model, values in ((models.GrievanceCountHourly, hourly), (models.GrievanceCountDaily, daily)):
+        table = model.__table__
+        key = [column for column in values if column != "count"]
+        conn.execute(database.insert_adding_on_conflict(conn, table, key, "count"), values)
+
+
+@event.listens_for(models.Timeline, "after_insert")
+def _timeline_inserted(mapper, connection, target):
+    if target.status is None or target.grievance_id is None:
+        return
+    # The routes that add timeline entries have just loaded the grievance.
+    session = object_session(target)
+    grievance = session.identity_map.get(identity_key(models.Grievance, target.grievance_id)) if session else None
+    record(connection, target.grievance_id, target.status, target.created_at, grievance)
+
+
+def _timeline_rows(grievances, timeline):
+    return (
+        select(timeline.c.status, timeline.c.created_at, grievances.c.category, grievances.c.state)
+        .join(grievances, grievances.c.id == timeline.c.grievance_id)
+        .where(timeline.c.status.isnot(None), timeline.c.created_at.isnot(None))
+    )
+
+
+def rebuild(engine=None, batch_size: int = 10_000) -> int:
+    """Recompute both rollup tables from the timeline, archived grievances
+    included. Returns the number of status changes counted."""
+    engine = engine or database.get_engine()
+    query = union_all(
+        _timeline_rows(models.Grievance.__table__, models.Timeline.__table__),
+        _timeline_rows(models.ArchivedGrievance.__table__, models.ArchivedTimeline.__table__),
+    )
+    hourly: Dict[Tuple, int] = {}
+    daily: Dict[Tuple, int] = {}
+    total = 0
+    with engine.begin() as conn:
+        for row in conn.execution_options(stream_results=True, yield_per=batch_size).execute(query):
+            hour_values, day_values = _counts(row.status, row.created_at, row.category, row.state)
+            hour_key = (hour_values["status"], hour_values["hour"], hour_values["category"], hour_values["state"])
+            day_key = (day_values["status"], day_values["day"], day_values["category"], day_values["state"])
+            hourly[hour_key] = hourly.get(hour_key, 0) + 1
+            daily[day_key] = daily.get(day_key, 0) + 1
+            total += 1
+
+        for model, counts, column in (
+            (models.GrievanceCountHourly, hourly, "hour"),
+            (models.GrievanceCountDaily, daily, "day"),
+        ):
+            table = model.__table__
+            conn.execute(table.delete())
+            rows = [
+                {"status": status, column: bucket, "category": category, "state": state, "count": count}
+                for (status, bucket, category, state), count in counts.items()
+            ]
+            for start in range(0, len(rows), batch_size):
+                conn.execute(table.insert(), rows[start:start + batch_size])
+    return total
+
+
+def prune_hourly(engine=None, days: int = TREND_HOURLY_RETENTION_DAYS) -> int:
+    engine = engine or database.get_engine()
+    table = models.GrievanceCountHourly.__table__
+    cutoff = _hour_of(datetime.now(timezone.utc) - timedelta(days=days))
+    with engine.begin() as conn:
+        return conn.execute(table.delete().where(table.c.hour < cutoff)).rowcount
+
+
+def align(moment: datetime, granularity: str) -> datetime:
+    """Start of the UTC bucket containing `moment`."""
+    moment = _hour_of(moment)
+    if granularity == "hour":
+        return moment
+    moment = moment.replace(hour=0)
+    if granularity == "week":
+        return moment - timedelta(days=moment.weekday())
+    if granularity == "month":
+        return moment.replace(day=1)
+    return moment
+
+
+def _next(moment: datetime, granularity: str) -> datetime:
+    if granularity == "month":
+        return (moment.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return moment + {"hour": timedelta(hours=1), "day": timedelta(days=1), "week": timedelta(weeks=1)}[granularity]
+
+
+def bucket_starts(since: datetime, until: datetime, granularity: str) -> List[datetime]:
+    starts = []
+    moment = align(since, granularity)
+    while moment < until:
+        starts.append(moment)
+        moment = _next(moment, granularity)
+    return starts
+
+
+def series(
+    db,
+    status: str,
+    granularity: str,
+    since: datetime,
+    until: datetime,
+    group_by: Optional[str] = None,
+    category: Optional[str] = None,
+    state: Optional[str] = None,
+    max_points: Optional[int] = None,
+) -> Tuple[List[datetime], Dict[Optional[str], List[int]]]:
+    """
+    Counts of `status` changes in [since, until) per bucket, one aligned
+    list per value of `group_by` (or a single None series). Weeks and months
+    are summed from the daily table. With `max_points`, runs of consecutive
+    buckets are summed so that at most that many points are returned.
+    """
+    if granularity == "hour":
+        model, column = models.GrievanceCountHourly, models.GrievanceCountHourly.hour
+        low, high = _hour_of(since), until
+    else:
+        model, column = models.GrievanceCountDaily, models.GrievanceCountDaily.day
+        low, high = align(since, granularity).date(), _as_utc(until).date()
+
+    group_column = getattr(model, group_by) if group_by else None
+    selected = [column] + ([group_column] if group_by else []) + [func.sum(model.count)]
+    query = db.query(*selected).filter(model.status == status, column >= low)
+    query = query.filter(column < high if granularity == "hour" else column <= high)
+    if category is not None:
+        query = query.filter(model.category == category)
+    if state is not None:
+        query = query.filter(model.state == state)
+    query = query.group_by(column, group_column) if group_by else query.group_by(column)
+
+    starts = bucket_starts(since, until, granularity)
+    position = {start: index for index, start in enumerate(starts)}
+    result: Dict[Optional[str], List[int]] = {}
+    for row in query:
+        bucket = row[0]
+        if not isinstance(bucket, datetime):
+            bucket = datetime(bucket.year, bucket.month, bucket.day, tzinfo=timezone.utc)
+        index = position.get(align(bucket, granularity))
+        if index is None:
+            continue
+        key = (row[1] or None) if group_by else None
+        counts = result.get(key)
+        if counts is None:
+            counts = result[key] = [0] * len(starts)
+        counts[index] += row[-1]
+
+    if max_points and len(starts) > max_points:
+        factor = math.ceil(len(starts) / max_points)
+        starts = starts[::factor]
+        result = {
+            key: [sum(counts[i:i + factor]) for i in range(0, len(counts), factor)]
+            for key, counts in result.items()
+        }
+    return starts, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the grievance trend rollups.")
+    parser.add_argument("command", choices=["rebuild", "prune"])
+    parser.add_argument("--days", type=int, default=TREND_HOURLY_RETENTION_DAYS, help="Hourly rows to keep (prune)")
+    args = parser.parse_args()
+    if args.command == "rebuild":
+        print(f"✅ Rebuilt trend rollups from {rebuild()} status changes")
+    else:
+        print(f"✅ Pruned {prune_hourly(days=args.days)} hourly rows")
@@ -0,0 +1,108 @@
+"""
+Measure /chat/stream time-to-first-token and the latency of other endpoints
+while many chats are in flight. Runs against the offline FakeProvider
+(AI_PROVIDER=fake), so no API key is needed.
+
+    python -m benchmarks.chat_latency --chats 50 --probes 300
+    python -m benchmarks.chat_latency --blocking   # simulate the old sync call
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+os.environ["AI_PROVIDER"] = "fake"
+os.environ.setdefault("AI_FAKE_ERROR_RATE", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from main import app
+from app import database, migrations, seed
+from app.services.ai_provider import provider
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def configure_fake_provider(latency: float, token_delay: float, blocking: bool):
+    fake = provider.provider
+    fake.latency_ms = latency * 1000
+    fake.jitter_ms = 0
+    fake.token_delay_ms = token_delay * 1000
+    if blocking:
+        async def blocking_stream(prompt):
+            time.sleep(latency)
+            for word in fake._respond(prompt).split(" "):
+                time.sleep(token_delay)
+                yield word + " "
+
+        fake.stream = blocking_stream
+
+
+async def run(args):
+    migrations.upgrade(database.engine)
+    seed.seed_db()
+    configure_fake_provider(args.latency, args.token_delay, args.blocking)
+    provider.max_concurrency = args.chats
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        r = await client.post("/auth/login", data={"username": "citizen@example.com", "password": "password123"})
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        async def probe(samples):
+            for _ in range(args.probes):
+                t0 = time.perf_counter()
+                await client.get("/metadata/departments")
+                samples.append((time.perf_counter() - t0) * 1000)
+
+        baseline = []
+        await probe(baseline)
+
+        ttfts = []
+        fallbacks = []
+
+        async def one_chat():
+            r = await client.post("/chat/stream", json={"message": "Tell me about monsoon preparedness in my city"}, headers=headers)
+            for block in r.text.split("\n\n"):
+                if block.startswith("event: done"):
+                    done = json.loads(block.split("data: ", 1)[1])
+                    # Fallback answers are local and would flatter the provider's TTFT.
+                    (fallbacks if done.get("fallback") else ttfts).append(done["ttft_ms"])
+
+        loaded = []
+        await asyncio.gather(probe(loaded), *[one_chat() for _ in range(args.chats)])
+
+    return {
+        "chats": args.chats,
+        "blocking": args.blocking,
+        "fallbacks": len(fallbacks),
+        "ttft_ms": {"p50": percentile(ttfts, 50), "p99": percentile(ttfts, 99)},
+        "probe_ms_idle": {"p50": statistics.median(baseline), "p99": percentile(baseline, 99)},
+        "probe_ms_under_chat_load": {"p50": statistics.median(loaded), "p99": percentile(loaded, 99)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chats", type=int, default=50)
+    parser.add_argument("--probes", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.2, help="Provider latency before the first token, in seconds")
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    parser.add_argument("--blocking", action="store_true", help="Sleep synchronously like the old generate_content call")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
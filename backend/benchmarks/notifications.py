@@ -0,0 +1,96 @@
+"""
+Notification dispatch throughput.
+
+Queues --messages outbox rows split between email and SMS, drains them
+with app.services.notifications.Dispatcher through fake channels that take
+--latency-ms per send, and reports messages per second. Runs against a
+fresh SQLite database unless DATABASE_URL is set:
+
+    python -m benchmarks.notifications --messages 5000 --latency-ms 50
+    python -m benchmarks.notifications --concurrency email=16,sms=8 --batch-size 200 --failure-rate 0.05
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.run import prepare_local_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--latency-ms", type=float, default=50, help="Simulated provider latency per send")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of sends that fail and are retried later")
+    parser.add_argument("--batch-size", type=int, default=None, help="Defaults to NOTIFY_BATCH_SIZE")
+    parser.add_argument("--concurrency", default=None, help="Per-channel limits, defaults to NOTIFY_CONCURRENCY")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    prepare_local_database(0, 42)
+
+    from sqlalchemy import func
+
+    from app import database
+    from app.services import notifications
+
+    engine = database.get_engine()
+    table = notifications.table
+    with engine.begin() as conn:
+        conn.execute(table.delete())
+        now = datetime.now(timezone.utc)
+        conn.execute(table.insert(), [
+            {
+                "channel": "email" if i % 2 else "sms",
+                "recipient": f"citizen{i}@example.com" if i % 2 else f"+9190000{i:05d}",
+                "dedupe_key": f"benchmark:{i}",
+                "payload": json.dumps({"subject": "Grievance update", "body": f"Grievance #{i} is now Resolved."}),
+                "next_attempt_at": now,
+            }
+            for i in range(args.messages)
+        ])
+
+    channels = {
+        name: notifications.FakeChannel(args.latency_ms / 1000, args.failure_rate, seed=i)
+        for i, name in enumerate(("email", "sms"))
+    }
+    dispatcher = notifications.Dispatcher(
+        engine,
+        channels,
+        batch_size=args.batch_size or notifications.NOTIFY_BATCH_SIZE,
+        concurrency=notifications.parse_concurrency(args.concurrency) if args.concurrency else None,
+    )
+    started = time.perf_counter()
+    claimed = asyncio.run(dispatcher.drain())
+    elapsed = time.perf_counter() - started
+
+    with engine.connect() as conn:
+        statuses = dict(conn.execute(
+            table.select().with_only_columns(table.c.status, func.count()).group_by(table.c.status)
+        ).all())
+    sent = sum(len(channel.sent) for channel in channels.values())
+    results = {
+        "messages": args.messages,
+        "latency_ms": args.latency_ms,
+        "batch_size": dispatcher.batch_size,
+        "concurrency": dispatcher.concurrency,
+        "claimed": claimed,
+        "sent": sent,
+        "pending_retry": statuses.get(notifications.PENDING, 0),
+        "seconds": round(elapsed, 2),
+        "messages_per_second": round(sent / elapsed, 1) if elapsed else None,
+    }
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Query plan check for the hot read paths.
+
+Compiles each query the routers issue, runs EXPLAIN against the configured
+database and fails when a query scans a whole table instead of using an
+index. Run it in CI after `python -m app.migrations`:
+
+    python -m benchmarks.query_plans            # exit 1 on a full scan
+    python -m benchmarks.query_plans --verbose  # print every plan
+
+On PostgreSQL sequential scans are disabled for the session so that small
+CI databases report the plan the planner would pick for a large table.
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import desc, func, select
+
+from app import database, models
+
+G = models.Grievance
+
+
+def hot_queries():
+    """(name, statement, table that must not be fully scanned)."""
+    return [
+        ("officer_worklist", select(G).where(G.assignee_id == 1), "grievances"),
+        ("officer_status_lookup", select(G).where(G.assignee_id == 1).order_by(G.id.desc()).limit(3), "grievances"),
+        ("citizen_grievances", select(G).where(G.citizen_id == 1), "grievances"),
+        ("list_by_state_district", select(G).where(G.state == "Delhi", G.district == "New Delhi").limit(100), "grievances"),
+        ("list_by_status", select(G).where(G.status == "New").limit(100), "grievances"),
+        ("dashboard_resolved_count", select(func.count()).select_from(G).where(G.status == "Resolved"), "grievances"),
+        ("dashboard_critical_count", select(func.count()).select_from(G).where(G.priority == "Critical"), "grievances"),
+        (
+            "district_counts",
+            select(G.district, func.count(G.id)).where(G.state == "Delhi", G.district.isnot(None)).group_by(G.district),
+            "grievances",
+        ),
+        (
+            "hotspots",
+            select(G.district, G.state, func.count(G.id).label("count"))
+            .where(G.status != "Resolved", G.district.isnot(None))
+            .group_by(G.district, G.state)
+            .order_by(desc("count"))
+            .limit(5),
+            "grievances",
+        ),
+        (
+            "region_rollup",
+            select(models.RegionClosure.ancestor_id, func.count(G.id))
+            .join(G, G.region_id == models.RegionClosure.descendant_id)
+            .where(models.RegionClosure.ancestor_id.in_([1, 2, 3]))
+            .group_by(models.RegionClosure.ancestor_id),
+            "grievances",
+        ),
+        (
+            "daily_trend",
+            select(models.GrievanceCountDaily.day, models.GrievanceCountDaily.category, func.sum(models.GrievanceCountDaily.count))
+            .where(models.GrievanceCountDaily.status == "New", models.GrievanceCountDaily.day >= date(2025, 1, 1))
+            .group_by(models.GrievanceCountDaily.day, models.GrievanceCountDaily.category),
+            "grievance_counts_daily",
+        ),
+        (
+            "satisfaction_leaderboard",
+            select(models.SatisfactionScore)
+            .where(models.SatisfactionScore.scope == "officer", models.SatisfactionScore.rating_count >= 5)
+            .order_by(models.SatisfactionScore.mean.desc())
+            .limit(10),
+            "satisfaction_scores",
+        ),
+        ("grievance_timeline", select(models.Timeline).where(models.Timeline.grievance_id == 1), "timeline"),
+        ("grievance_media", select(models.Media).where(models.Media.grievance_id == 1), "media"),
+        (
+            "officers_by_department",
+            select(models.User).where(models.User.role == "FieldOfficer", models.User.department_id == 1),
+            "users",
+        ),
+    ]
+
+
+def _compile(statement, dialect) -> str:
+    return str(statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+
+
+def _sqlite_plan(conn, sql: str):
+    rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+    return [row[-1] for row in rows]
+
+
+def _sqlite_full_scan(plan, table: str) -> bool:
+    # "SCAN grievances" is a table scan; "SCAN grievances USING [COVERING] INDEX"
+    # walks an index and "SEARCH" is an index lookup.
+    return any(line.startswith(f"SCAN {table}") and "INDEX" not in line for line in plan)
+
+
+def _postgres_plan(conn, sql: str):
+    return conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}").scalar()[0]["Plan"]
+
+
+def _postgres_full_scan(plan, table: str) -> bool:
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") == table:
+        return True
+    return any(_postgres_full_scan(child, table) for child in plan.get("Plans", []))
+
+
+def check(verbose: bool = False) -> list:
+    engine = database.engine
+    postgres = engine.dialect.name == "postgresql"
+    failures = []
+    with engine.connect() as conn:
+        if postgres:
+            conn.exec_driver_sql("SET enable_seqscan = off")
+        for name, statement, table in hot_queries():
+            sql = _compile(statement, engine.dialect)
+            if postgres:
+                plan = _postgres_plan(conn, sql)
+                full_scan = _postgres_full_scan(plan, table)
+            else:
+                plan = _sqlite_plan(conn, sql)
+                full_scan = _sqlite_full_scan(plan, table)
+            print(f"{'FAIL' if full_scan else 'ok  '}  {name}")
+            if verbose or full_scan:
+                text = json.dumps(plan, indent=2) if postgres else "\n".join(plan)
+                print("      " + text.replace("\n", "\n      "))
+            if full_scan:
+                failures.append(name)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--verbose", action="store_true", help="Print every plan, not only failures")
+    args = parser.parse_args()
+    failures = check(args.verbose)
+    if failures:
+        print(f"{len(failures)} hot queries do not use an index: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
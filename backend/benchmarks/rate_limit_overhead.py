@@ -0,0 +1,62 @@
+"""
+Per-request overhead of RateLimitMiddleware, measured by calling the
+middleware directly around a no-op ASGI app.
+
+    python -m benchmarks.rate_limit_overhead --requests 100000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import auth
+from app.rate_limit import RateLimitMiddleware
+
+
+async def noop_app(scope, receive, send):
+    return None
+
+
+async def noop_send(message):
+    return None
+
+
+async def measure(middleware, scope, requests):
+    started = time.perf_counter()
+    for _ in range(requests):
+        await middleware(scope, None, noop_send)
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+async def run(requests):
+    token = auth.create_access_token({"sub": "bench@example.com", "role": "Citizen"})
+    # A huge burst keeps every request on the allowed path.
+    middleware = RateLimitMiddleware(noop_app, rules={("POST", "/grievance/"): {"*": (1e9, 10**9)}})
+    headers = [(b"authorization", f"Bearer {token}".encode())]
+    limited = {"type": "http", "method": "POST", "path": "/grievance/", "headers": headers, "client": ("127.0.0.1", 1)}
+    unlimited = dict(limited, path="/metadata/departments")
+    anonymous = dict(limited, headers=[])
+
+    baseline = await measure(noop_app, limited, requests)
+    return {
+        "requests": requests,
+        "noop_app_us": round(baseline, 3),
+        "unlimited_route_us": round(await measure(middleware, unlimited, requests) - baseline, 3),
+        "limited_route_jwt_us": round(await measure(middleware, limited, requests) - baseline, 3),
+        "limited_route_ip_us": round(await measure(middleware, anonymous, requests) - baseline, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100_000)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.requests)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+API load-test harness.
+
+Drives the FastAPI app against a seeded database using the mock AI path and
+reports throughput and p50/p95/p99 latency per scenario as JSON.
+
+In-process (ASGI transport, fresh SQLite database unless DATABASE_URL is set):
+
+    python -m benchmarks.run --grievances 5000 --requests 500 --concurrency 20
+
+Against a running server seeded with `python -m app.seed`:
+
+    python -m benchmarks.run --url http://127.0.0.1:8000
+
+Save a baseline and compare later runs against it:
+
+    python -m benchmarks.run --output benchmarks/baseline.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json --fail-on-regression
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+PASSWORD = "password123"
+CITIZEN = "citizen@example.com"
+OFFICER = "field@example.com"
+ADMIN = "admin@example.com"
+
+STATES = ["Delhi", "Maharashtra", "Karnataka", "Tamil Nadu", "Uttar Pradesh", "West Bengal"]
+DISTRICTS = ["New Delhi", "Mumbai", "Bengaluru Urban", "Chennai", "Lucknow", "Kolkata"]
+TITLES = ["Broken streetlight", "Garbage not collected", "Water leak on main road", "Pothole near school", "Power outage"]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def prepare_local_database(grievances: int, seed: int):
+    """Create tables, seed reference data and load synthetic grievances with
+    app.seed.seed_bulk for an in-process run. Uses the mock classifier and
+    disables rate limiting."""
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/benchmark.db")
+    os.environ["GOOGLE_AI_API_KEY"] = ""
+    os.environ["AI_PROVIDER"] = "none"
+    os.environ["RATE_LIMIT_ENABLED"] = "0"
+
+    from app import database, migrations, models, seed as seed_module
+
+    migrations.upgrade(database.engine)
+    seed_module.seed_db()
+
+    db = database.SessionLocal()
+    try:
+        if db.query(models.Grievance).count() >= grievances:
+            return
+        officer = db.query(models.User).filter(models.User.email == OFFICER).first()
+    finally:
+        db.close()
+
+    seed_module.seed_bulk(grievances, officers=max(grievances // 200, 10), seed=seed)
+    # Give the demo field officer a realistic worklist: every tenth open grievance.
+    with database.engine.begin() as conn:
+        table = models.Grievance.__table__
+        conn.execute(
+            table.update()
+            .where(table.c.id % 10 == 0, table.c.assignee_id.isnot(None))
+            .values(assignee_id=officer.id)
+        )
+
+
+async def login(client: httpx.AsyncClient, email: str) -> Dict[str, str]:
+    r = await client.post("/auth/login", data={"username": email, "password": PASSWORD})
+    r.raise_for_status()
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+def build_scenarios(tokens: Dict[str, Dict[str, str]], rng: random.Random) -> Dict[str, Callable]:
+    async def citizen_submit(client):
+        return await client.post(
+            "/grievance/",
+            data={
+                "title": rng.choice(TITLES),
+                "description": "Submitted by the benchmark harness",
+                "state": rng.choice(STATES),
+                "district": rng.choice(DISTRICTS),
+            },
+            headers=tokens["citizen"],
+        )
+
+    async def officer_worklist(client):
+        return await client.get("/grievance/assigned/me", headers=tokens["officer"])
+
+    async def admin_dashboard(client):
+        return await client.get("/admin/dashboard", headers=tokens["admin"])
+
+    async def heatmap(client):
+        return await client.get("/admin/heatmap", headers=tokens["admin"])
+
+    async def state_district_drilldown(client):
+        r = await client.get("/admin/grievance-counts/states", headers=tokens["admin"])
+        if r.status_code != 200:
+            return r
+        return await client.get(
+            "/admin/grievance-counts/districts", params={"state": rng.choice(STATES)}, headers=tokens["admin"]
+        )
+
+    async def region_rollup(client):
+        return await client.get("/admin/region-rollup", params={"depth": rng.choice([0, 1, 2])}, headers=tokens["admin"])
+
+    async def daily_trend(client):
+        return await client.get("/admin/trends", params={"group_by": "category"}, headers=tokens["admin"])
+
+    async def satisfaction_leaderboard(client):
+        return await client.get(
+            "/admin/satisfaction", params={"scope": rng.choice(["department", "officer", "district"])}, headers=tokens["admin"]
+        )
+
+    return {
+        "citizen_submit": citizen_submit,
+        "officer_worklist": officer_worklist,
+        "admin_dashboard": admin_dashboard,
+        "heatmap": heatmap,
+        "state_district_drilldown": state_district_drilldown,
+        "region_rollup": region_rollup,
+        "daily_trend": daily_trend,
+        "satisfaction_leaderboard": satisfaction_leaderboard,
+    }
+
+
+async def run_scenario(client, scenario: Callable, requests: int, concurrency: int) -> Dict:
+    latencies: List[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                response = await scenario(client)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            latencies.append((time.perf_counter() - started) * 1000)
+            errors += failed
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+    }
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> Dict:
+    comparison = {}
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        deltas = {}
+        for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps"):
+            if previous[key]:
+                deltas[key] = round((current[key] - previous[key]) / previous[key] * 100, 1)
+        regressed = (
+            deltas.get("p99_ms", 0) > tolerance * 100
+            or deltas.get("p50_ms", 0) > tolerance * 100
+            or deltas.get("throughput_rps", 0) < -tolerance * 100
+        )
+        comparison[name] = {"change_pct": deltas, "regressed": regressed}
+    return comparison
+
+
+async def run(args) -> Dict:
+    if args.url:
+        transport = None
+        base_url = args.url
+    else:
+        prepare_local_database(args.grievances, args.seed)
+        from main import app
+
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://benchmark"
+
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=60) as client:
+        tokens = {
+            "citizen": await login(client, CITIZEN),
+            "officer": await login(client, OFFICER),
+            "admin": await login(client, ADMIN),
+        }
+        scenarios = build_scenarios(tokens, random.Random(args.seed))
+        selected = args.scenario or list(scenarios)
+
+        results = {
+            "mode": "http" if args.url else "in-process",
+            "python": platform.python_version(),
+            "grievances": None if args.url else args.grievances,
+            "concurrency": args.concurrency,
+            "scenarios": {},
+        }
+        for name in selected:
+            # One untimed pass warms caches and lazy imports.
+            await scenarios[name](client)
+            results["scenarios"][name] = await run_scenario(client, scenarios[name], args.requests, args.concurrency)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Benchmark a running server instead of the in-process app")
+    parser.add_argument("--grievances", type=int, default=5000, help="Grievances to load for in-process runs")
+    parser.add_argument("--requests", type=int, default=300, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--scenario", action="append", help="Run only this scenario (repeatable)")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against a previous results file")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed regression ratio (default 15%%)")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.baseline:
+        with open(args.baseline) as f:
+            results["comparison"] = compare(results, json.load(f), args.tolerance)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+    if args.fail_on_regression and any(c["regressed"] for c in results.get("comparison", {}).values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
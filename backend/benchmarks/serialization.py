@@ -0,0 +1,112 @@
+"""
+Per-row cost of serializing grievance list pages.
+
+Compares the two ways a list route can produce its JSON body:
+
+- pydantic: ORM objects validated against List[schemas.Grievance] with
+  from_attributes, dumped and json-encoded, as FastAPI does for a
+  response_model (timeline, media and feedback lazily loaded per row);
+- fast: app.serialization.grievance_list rows encoded with orjson.
+
+"encode" times only turning already-loaded data into bytes; "end_to_end"
+includes the queries. Both bodies are checked to decode to the same JSON.
+Runs against the configured database, or a fresh seeded SQLite one:
+
+    python -m benchmarks.serialization --rows 100
+    python -m benchmarks.serialization --rows 1000 --grievances 20000 --output /tmp/serialization.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.run import prepare_local_database
+
+
+def _median_us_per_row(call, rows: int, runs: int) -> float:
+    call()  # warm up
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - started) * 1_000_000 / rows)
+    return round(statistics.median(timings), 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100, help="Grievances per page")
+    parser.add_argument("--runs", type=int, default=20, help="Timed runs per path (median is reported)")
+    parser.add_argument("--grievances", type=int, default=5000, help="Rows to seed into a fresh local database")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    prepare_local_database(args.grievances, args.seed)
+
+    from pydantic import TypeAdapter
+    from sqlalchemy.orm import selectinload
+
+    from app import database, models, schemas, serialization
+
+    adapter = TypeAdapter(List[schemas.Grievance])
+    db = database.SessionLocal()
+
+    def page():
+        return db.query(models.Grievance).order_by(models.Grievance.id).limit(args.rows)
+
+    def pydantic_body(grievances) -> bytes:
+        validated = adapter.validate_python(grievances, from_attributes=True)
+        return json.dumps(adapter.dump_python(validated, mode="json")).encode()
+
+    def fast_body(grievances) -> bytes:
+        return serialization.JSONResponse(grievances).body
+
+    def pydantic_end_to_end():
+        db.expire_all()
+        return pydantic_body(page().all())
+
+    def fast_end_to_end():
+        return fast_body(serialization.grievance_list(db, page()))
+
+    try:
+        loaded = page().options(
+            selectinload(models.Grievance.timeline),
+            selectinload(models.Grievance.media),
+            selectinload(models.Grievance.feedback),
+        ).all()
+        rows = serialization.grievance_list(db, page())
+        if json.loads(pydantic_body(loaded)) != json.loads(fast_body(rows)):
+            sys.exit("❌ Fast path output differs from schemas.Grievance")
+
+        results = {
+            "rows": len(rows),
+            "us_per_row": {
+                "pydantic_encode": _median_us_per_row(lambda: pydantic_body(loaded), len(rows), args.runs),
+                "fast_encode": _median_us_per_row(lambda: fast_body(rows), len(rows), args.runs),
+                "pydantic_end_to_end": _median_us_per_row(pydantic_end_to_end, len(rows), args.runs),
+                "fast_end_to_end": _median_us_per_row(fast_end_to_end, len(rows), args.runs),
+            },
+        }
+    finally:
+        db.close()
+
+    timings = results["us_per_row"]
+    results["speedup"] = {
+        "encode": round(timings["pydantic_encode"] / timings["fast_encode"], 1),
+        "end_to_end": round(timings["pydantic_end_to_end"] / timings["fast_end_to_end"], 1),
+    }
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Cold-start budget for API workers.
+
+Imports `main` in fresh interpreters under `python -X importtime`, reports
+the median total import time and the slowest top-level packages, and fails
+when the median exceeds the budget or when a module that should load lazily
+(DB drivers, JWT/crypto, AI and Redis SDKs) is imported at start-up.
+
+    python -m benchmarks.startup_time
+    python -m benchmarks.startup_time --budget-ms 900 --runs 7 --output /tmp/startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imported on first use; loading any of these from `import main` is a regression.
+LAZY_MODULES = [
+    "google.generativeai",
+    "jose",
+    "passlib",
+    "cryptography",
+    "psycopg2",
+    "redis",
+    "sqlalchemy.dialects.sqlite",
+    "sqlalchemy.dialects.postgresql",
+]
+
+_PROBE = (
+    "import json, sys, main; "
+    f"print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))"
+)
+
+
+def measure_once(env) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    total_us = 0
+    packages = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        depth = len(name) - len(name.lstrip(" "))
+        name = name.strip()
+        if name == "main":
+            total_us = int(cumulative)
+        elif depth <= 3:
+            # Direct imports of main: its own packages and third-party roots.
+            packages[name] = int(cumulative)
+    return {
+        "total_ms": total_us / 1000,
+        "packages": packages,
+        "lazy_violations": json.loads(result.stdout.strip().splitlines()[-1]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("STARTUP_BUDGET_MS", "1000")))
+    parser.add_argument("--top", type=int, default=8, help="Slowest imports to report")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    # Warm the bytecode cache so the first run is not an outlier.
+    measure_once(env)
+    runs = [measure_once(env) for _ in range(args.runs)]
+
+    median_ms = statistics.median(run["total_ms"] for run in runs)
+    packages = {}
+    for run in runs:
+        for name, us in run["packages"].items():
+            packages.setdefault(name, []).append(us / 1000)
+    slowest = sorted(((statistics.median(v), k) for k, v in packages.items()), reverse=True)[: args.top]
+    violations = sorted({m for run in runs for m in run["lazy_violations"]})
+
+    results = {
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "import_main_ms": {"median": round(median_ms, 1), "min": round(min(r["total_ms"] for r in runs), 1)},
+        "budget_ms": args.budget_ms,
+        "slowest_imports_ms": {name: round(ms, 1) for ms, name in slowest},
+        "eagerly_imported": violations,
+    }
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+    failed = False
+    if median_ms > args.budget_ms:
+        print(f"Cold start regressed: import main took {median_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+        failed = True
+    if violations:
+        print(f"Modules that should load lazily were imported at start-up: {', '.join(violations)}")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Table/index size and dashboard query time for the grievance tables.
+
+Reports the on-disk size of each table and its indexes (dbstat on SQLite,
+pg_table_size/pg_indexes_size on PostgreSQL) and the median time of the
+admin dashboard and state-count queries, run directly against the
+configured database. Compare two schemas by saving a baseline:
+
+    python -m benchmarks.storage_size --vacuum --output /tmp/before.json
+    python -m app.migrations
+    python -m benchmarks.storage_size --vacuum --baseline /tmp/before.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from app import database
+from app.routers import admin
+
+TABLES = ["grievances", "grievances_archive", "users"]
+
+
+def _sqlite_sizes(conn):
+    pages = dict(conn.execute(text("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name")).all())
+    sizes = {}
+    for table in TABLES:
+        indexes = conn.execute(
+            text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :table"), {"table": table}
+        ).scalars().all()
+        sizes[table] = {
+            "table_bytes": pages.get(table, 0),
+            "index_bytes": sum(pages.get(index, 0) for index in indexes),
+        }
+    return sizes
+
+
+def _postgres_sizes(conn):
+    return {
+        table: {
+            "table_bytes": conn.execute(text("SELECT pg_table_size(:t)"), {"t": table}).scalar(),
+            "index_bytes": conn.execute(text("SELECT pg_indexes_size(:t)"), {"t": table}).scalar(),
+        }
+        for table in TABLES
+    }
+
+
+def vacuum(engine):
+    """Compact the tables first so both schemas are measured without dead space."""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if engine.dialect.name == "postgresql":
+            for table in TABLES:
+                conn.execute(text(f"VACUUM FULL ANALYZE {table}"))
+        else:
+            conn.execute(text("VACUUM"))
+            conn.execute(text("ANALYZE"))
+
+
+def _median_ms(call, runs: int) -> float:
+    call()  # warm the page cache
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(timings), 2)
+
+
+def measure(runs: int) -> dict:
+    engine = database.get_engine()
+    with engine.connect() as conn:
+        sizes = _postgres_sizes(conn) if engine.dialect.name == "postgresql" else _sqlite_sizes(conn)
+        rows = conn.execute(text("SELECT COUNT(*) FROM grievances")).scalar()
+
+    db = database.SessionLocal()
+    try:
+        timings = {
+            "admin_dashboard_ms": _median_ms(lambda: admin.get_dashboard_stats.__wrapped__(db), runs),
+            "state_counts_ms": _median_ms(lambda: admin.get_state_counts.__wrapped__(db), runs),
+        }
+    finally:
+        db.close()
+    return {"dialect": engine.dialect.name, "grievances": rows, "sizes": sizes, "timings": timings}
+
+
+def compare(results: dict, baseline: dict) -> dict:
+    def change(current, previous):
+        return round((current - previous) / previous * 100, 1) if previous else None
+
+    comparison = {}
+    for table, size in results["sizes"].items():
+        previous = baseline["sizes"].get(table)
+        if previous:
+            comparison[table] = {key: change(size[key], previous[key]) for key in size}
+    for key, value in results["timings"].items():
+        if key in baseline["timings"]:
+            comparison[key] = change(value, baseline["timings"][key])
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Timed runs per query (median is reported)")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM before measuring")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Report %% change against a previous results file")
+    args = parser.parse_args()
+
+    if args.vacuum:
+        vacuum(database.get_engine())
+    results = measure(args.runs)
+    if args.baseline:
+        with open(args.baseline) as f:
+            results["change_pct"] = compare(results, json.load(f))
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,53 @@
-from fastapi import FastAPI
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from app import models, database
-from app.routers import grievance, admin, auth, metadata, chat
+from fastapi.middleware.gzip import GZipMiddleware
+from app import database, metrics, profiling, migrations
+from app.idempotency import IdempotencyMiddleware, IDEMPOTENCY_ENABLED
+from app.rate_limit import RateLimitMiddleware, RATE_LIMIT_ENABLED
+from app.routers import grievance, admin, auth, metadata, chat, events
+from app.services import notifications
+from app.services.events import bus
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+# Bodies of at least this many bytes are gzipped for clients that accept it; 0 disables.
+GZIP_MINIMUM_SIZE = int(os.getenv("GZIP_MINIMUM_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "5"))
 
-app = FastAPI(title="CivicPulse API", description="AI-driven grievance redressal platform")
 
-# Create tables on startup (non-blocking)
-@app.on_event("startup")
-async def startup_event():
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The engine is created here rather than at import so that workers boot
+    # quickly. Pending schema migrations are applied unless DB_AUTO_MIGRATE=0,
+    # in which case run `python -m app.migrations` as a separate deploy step.
+    engine = database.get_engine()
+    for instrumented in filter(None, (engine, database.get_replica_engine())):
+        if METRICS_ENABLED:
+            metrics.instrument_engine(instrumented)
+        if profiling.DB_PROFILE:
+            profiling.attach(instrumented)
     try:
-        print(f"Using Database URL: {database.SQLALCHEMY_DATABASE_URL}")
-        print("Creating database tables...")
-        models.Base.metadata.create_all(bind=database.engine)
-        print("✅ Database tables ready")
+        print(f"Using Database URL: {database.get_database_url()}")
+        if os.getenv("DB_AUTO_MIGRATE", "1") == "1":
+            migrations.upgrade(engine)
+        print("✅ Database schema ready")
     except Exception as e:
-        print(f"⚠️  Warning: Could not create tables: {e}")
+        print(f"⚠️  Warning: Could not migrate database: {e}")
         print("   The server will still start, but database operations may fail.")
+    await bus.start()
+    if notifications.NOTIFY_DISPATCHER_ENABLED:
+        await notifications.dispatcher.start()
+    try:
+        yield
+    finally:
+        await notifications.dispatcher.stop()
+        await bus.stop()
+        database.dispose_engine()
+
+app = FastAPI(title="CivicPulse API", description="AI-driven grievance redressal platform", lifespan=lifespan)
 
-import os
 if not os.path.exists("uploads"):
     os.makedirs("uploads")
 
@@ -31,12 +60,34 @@ origins = [o.strip() for o in origins_env.split(",") if o.strip()] or [
     "http://127.0.0.1:3000",
 ]
 
+if IDEMPOTENCY_ENABLED:
+    # Inside GZip, so stored responses are uncompressed and replays are
+    # encoded per retry; and inside the rate limiter, so throttled retries
+    # never claim a key.
+    app.add_middleware(IdempotencyMiddleware)
+
+if GZIP_MINIMUM_SIZE > 0:
+    # Added before the metrics middleware so response sizes are recorded as sent.
+    app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE, compresslevel=GZIP_LEVEL)
+
+if RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
+
+if METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+if profiling.DB_PROFILE:
+    app.add_middleware(profiling.ProfilerMiddleware)
+
+# Added last so it is outermost: responses the middlewares above answer on
+# their own (429s, idempotent replays) carry CORS headers too.
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After", "Idempotent-Replayed"],
 )
 
 app.include_router(auth.router)
@@ -44,7 +95,12 @@ app.include_router(grievance.router)
 app.include_router(admin.router)
 app.include_router(metadata.router)
 app.include_router(chat.router)
+app.include_router(events.router)
 
 @app.get("/")
 def read_root():
     return {"message": "Welcome to CivicPulse API"}
+
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    return Response(metrics.registry.render(), media_type="text/plain; version=0.0.4")
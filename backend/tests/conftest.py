@@ -0,0 +1,73 @@
+"""
+API tests against a fresh SQLite database seeded with app.seed, using the
+mock classifier. The app's engine is pooled like the PostgreSQL one (one
+connection), so code that needs a second connection while a request holds
+its session fails here instead of in production. Run from backend/:
+
+    python -m pytest tests
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Set before anything from app is imported; settings are read at import.
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+os.environ["GOOGLE_AI_API_KEY"] = ""
+os.environ["AI_PROVIDER"] = "none"
+os.environ["RATE_LIMIT_ENABLED"] = "0"
+os.environ["CACHE_ENABLED"] = "0"
+os.environ["NOTIFY_DISPATCHER_ENABLED"] = "0"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+POOL_TIMEOUT_SECONDS = 3
+
+
+def single_connection_engine(url: str):
+    """A SQLite engine pooled like the PostgreSQL one in app.database (one
+    connection, no overflow), so a second checkout times out."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import QueuePool
+
+    return create_engine(
+        url, poolclass=QueuePool, pool_size=1, max_overflow=0, pool_timeout=POOL_TIMEOUT_SECONDS,
+        connect_args={"check_same_thread": False},
+    )
+
+
+from app import database  # noqa: E402
+
+database._engine = single_connection_engine(os.environ["DATABASE_URL"])
+
+CITIZEN = ("citizen@example.com", "password123")
+ADMIN = ("admin@example.com", "password123")
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    import main
+    from app import seed
+
+    with TestClient(main.app) as client:
+        seed.seed_db()
+        yield client
+
+
+def login(client, user):
+    email, password = user
+    token = client.post("/auth/login", data={"username": email, "password": password}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture(scope="session")
+def citizen_headers(client):
+    return login(client, CITIZEN)
+
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    return login(client, ADMIN)
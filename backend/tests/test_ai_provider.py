@@ -0,0 +1,54 @@
+import asyncio
+import time
+
+from app.services.ai_provider import CircuitBreaker, ResilientProvider
+
+
+class SlowProvider:
+    name = "slow"
+
+    async def generate(self, prompt):
+        await asyncio.sleep(10)
+        return "late"
+
+    async def stream(self, prompt):
+        for token in ("a", "b", "c"):
+            yield token
+            await asyncio.sleep(0.01)
+
+
+def half_open_provider():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    return ResilientProvider(SlowProvider(), timeout=5, breaker=breaker), breaker
+
+
+def test_closed_trial_stream_frees_breaker():
+    provider, breaker = half_open_provider()
+
+    async def consume_one_token():
+        stream = provider.stream("hello")
+        assert await stream.__anext__() == "a"
+        await stream.aclose()
+
+    asyncio.run(consume_one_token())
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+
+
+def test_cancelled_trial_call_frees_breaker():
+    provider, breaker = half_open_provider()
+
+    async def cancel_generate():
+        task = asyncio.ensure_future(provider.generate("hello"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(cancel_generate())
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
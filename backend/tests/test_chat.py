@@ -0,0 +1,80 @@
+import pytest
+
+from app.routers import chat
+from app.services.conversation_store import SQLConversationStore
+from app.services.intent_router import router as intent_router
+
+
+class ScriptedProvider:
+    is_configured = True
+
+    def __init__(self):
+        self.closed = False
+
+    async def generate(self, prompt):
+        return "Parks are maintained by the horticulture department."
+
+    async def stream(self, prompt):
+        try:
+            for token in ("Parks ", "are ", "maintained."):
+                yield token
+        finally:
+            self.closed = True
+
+
+@pytest.fixture
+def sql_store(monkeypatch):
+    store = SQLConversationStore()
+    monkeypatch.setattr(chat, "store", store)
+    return store
+
+
+@pytest.fixture
+def scripted_provider(monkeypatch):
+    provider = ScriptedProvider()
+    monkeypatch.setattr(chat, "provider", provider)
+    return provider
+
+
+def citizen_id(client, headers):
+    return client.get("/auth/me", headers=headers).json()["id"]
+
+
+def test_sql_store_shares_the_request_session(client, citizen_headers, sql_store, scripted_provider):
+    # With a single pooled connection, a second session would time out.
+    local = client.post("/chat/", json={"message": "hi", "conversation_id": "pooled"}, headers=citizen_headers)
+    assert local.status_code == 200
+    model = client.post(
+        "/chat/", json={"message": "Who looks after the parks?", "conversation_id": "pooled"}, headers=citizen_headers
+    )
+    assert model.status_code == 200
+
+    turns = sql_store.get(citizen_id(client, citizen_headers), "pooled").turns
+    assert [role for role, _ in turns] == ["User", "Assistant", "User", "Assistant"]
+    assert turns[-1][1] == "Parks are maintained by the horticulture department."
+
+
+def test_stream_saves_reply(client, citizen_headers, sql_store, scripted_provider):
+    response = client.post(
+        "/chat/stream", json={"message": "Who looks after the parks?", "conversation_id": "streamed"},
+        headers=citizen_headers,
+    )
+    assert "event: done" in response.text
+    turns = sql_store.get(citizen_id(client, citizen_headers), "streamed").turns
+    assert turns[-1] == ("Assistant", "Parks are maintained.")
+
+
+def test_disconnected_stream_is_not_saved(client, citizen_headers, sql_store, scripted_provider, monkeypatch):
+    async def disconnected(self):
+        return True
+
+    monkeypatch.setattr(chat.Request, "is_disconnected", disconnected)
+    model_calls = intent_router.stats.snapshot()["model_messages"]
+    response = client.post(
+        "/chat/stream", json={"message": "Who looks after the parks?", "conversation_id": "dropped"},
+        headers=citizen_headers,
+    )
+    assert "event: done" not in response.text
+    assert sql_store.get(citizen_id(client, citizen_headers), "dropped").turns == []
+    assert intent_router.stats.snapshot()["model_messages"] == model_calls
+    assert scripted_provider.closed
@@ -0,0 +1,79 @@
+import asyncio
+import json
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from app.services import events
+
+
+class DroppingPubSub:
+    """Yields its messages, then fails the way a dropped connection does."""
+
+    def __init__(self, messages):
+        self.messages = messages
+        self.closed = False
+
+    async def listen(self):
+        for message in self.messages:
+            yield {"data": json.dumps(message)}
+        raise ConnectionError("Connection closed by server.")
+
+    async def aclose(self):
+        self.closed = True
+
+
+def test_redis_broker_resubscribes_after_drop(monkeypatch):
+    monkeypatch.setattr(events, "EVENT_RECONNECT_SECONDS", 0.01)
+    pubsubs = [DroppingPubSub([{"id": 1}]), DroppingPubSub([{"id": 2}]), DroppingPubSub([{"id": 3}])]
+    broker = events.RedisBroker()
+    attempts = []
+
+    async def subscribe():
+        attempts.append(1)
+        if len(attempts) == 2:
+            raise ConnectionError("Connection refused")
+        broker._pubsub = pubsubs.pop(0)
+
+    broker._subscribe = subscribe
+    delivered = []
+
+    async def run():
+        await broker.start(delivered.append)
+        for _ in range(100):
+            if len(delivered) == 3:
+                break
+            await asyncio.sleep(0.01)
+        await broker.stop()
+
+    asyncio.run(run())
+    assert [message["id"] for message in delivered] == [1, 2, 3]
+    assert len(attempts) == 4
+
+
+def test_websocket_rejects_bad_token(client):
+    with pytest.raises(WebSocketDisconnect) as excinfo:
+        with client.websocket_connect("/events/ws?token=not-a-token") as websocket:
+            websocket.receive_json()
+    assert excinfo.value.code == 1008
+
+
+def test_websocket_authenticates_off_the_event_loop(client, citizen_headers, monkeypatch):
+    from app.routers import events as events_router
+
+    resolve = events_router._resolve_topics
+    on_loop = []
+
+    def recording_resolve(token):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        return resolve(token)
+
+    monkeypatch.setattr(events_router, "_resolve_topics", recording_resolve)
+    token = citizen_headers["Authorization"].split(" ", 1)[1]
+    with client.websocket_connect(f"/events/ws?token={token}"):
+        pass
+    assert on_loop == [False]
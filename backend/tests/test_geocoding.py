@@ -0,0 +1,58 @@
+import pytest
+
+from app import database, models
+from app.services import geocoding, regions
+
+
+@pytest.fixture(scope="module")
+def lucknow(client):
+    db = database.SessionLocal()
+    try:
+        state = models.Region(name="Uttar Pradesh", code="ST-UTTAR-PRADESH", type=regions.STATE)
+        db.add(state)
+        db.flush()
+        district = models.Region(
+            name="Lucknow", code="DT-UTTAR-PRADESH-LUCKNOW", type=regions.DISTRICT, parent_id=state.id,
+            lat=26.85, lng=80.95,
+        )
+        db.add(district)
+        db.commit()
+        return district.id
+    finally:
+        db.close()
+
+
+def submit(client, headers, location):
+    return client.post(
+        "/grievance/",
+        data={"title": "Garbage pile", "description": "Not collected for a week", "location": location},
+        headers=headers,
+    )
+
+
+def test_location_is_placed_from_gazetteer_with_cold_caches(client, citizen_headers, lucknow):
+    geocoding.geocoder.clear()
+    regions.hierarchy.invalidate()
+    response = submit(client, citizen_headers, "Near the market, Hazratganj, Lucknow")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["region_id"] == lucknow
+    assert (body["lat"], body["lng"]) == (26.8467, 80.9462)
+
+
+def test_repeated_location_is_served_from_cache_table(client, citizen_headers, lucknow):
+    geocoding.geocoder.clear()
+    location = "Gomti Nagar, Lucknow"
+    first = submit(client, citizen_headers, location).json()
+    geocoding.geocoder.clear()
+    second = submit(client, citizen_headers, location).json()
+    assert (second["lat"], second["lng"], second["region_id"]) == (first["lat"], first["lng"], lucknow)
+
+    cache = models.GeocodeCache.__table__
+    with database.get_engine().connect() as conn:
+        assert conn.execute(cache.select().where(cache.c.normalized == geocoding.cache_key(location, None, None))).first()
+
+
+def test_unknown_location_is_left_unplaced(client, citizen_headers):
+    body = submit(client, citizen_headers, "Somewhere nobody has heard of").json()
+    assert body["lat"] is None and body["region_id"] is None
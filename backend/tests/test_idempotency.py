@@ -0,0 +1,139 @@
+import gzip
+import threading
+import time
+import uuid
+
+import pytest
+
+
+def submit(client, headers, key, title="Broken streetlight", description="The streetlight outside house 12 is out."):
+    return client.post(
+        "/grievance/",
+        data={"title": title, "description": description},
+        headers={**headers, "Idempotency-Key": key},
+    )
+
+
+def grievance_count():
+    from app import database, models
+
+    db = database.SessionLocal()
+    try:
+        return db.query(models.Grievance).count()
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def key():
+    return str(uuid.uuid4())
+
+
+def test_retry_replays_stored_response(client, citizen_headers, key):
+    first = submit(client, citizen_headers, key)
+    assert first.status_code == 200
+    assert "idempotent-replayed" not in first.headers
+    count = grievance_count()
+
+    retry = submit(client, citizen_headers, key)
+    assert retry.status_code == 200
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.json() == first.json()
+    assert grievance_count() == count
+
+
+def test_key_reused_for_different_request(client, citizen_headers, key):
+    assert submit(client, citizen_headers, key).status_code == 200
+    response = submit(client, citizen_headers, key, title="Something else")
+    assert response.status_code == 422
+
+
+def test_concurrent_duplicates_run_once(client, citizen_headers, key, monkeypatch):
+    from app.services.ai_service import AIService
+
+    calls = []
+    classify = AIService.classify_grievance
+
+    def slow_classify(*args, **kwargs):
+        calls.append(1)
+        time.sleep(0.3)
+        return classify(*args, **kwargs)
+
+    monkeypatch.setattr(AIService, "classify_grievance", staticmethod(slow_classify))
+    count = grievance_count()
+    responses = []
+
+    def post():
+        responses.append(submit(client, citizen_headers, key))
+
+    threads = [threading.Thread(target=post) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [r.status_code for r in responses] == [200] * 4
+    assert len({r.json()["id"] for r in responses}) == 1
+    assert sum(r.headers.get("idempotent-replayed") == "true" for r in responses) == 3
+    assert len(calls) == 1
+    assert grievance_count() == count + 1
+
+
+def test_gzipped_response_is_stored_and_replayed(client, citizen_headers, key):
+    headers = {**citizen_headers, "Accept-Encoding": "gzip"}
+    description = "Water has been leaking from the main pipe for a week. " * 40
+
+    first = submit(client, headers, key, description=description)
+    assert first.status_code == 200
+    assert first.headers["content-encoding"] == "gzip"
+
+    retry = submit(client, headers, key, description=description)
+    assert retry.status_code == 200
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.headers["content-encoding"] == "gzip"
+    assert retry.json() == first.json()
+
+    # Without gzip the same stored response comes back uncompressed.
+    plain = client.post(
+        "/grievance/",
+        data={"title": "Broken streetlight", "description": description},
+        headers={**citizen_headers, "Idempotency-Key": key, "Accept-Encoding": "identity"},
+    )
+    assert "content-encoding" not in plain.headers
+    assert plain.json() == first.json()
+
+
+def test_failed_request_releases_key(client, citizen_headers, key):
+    response = client.post(
+        "/grievance/",
+        data={"title": "Pothole", "description": "Deep pothole", "department_id": "not-a-number"},
+        headers={**citizen_headers, "Idempotency-Key": key},
+    )
+    assert response.status_code == 422
+    retry = submit(client, citizen_headers, key, title="Pothole", description="Deep pothole")
+    assert retry.status_code == 200
+    assert "idempotent-replayed" not in retry.headers
+
+
+def test_replay_carries_cors_headers(client, citizen_headers, key):
+    headers = {**citizen_headers, "Origin": "http://localhost:3000"}
+    assert submit(client, headers, key).status_code == 200
+    retry = submit(client, headers, key)
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.headers["access-control-allow-origin"] == "http://localhost:3000"
+
+
+def test_stored_response_is_not_compressed(client, citizen_headers, key):
+    from sqlalchemy import select
+
+    from app import database, idempotency
+
+    description = "Garbage has not been collected on our street for days. " * 40
+    response = submit(client, {**citizen_headers, "Accept-Encoding": "gzip"}, key, description=description)
+    assert response.status_code == 200
+    with database.get_engine().connect() as conn:
+        row = conn.execute(select(idempotency.table).where(idempotency.table.c.key == key)).one()
+    assert row.content_encoding is None
+    with pytest.raises(OSError):
+        gzip.decompress(row.response)
+    assert row.response.startswith(b"{")
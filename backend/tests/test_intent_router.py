@@ -0,0 +1,37 @@
+import pytest
+
+from app.services import intent_router
+from app.services.intent_router import FAQ_INTENT, STATUS_INTENT, IntentRouter
+
+
+def classify(message):
+    router = IntentRouter()
+    normalized = router.normalize(message)
+    intent = router.classify(normalized)
+    return intent, router._faq_answer(normalized) if intent == FAQ_INTENT else None
+
+
+@pytest.mark.parametrize("message", [
+    "What is new with my grievance",
+    "What's new with my complaint?",
+    "Any update on grievance #12?",
+    "ok but where is my complaint",
+])
+def test_status_questions(message):
+    assert classify(message)[0] == STATUS_INTENT
+
+
+@pytest.mark.parametrize("message, answer", [
+    ("hi", intent_router.GREETING_ANSWER),
+    ("Hello there!", intent_router.GREETING_ANSWER),
+    ("ok", intent_router.ACKNOWLEDGEMENT_ANSWER),
+    ("thank you so much", intent_router.ACKNOWLEDGEMENT_ANSWER),
+])
+def test_canned_replies(message, answer):
+    assert classify(message) == (FAQ_INTENT, answer)
+
+
+def test_greeting_with_question_is_not_a_greeting():
+    intent, answer = classify("hi how do I file a complaint")
+    assert intent == FAQ_INTENT
+    assert answer.startswith("To file a grievance")
@@ -0,0 +1,24 @@
+import re
+
+
+def query_count(client):
+    text = client.get("/metrics").text
+    return sum(float(v) for v in re.findall(r'^db_queries_total\{route="/metadata/departments"\} (\S+)$', text, re.M))
+
+
+def test_repeated_lifespans_count_each_query_once(client):
+    from fastapi.testclient import TestClient
+
+    import main
+
+    client.get("/metadata/departments")
+    before = query_count(client)
+    client.get("/metadata/departments")
+    once = query_count(client) - before
+
+    # A second lifespan on the same process-wide engine.
+    with TestClient(main.app):
+        pass
+    before = query_count(client)
+    client.get("/metadata/departments")
+    assert query_count(client) - before == once
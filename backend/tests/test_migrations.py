@@ -0,0 +1,19 @@
+import tempfile
+
+from sqlalchemy import inspect
+
+from conftest import single_connection_engine
+
+
+def test_upgrade_fresh_database_on_single_connection_pool():
+    from app import migrations
+
+    engine = single_connection_engine(f"sqlite:///{tempfile.mkdtemp()}/fresh.db")
+    applied = migrations.upgrade(engine)
+
+    assert applied == [module.VERSION for module in migrations.discover()]
+    tables = set(inspect(engine).get_table_names())
+    assert {"grievances", "timeline", "regions", "region_closure", "idempotency_keys", "satisfaction_scores"} <= tables
+    # A second run finds nothing to do.
+    assert migrations.upgrade(engine) == []
+    engine.dispose()
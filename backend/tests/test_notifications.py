@@ -0,0 +1,31 @@
+from datetime import datetime, timedelta, timezone
+
+from app import database
+from app.services import notifications
+
+
+def test_prune_deletes_only_old_settled_rows(client):
+    table = notifications.table
+    old = datetime.now(timezone.utc) - timedelta(days=notifications.NOTIFY_RETENTION_DAYS + 1)
+    recent = datetime.now(timezone.utc)
+    rows = {
+        "old-sent": (notifications.SENT, old),
+        "old-failed": (notifications.FAILED, old),
+        "old-pending": (notifications.PENDING, old),
+        "recent-sent": (notifications.SENT, recent),
+    }
+    with database.get_engine().begin() as conn:
+        conn.execute(table.insert(), [
+            {
+                "channel": "email", "recipient": "citizen@example.com", "dedupe_key": f"prune-test:{key}",
+                "payload": "{}", "status": status, "next_attempt_at": created_at, "created_at": created_at,
+            }
+            for key, (status, created_at) in rows.items()
+        ])
+
+    assert notifications.prune() == 2
+    with database.get_engine().connect() as conn:
+        left = conn.execute(
+            table.select().where(table.c.dedupe_key.like("prune-test:%"))
+        ).all()
+    assert sorted(row.dedupe_key for row in left) == ["prune-test:old-pending", "prune-test:recent-sent"]
@@ -0,0 +1,30 @@
+import asyncio
+
+from starlette.testclient import TestClient
+
+from app.rate_limit import RateLimitMiddleware, RedisBackend
+
+
+async def unreachable(keys, args):
+    raise ConnectionError("Error 111 connecting to localhost:6379. Connection refused.")
+
+
+def redis_down():
+    backend = RedisBackend()
+    backend._client = object()
+    backend._script = unreachable
+    return backend
+
+
+def test_redis_errors_fail_open():
+    assert asyncio.run(redis_down().acquire("POST /grievance/|ip:127.0.0.1", 0.05, 2)) == (True, 0.0)
+
+
+def test_requests_pass_while_redis_is_down():
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    limited = RateLimitMiddleware(app, rules={("GET", "/"): {"anonymous": (0.01, 1)}}, backend=redis_down())
+    client = TestClient(limited)
+    assert [client.get("/").status_code for _ in range(3)] == [200, 200, 200]
@@ -0,0 +1,153 @@
+import time
+
+import pytest
+
+from app import database, models
+from app.services import regions
+
+
+@pytest.fixture(scope="module")
+def district(client):
+    """A state under the North Zone and a district under it, added through
+    the ORM so the closure table is maintained incrementally."""
+    db = database.SessionLocal()
+    try:
+        zone = db.query(models.Region).filter(models.Region.code == "NZ").one()
+        state = models.Region(name="Testland", code="ST-TESTLAND", type=regions.STATE, parent_id=zone.id)
+        db.add(state)
+        db.flush()
+        district = models.Region(
+            name="Lakeside", code="DT-TESTLAND-LAKESIDE", type=regions.DISTRICT, parent_id=state.id,
+            lat=12.97, lng=77.59,
+        )
+        db.add(district)
+        db.commit()
+        return {"zone": zone.id, "state": state.id, "district": district.id}
+    finally:
+        db.close()
+
+
+def test_closure_links_every_ancestor(district):
+    closure = models.RegionClosure.__table__
+    with database.get_engine().connect() as conn:
+        rows = conn.execute(
+            closure.select().where(closure.c.descendant_id == district["district"])
+        ).all()
+    assert {(row.ancestor_id, row.depth) for row in rows} == {
+        (district["district"], 0), (district["state"], 1), (district["zone"], 2),
+    }
+
+
+def test_coordinates_place_grievance_with_cold_hierarchy(client, citizen_headers, district):
+    # The tree is loaded inside the request, which already holds the pool's
+    # only connection.
+    regions.hierarchy.invalidate()
+    response = client.post(
+        "/grievance/",
+        data={"title": "Streetlight out", "description": "Dark road at night", "lat": "12.98", "lng": "77.60"},
+        headers=citizen_headers,
+    )
+    assert response.status_code == 200
+    assert response.json()["region_id"] == district["district"]
+
+
+def test_state_and_district_place_grievance(client, citizen_headers, district):
+    response = client.post(
+        "/grievance/",
+        data={"title": "Pothole", "description": "Large pothole", "state": "Testland", "district": "lakeside"},
+        headers=citizen_headers,
+    )
+    assert response.json()["region_id"] == district["district"]
+
+
+def test_rollup_counts_grievances_in_subregions(client, citizen_headers, district):
+    client.post(
+        "/grievance/",
+        data={"title": "Water leak", "description": "Pipe burst", "lat": "12.97", "lng": "77.59"},
+        headers=citizen_headers,
+    )
+    regions.hierarchy.invalidate()
+    response = client.get("/admin/region-rollup", params={"region_code": "NZ", "depth": 1})
+    assert response.status_code == 200
+    by_code = {entry["code"]: entry for entry in response.json()}
+    with database.get_engine().connect() as conn:
+        grievances = models.Grievance.__table__
+        placed = conn.execute(
+            grievances.select().where(grievances.c.region_id == district["district"])
+        ).all()
+    assert by_code["ST-TESTLAND"]["total"] == len(placed) >= 1
+    assert by_code["ST-TESTLAND"]["parent_id"] == district["zone"]
+
+
+def test_unknown_region_code_is_not_found(client):
+    assert client.get("/admin/region-rollup", params={"region_code": "NOPE"}).status_code == 404
+
+
+def test_heatmap_with_cold_hierarchy(client, district):
+    regions.hierarchy.invalidate()
+    response = client.get("/admin/heatmap")
+    assert response.status_code == 200
+    assert any(point["lat"] == 12.97 and point["lng"] == 77.59 for point in response.json())
+
+
+def test_tree_is_reloaded_after_commit_not_flush(client, district):
+    regions.hierarchy.get(district["district"])
+    db = database.SessionLocal()
+    try:
+        region = db.get(models.Region, district["district"])
+        region.name = "Lakeside East"
+        db.flush()
+        assert regions.hierarchy._loaded_at is not None
+        db.rollback()
+        assert regions.hierarchy._loaded_at is not None
+
+        region = db.get(models.Region, district["district"])
+        region.name = "Lakeside"
+        region.lat = 12.971
+        db.commit()
+        assert regions.hierarchy._loaded_at is None
+    finally:
+        db.close()
+    assert regions.hierarchy.get(district["district"]).lat == 12.971
+
+
+def test_tree_follows_shared_regions_generation(client, district):
+    from app import cache
+
+    tree = regions.RegionHierarchy(generation_check=0)
+    assert tree.get(district["district"]).name == "Lakeside"
+    with database.get_engine().begin() as conn:
+        # A write this process does not see, e.g. from another worker.
+        conn.execute(models.Region.__table__.update().where(models.Region.id == district["district"]).values(name="Lakeshore"))
+    assert tree.get(district["district"]).name == "Lakeside"
+    cache.cache.invalidate("regions")
+    assert tree.get(district["district"]).name == "Lakeshore"
+    with database.get_engine().begin() as conn:
+        conn.execute(models.Region.__table__.update().where(models.Region.id == district["district"]).values(name="Lakeside"))
+    cache.cache.invalidate("regions")
+
+
+def test_tree_checks_generation_periodically_and_on_sync(client, district):
+    from app import cache
+
+    table = models.Region.__table__
+    tree = regions.RegionHierarchy(generation_check=0.05)
+    assert tree.get(district["district"]).name == "Lakeside"
+    try:
+        with database.get_engine().begin() as conn:
+            conn.execute(table.update().where(table.c.id == district["district"]).values(name="Lakeshore"))
+        cache.cache.invalidate("regions")
+        time.sleep(0.06)
+        assert tree.get(district["district"]).name == "Lakeshore"
+
+        tree.generation_check = 3600
+        with database.get_engine().begin() as conn:
+            conn.execute(table.update().where(table.c.id == district["district"]).values(name="Lakeside"))
+        cache.cache.invalidate("regions")
+        assert tree.get(district["district"]).name == "Lakeshore"
+        tree.sync()
+        assert tree.get(district["district"]).name == "Lakeside"
+    finally:
+        with database.get_engine().begin() as conn:
+            conn.execute(table.update().where(table.c.id == district["district"]).values(name="Lakeside"))
+        cache.cache.invalidate("regions")
@@ -0,0 +1,26 @@
+from sqlalchemy import func, select
+
+
+def sketched_resolutions():
+    from app import database, models
+
+    with database.get_engine().connect() as conn:
+        return conn.execute(select(func.coalesce(func.sum(models.ResolutionSketch.count), 0))).scalar()
+
+
+def test_reverified_grievance_counts_once(client, citizen_headers, admin_headers):
+    from app.services import resolution_times
+
+    grievance = client.post(
+        "/grievance/", data={"title": "Overflowing drain", "description": "Drain overflowing near the market"},
+        headers=citizen_headers,
+    ).json()
+    before = sketched_resolutions()
+
+    for _ in range(2):
+        # Reopened by resolving again after it was verified.
+        assert client.put(f"/grievance/{grievance['id']}/resolve", headers=admin_headers).status_code == 200
+        assert client.patch(f"/admin/grievance/{grievance['id']}/verify", headers=admin_headers).status_code == 200
+
+    assert sketched_resolutions() == before + 1
+    assert resolution_times.rebuild() == sketched_resolutions()